@@ -1 +1,102 @@
 # Configuración de la aplicación
+import os
+
+# Validación de archivos
+# Número de filas que se procesan por bloque al leer archivos SAP en streaming
+VALIDATION_CHUNK_SIZE = int(os.environ.get("VALIDATION_CHUNK_SIZE", "50000"))
+# Líneas máximas en las que se busca la cabecera en modo de salida anticipada
+VALIDATION_HEADER_SEARCH_LINES = int(os.environ.get("VALIDATION_HEADER_SEARCH_LINES", "500"))
+# Las reglas que tarden más que esto (ms) se señalan en el log
+VALIDATION_SLOW_RULE_MS = float(os.environ.get("VALIDATION_SLOW_RULE_MS", "1000"))
+
+# Pre-validación rápida por muestreo
+QUICK_CHECK_SAMPLE_SIZE = int(os.environ.get("QUICK_CHECK_SAMPLE_SIZE", "2000"))
+# Tiempo máximo (segundos) dedicado a leer muestras de un archivo
+QUICK_CHECK_TIME_BUDGET = float(os.environ.get("QUICK_CHECK_TIME_BUDGET", "0.5"))
+# Por debajo de este tamaño (bytes) se revisa el archivo completo en lugar de muestrear
+QUICK_CHECK_FULL_SCAN_BYTES = int(os.environ.get("QUICK_CHECK_FULL_SCAN_BYTES", str(1024 * 1024)))
+
+# Trabajos en segundo plano (validación y conversión)
+# Workers de gunicorn de la API (gunicorn toma de esta variable su número de workers por defecto)
+WEB_CONCURRENCY = max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))
+# Procesos que ejecutan trabajos en paralelo en CADA worker de la API: cada uno tiene su
+# propio pool, así que en total hay IMPORT_JOB_WORKERS × WEB_CONCURRENCY procesos
+# (por defecto, los núcleos repartidos entre los workers)
+IMPORT_JOB_WORKERS = int(os.environ.get("IMPORT_JOB_WORKERS", str(max(1, (os.cpu_count() or 2) // WEB_CONCURRENCY))))
+# Intervalo mínimo (segundos) entre eventos de progreso dentro de una etapa
+IMPORT_JOB_PROGRESS_INTERVAL = float(os.environ.get("IMPORT_JOB_PROGRESS_INTERVAL", "0.5"))
+# Trabajos que ejecuta un proceso de trabajo antes de sustituirlo por uno nuevo (0: sin límite)
+IMPORT_WORKER_MAX_JOBS = int(os.environ.get("IMPORT_WORKER_MAX_JOBS", "50"))
+# Memoria residente (MB) de un proceso de trabajo a partir de la cual se sustituye ese proceso (0: sin límite)
+IMPORT_WORKER_MAX_RSS_MB = int(os.environ.get("IMPORT_WORKER_MAX_RSS_MB", "1536"))
+# Horas que se conserva el estado de un trabajo terminado antes de borrarlo (0: para siempre)
+IMPORT_JOB_RETENTION_HOURS = float(os.environ.get("IMPORT_JOB_RETENTION_HOURS", "168"))
+
+# Streaming de progreso (SSE)
+# Frecuencia (segundos) con la que el stream revisa si hay eventos nuevos
+PROGRESS_STREAM_POLL_INTERVAL = float(os.environ.get("PROGRESS_STREAM_POLL_INTERVAL", "0.25"))
+# Segundos sin eventos tras los que se cierra el stream
+PROGRESS_STREAM_IDLE_TIMEOUT = float(os.environ.get("PROGRESS_STREAM_IDLE_TIMEOUT", "300"))
+# Horas sin eventos tras las que se borra el registro de progreso de una ejecución (0: nunca)
+PROGRESS_LOG_RETENTION_HOURS = float(os.environ.get("PROGRESS_LOG_RETENTION_HOURS", "24"))
+
+# Control de admisión de los endpoints pesados de importación
+# Presupuesto de memoria (MB) compartido por subidas, previsualizaciones y trabajos de todos los workers de la API
+IMPORT_MEMORY_BUDGET_MB = int(os.environ.get("IMPORT_MEMORY_BUDGET_MB", "2048"))
+# Memoria estimada por byte de archivo al cargarlo en listas/DataFrames
+IMPORT_MEMORY_PER_FILE_BYTE = float(os.environ.get("IMPORT_MEMORY_PER_FILE_BYTE", "8"))
+# Memoria disponible del sistema (MB) por debajo de la cual se rechazan peticiones pesadas
+IMPORT_MIN_FREE_MEMORY_MB = int(os.environ.get("IMPORT_MIN_FREE_MEMORY_MB", "256"))
+# Peticiones simultáneas por endpoint pesado
+ADMISSION_UPLOAD_CONCURRENCY = int(os.environ.get("ADMISSION_UPLOAD_CONCURRENCY", "2"))
+ADMISSION_QUICK_CHECK_CONCURRENCY = int(os.environ.get("ADMISSION_QUICK_CHECK_CONCURRENCY", "2"))
+ADMISSION_PREVIEW_CONCURRENCY = int(os.environ.get("ADMISSION_PREVIEW_CONCURRENCY", "4"))
+# Peticiones que pueden esperar turno por endpoint antes de responder 429
+ADMISSION_QUEUE_LIMIT = int(os.environ.get("ADMISSION_QUEUE_LIMIT", "8"))
+# Segundos máximos de espera en cola antes de responder 429
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "30"))
+# Retry-After (segundos) mientras no hay duraciones medidas
+ADMISSION_DEFAULT_RETRY_AFTER = int(os.environ.get("ADMISSION_DEFAULT_RETRY_AFTER", "5"))
+# Trabajos de validación/conversión en cola por encima de los cuales se responde 429. La
+# cola es de cada worker de la API (en total, × WEB_CONCURRENCY); por defecto se reparten 50
+IMPORT_JOB_QUEUE_LIMIT = int(os.environ.get("IMPORT_JOB_QUEUE_LIMIT", str(max(1, 50 // WEB_CONCURRENCY))))
+
+# Planificación justa de trabajos entre proyectos y usuarios
+# Peso de cada prioridad: un trabajo interactivo recibe N veces más turno que uno masivo
+IMPORT_JOB_WEIGHT_INTERACTIVE = float(os.environ.get("IMPORT_JOB_WEIGHT_INTERACTIVE", "4"))
+IMPORT_JOB_WEIGHT_BULK = float(os.environ.get("IMPORT_JOB_WEIGHT_BULK", "1"))
+# Pesos por proyecto, p. ej. "00038150:2,00041200:0.5" (por defecto 1)
+IMPORT_PROJECT_WEIGHTS = os.environ.get("IMPORT_PROJECT_WEIGHTS", "")
+# Esperas recientes por proyecto que se conservan para las métricas de la cola
+IMPORT_QUEUE_METRICS_WINDOW = int(os.environ.get("IMPORT_QUEUE_METRICS_WINDOW", "100"))
+
+# Pipeline de importación (subida → lectura → validación → conversión)
+# Guardar los resultados intermedios de cada etapa para reutilizarlos al repetirla
+IMPORT_ARTIFACT_CACHE = os.environ.get("IMPORT_ARTIFACT_CACHE", "true").lower() == "true"
+
+# Importación masiva (varios períodos en una sola petición)
+# Períodos máximos por lote
+IMPORT_BULK_MAX_PERIODS = int(os.environ.get("IMPORT_BULK_MAX_PERIODS", "24"))
+
+# Subidas idempotentes
+# Horas durante las que un Idempotency-Key devuelve la respuesta original
+IMPORT_IDEMPOTENCY_TTL_HOURS = float(os.environ.get("IMPORT_IDEMPOTENCY_TTL_HOURS", "24"))
+# Segundos que un reintento espera a que termine la petición original con la misma clave
+IMPORT_IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get("IMPORT_IDEMPOTENCY_WAIT_SECONDS", "120"))
+# Segundos durante los que una subida idéntica (mismo contenido) reutiliza la ejecución anterior (0 = desactivado)
+IMPORT_UPLOAD_DEDUP_WINDOW = float(os.environ.get("IMPORT_UPLOAD_DEDUP_WINDOW", "600"))
+
+# Datos de referencia (usuarios, proyectos, aplicaciones, plantillas)
+# Segundos entre comprobaciones de si los JSON cambiaron en disco (0 = en cada consulta)
+REFERENCE_DATA_CHECK_INTERVAL = float(os.environ.get("REFERENCE_DATA_CHECK_INTERVAL", "2"))
+# Respuestas JSON de usuarios, proyectos y aplicaciones que se guardan ya serializadas
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+
+# Historial de importaciones
+# Ejecuciones por página en /history si no se indica otro límite, y límite máximo
+IMPORT_HISTORY_PAGE_SIZE = int(os.environ.get("IMPORT_HISTORY_PAGE_SIZE", "50"))
+IMPORT_HISTORY_MAX_PAGE_SIZE = int(os.environ.get("IMPORT_HISTORY_MAX_PAGE_SIZE", "500"))
+
+# Almacenamiento
+# Forzar a disco (fsync) cada archivo antes de publicarlo; más lento pero resiste cortes de luz
+STORAGE_FSYNC = os.environ.get("STORAGE_FSYNC", "true").lower() == "true"
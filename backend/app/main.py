@@ -1,9 +1,11 @@
 # backend/main.py - Configuración mejorada para desarrollo y producción
-from fastapi import FastAPI, HTTPException
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
 from app.routers import users, projects, applications, import_router
+from app.services.admission_service import AdmissionMiddleware
+from app.services.static_assets import StaticAssetManifest
+from app.services.storage import hold_process_lock
+from app.services.progress_service import purge_progress_logs
 import uvicorn
 import os
 
@@ -17,6 +19,14 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Control de admisión de los endpoints pesados de importación. Se registra antes
+# que CORS para que las respuestas 429 también lleven las cabeceras CORS
+app.add_middleware(
+    AdmissionMiddleware,
+    controller=import_router.admission_controller,
+    converted_file_path=import_router.conversion_service.converted_file_path
+)
+
 # Middleware CORS - Más permisivo en desarrollo
 if DEVELOPMENT_MODE:
     print("🔧 Running in DEVELOPMENT mode")
@@ -54,6 +64,29 @@ app.include_router(projects.router, prefix="/api/projects", tags=["projects"])
 app.include_router(applications.router, prefix="/api/applications", tags=["applications"])
 app.include_router(import_router.router, prefix="/api/import", tags=["import"])
 
+# Trabajos de importación en segundo plano
+@app.on_event("startup")
+def resume_import_jobs():
+    # Arrancar los procesos de trabajos (cargan pandas una sola vez). Cada
+    # worker de gunicorn tiene su pool: IMPORT_JOB_WORKERS se reparte entre
+    # los WEB_CONCURRENCY workers
+    import_router.job_service.warm_up()
+    # Cada worker relanza los trabajos de procesos que ya no existen (p. ej. el
+    # worker al que sustituye); los de workers vivos no se tocan
+    import_router.job_service.recover_jobs()
+    # Con varios workers de gunicorn, solo uno repara el estado guardado
+    if not hold_process_lock(os.path.join(import_router.upload_service.storage_path, 'startup')):
+        return
+    import_router.job_service.purge_finished_jobs(force=True)
+    import_router.pipeline_service.resume()
+    import_router.idempotency_service.purge_expired()
+    purge_progress_logs()
+    import_router.upload_service.ensure_summary()
+
+@app.on_event("shutdown")
+def stop_import_jobs():
+    import_router.job_service.shutdown()
+
 # Endpoints de la API
 @app.get("/api/health")
 def health_check():
@@ -85,42 +118,17 @@ def api_root():
 if SERVE_FRONTEND and not DEVELOPMENT_MODE:
     # Configurar la ruta a la carpeta build del frontend
     BUILD_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../frontend/build"))
-    STATIC_DIR = os.path.join(BUILD_DIR, "static")
 
     # Verificar que la carpeta build existe
     if os.path.exists(BUILD_DIR):
         print(f"✅ Frontend build directory found: {BUILD_DIR}")
-        
-        # Servir archivos estáticos (CSS, JS, imágenes)
-        if os.path.exists(STATIC_DIR):
-            app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
-            print(f"✅ Static files mounted from: {STATIC_DIR}")
-        
-        # Servir otros archivos estáticos del build (manifest, favicon, etc.)
-        @app.get("/favicon.ico")
-        async def favicon():
-            favicon_path = os.path.join(BUILD_DIR, "favicon.ico")
-            if os.path.exists(favicon_path):
-                return FileResponse(favicon_path)
-            raise HTTPException(status_code=404, detail="Favicon not found")
-        
-        @app.get("/manifest.json")
-        async def manifest():
-            manifest_path = os.path.join(BUILD_DIR, "manifest.json")
-            if os.path.exists(manifest_path):
-                return FileResponse(manifest_path)
-            raise HTTPException(status_code=404, detail="Manifest not found")
-        
-        @app.get("/robots.txt")
-        async def robots():
-            robots_path = os.path.join(BUILD_DIR, "robots.txt")
-            if os.path.exists(robots_path):
-                return FileResponse(robots_path)
-            raise HTTPException(status_code=404, detail="Robots.txt not found")
-
-        # Catch-all route para servir el frontend React
+
+        # El build se recorre una vez: las peticiones estáticas no consultan el disco
+        static_manifest = StaticAssetManifest(BUILD_DIR)
+
+        # Catch-all route para servir el frontend React (static/, favicon, manifest...)
         @app.get("/{full_path:path}")
-        async def serve_react_app(full_path: str):
+        async def serve_react_app(full_path: str, request: Request):
             """
             Serve the React app for all non-API routes
             """
@@ -129,26 +137,30 @@ if SERVE_FRONTEND and not DEVELOPMENT_MODE:
                 raise HTTPException(status_code=404, detail="API endpoint not found")
             
             # Intentar servir el archivo solicitado
-            file_path = os.path.join(BUILD_DIR, full_path)
-            if os.path.exists(file_path) and os.path.isfile(file_path):
-                return FileResponse(file_path)
+            asset = static_manifest.get(full_path)
+            if asset is not None:
+                return static_manifest.respond(request, asset)
+
+            # Un recurso de static/ que no existe no debe recibir index.html
+            if full_path.startswith("static/"):
+                raise HTTPException(status_code=404, detail="Static file not found")
             
             # Si no existe el archivo, servir index.html para que React Router maneje la ruta
-            index_path = os.path.join(BUILD_DIR, "index.html")
-            if os.path.exists(index_path):
-                return FileResponse(index_path)
+            index = static_manifest.get("index.html")
+            if index is not None:
+                return static_manifest.respond(request, index)
             
             raise HTTPException(status_code=404, detail="Frontend not found")
 
         # Ruta raíz - servir el frontend
         @app.get("/")
-        async def root():
+        async def root(request: Request):
             """
             Serve the main React app
             """
-            index_path = os.path.join(BUILD_DIR, "index.html")
-            if os.path.exists(index_path):
-                return FileResponse(index_path)
+            index = static_manifest.get("index.html")
+            if index is not None:
+                return static_manifest.respond(request, index)
             
             # Si no hay build, mostrar info de la API
             return {
@@ -16,17 +16,39 @@ class ExecutionStatus(str, Enum):
     SUCCESS = "success"
     ERROR = "error"
     WARNING = "warning"
+    CANCELLED = "cancelled"
 
 class ValidationStatus(str, Enum):
     OK = "ok"
     ERROR = "error"
     WARNING = "warning"
 
+class JobType(str, Enum):
+    PARSE = "parse"  # Lectura de archivos SAP a DataFrames reutilizables (modo pipeline)
+    VALIDATION = "validation"
+    CONVERSION = "conversion"
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class JobPriority(str, Enum):
+    INTERACTIVE = "interactive"  # Validaciones que el usuario espera en pantalla
+    BULK = "bulk"  # Conversiones y cargas masivas
+
+class SamplingStrategy(str, Enum):
+    RANDOM = "random"
+    STRATIFIED = "stratified"
+
 class ValidationResult(BaseModel):
     field: str
     status: ValidationStatus
     message: str
     details: Optional[str] = None
+    durationMs: Optional[float] = None  # Tiempo de evaluación de la regla
 
 class FileValidation(BaseModel):
     fileName: str
@@ -38,6 +60,33 @@ class FileValidation(BaseModel):
     validationResults: List[ValidationResult]
     errorCount: int = 0
     warningCount: int = 0
+    rowsValidated: Optional[int] = None
+    coverage: Optional[float] = None  # Fracción del archivo (en bytes) recorrida
+    partial: bool = False  # True si la validación se detuvo antes del final del archivo
+    stopReason: Optional[str] = None
+
+class QuickCheckEstimate(BaseModel):
+    field: str
+    status: ValidationStatus
+    message: str
+    sampleErrors: int
+    estimatedErrorRate: float
+    lowerBound: float  # Límites del intervalo de confianza (Wilson)
+    upperBound: float
+    examples: List[str] = []
+
+class QuickCheckResult(BaseModel):
+    fileName: str
+    origin: str
+    status: ValidationStatus
+    strategy: SamplingStrategy
+    sampledRows: int
+    estimatedTotalRows: Optional[int] = None
+    confidenceLevel: float = 0.95
+    exact: bool = False  # True si el archivo era pequeño y se revisó completo
+    elapsedMs: int
+    estimates: List[QuickCheckEstimate] = []
+    message: Optional[str] = None
 
 class FileMetadata(BaseModel):
     executionId: str
@@ -53,6 +102,7 @@ class FileMetadata(BaseModel):
     userName: str
     status: ExecutionStatus
     filePath: str
+    contentHash: Optional[str] = None  # SHA-256 del contenido, para detectar subidas repetidas
 
 class ImportExecution(BaseModel):
     executionId: str
@@ -72,6 +122,9 @@ class ImportExecution(BaseModel):
     errorMessage: Optional[str] = None
     fileCount: Optional[int] = 1  # Nuevo campo para contar archivos
     hasSAPMerge: Optional[bool] = False  # Indica si se realizó merge de SAP
+    baseExecutionId: Optional[str] = None  # Versión anterior: la conversión solo rehace lo que cambió
+    rowsImported: Optional[int] = None  # Registros del archivo convertido
+    bytesStored: Optional[int] = None  # Tamaño total de los archivos subidos
 
 class UploadRequest(BaseModel):
     projectId: str
@@ -83,6 +136,16 @@ class UploadResponse(BaseModel):
     success: bool
     message: str
     metadata: Optional[FileMetadata] = None
+    pipelineJobs: List[str] = []  # Trabajos lanzados automáticamente en modo pipeline
+
+class AppendFilesResponse(BaseModel):
+    executionId: str
+    success: bool
+    message: str
+    addedFiles: List[FileMetadata] = []
+    skippedFiles: List[str] = []  # Archivos que ya estaban en la ejecución con el mismo contenido
+    fileCount: int = 0
+    pipelineJobs: List[str] = []
 
 class ValidationResponse(BaseModel):
     executionId: str
@@ -90,6 +153,14 @@ class ValidationResponse(BaseModel):
     message: str
     validations: List[FileValidation]
     canProceed: bool
+    partial: bool = False
+
+class QuickCheckResponse(BaseModel):
+    executionId: str
+    success: bool
+    message: str
+    results: List[QuickCheckResult]
+    hasIssues: bool
 
 class ConversionResponse(BaseModel):
     executionId: str
@@ -98,10 +169,105 @@ class ConversionResponse(BaseModel):
     convertedFiles: List[str]
     downloadUrls: List[str]
 
+class ImportJob(BaseModel):
+    jobId: str
+    executionId: str
+    jobType: JobType
+    status: JobStatus
+    priority: JobPriority = JobPriority.BULK
+    projectId: Optional[str] = None
+    userId: Optional[str] = None
+    progress: float = 0.0  # Porcentaje completado (0-100)
+    stage: Optional[str] = None
+    message: Optional[str] = None
+    params: Dict[str, Any] = {}
+    submittedAt: str
+    startedAt: Optional[str] = None
+    finishedAt: Optional[str] = None
+    attempts: int = 0  # Veces que se ha lanzado (se relanza tras un reinicio)
+    ownerPid: Optional[int] = None  # Proceso dueño: el que lo encoló mientras espera, el que lo ejecuta después
+    queuePosition: Optional[int] = None  # Posición en la cola mientras está en espera
+    result: Optional[Dict[str, Any]] = None  # ValidationResponse / ConversionResponse
+    error: Optional[str] = None
+
+class JobSubmissionResponse(BaseModel):
+    executionId: str
+    jobId: str
+    success: bool
+    message: str
+    job: ImportJob
+
+class CancelResponse(BaseModel):
+    executionId: str
+    success: bool
+    message: str
+    jobs: List[ImportJob]
+
+class BulkPeriod(BaseModel):
+    period: str
+    files: List[str]
+    executionId: Optional[str] = None
+    jobIds: List[str] = []  # Trabajos lanzados al subir (lectura y validación)
+    error: Optional[str] = None  # Motivo por el que el período no llegó a iniciarse
+
+class BulkImport(BaseModel):
+    bulkId: str
+    projectId: str
+    projectName: str
+    testType: str
+    userId: str
+    userName: str
+    createdAt: str
+    periods: List[BulkPeriod]
+
+class BulkPeriodReport(BaseModel):
+    period: str
+    executionId: Optional[str] = None
+    files: List[str]
+    status: ExecutionStatus
+    stage: Optional[str] = None  # "validation" o "conversion" mientras está en curso
+    progress: float = 0.0
+    canProceed: Optional[bool] = None
+    convertedFiles: List[str] = []
+    downloadUrls: List[str] = []
+    errorMessage: Optional[str] = None
+    finishedAt: Optional[str] = None
+
+class BulkImportReport(BaseModel):
+    bulkId: str
+    projectId: str
+    status: ExecutionStatus
+    message: str
+    createdAt: str
+    finishedAt: Optional[str] = None
+    elapsedSeconds: float
+    progress: float = 0.0
+    totals: Dict[str, int]  # Períodos por estado
+    periods: List[BulkPeriodReport]
+
 class ImportHistoryResponse(BaseModel):
     executions: List[ImportExecution]
     success: bool = True
     message: str = "Historial obtenido correctamente"
+    nextCursor: Optional[str] = None  # Cursor para pedir la página siguiente
+    hasMore: bool = False
+
+class ImportSummary(BaseModel):
+    projectId: str
+    period: str
+    executionCount: int = 0
+    statusCounts: Dict[str, int] = {}
+    rowsImported: int = 0  # Suma de las ejecuciones correctas
+    bytesStored: int = 0
+    lastSuccessfulExecutionId: Optional[str] = None
+    lastSuccessfulVersion: Optional[int] = None
+    lastSuccessfulDate: Optional[str] = None
+    updatedAt: Optional[str] = None
+
+class ImportSummaryResponse(BaseModel):
+    summaries: List[ImportSummary]
+    success: bool = True
+    message: str = "Resumen obtenido correctamente"
 
 class FilePreview(BaseModel):
     fileName: str
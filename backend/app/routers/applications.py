@@ -1,24 +1,28 @@
 # Rutas de aplicaciones
 # backend/app/routers/applications.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from app.models.application import ApplicationsResponse
 from app.services.application_service import ApplicationService
 from app.services.user_service import UserService
+from app.services.response_cache import response_cache, make_etag
 
 router = APIRouter()
 application_service = ApplicationService()
 user_service = UserService()
 
 @router.get("/", response_model=ApplicationsResponse)
-async def get_applications():
+async def get_applications(request: Request):
     """Obtener todas las aplicaciones disponibles"""
     try:
-        applications = application_service.get_all_applications()
-        
-        return ApplicationsResponse(
-            applications=applications,
-            success=True,
-            message="Aplicaciones obtenidas correctamente"
+        return response_cache.respond(
+            request,
+            "applications:all",
+            make_etag("applications:all", application_service.data_version()),
+            lambda: ApplicationsResponse(
+                applications=application_service.get_all_applications(),
+                success=True,
+                message="Aplicaciones obtenidas correctamente"
+            )
         )
     
     except Exception as e:
@@ -28,7 +32,7 @@ async def get_applications():
         )
 
 @router.get("/for-user/{user_id}", response_model=ApplicationsResponse)
-async def get_applications_for_user(user_id: str):
+async def get_applications_for_user(user_id: str, request: Request):
     """Obtener aplicaciones filtradas para un usuario específico"""
     try:
         user = user_service.get_user_by_id(user_id)
@@ -39,12 +43,15 @@ async def get_applications_for_user(user_id: str):
                 detail=f"Usuario {user_id} no encontrado"
             )
         
-        applications = application_service.get_applications_for_user(user)
-        
-        return ApplicationsResponse(
-            applications=applications,
-            success=True,
-            message=f"Aplicaciones para {user.name} obtenidas correctamente"
+        return response_cache.respond(
+            request,
+            f"applications:user:{user.id}",
+            make_etag("applications:user", user.id, user_service.data_version(), application_service.data_version()),
+            lambda: ApplicationsResponse(
+                applications=application_service.get_applications_for_user(user),
+                success=True,
+                message=f"Aplicaciones para {user.name} obtenidas correctamente"
+            )
         )
     
     except Exception as e:
@@ -54,8 +61,12 @@ async def get_applications_for_user(user_id: str):
         )
 
 @router.get("/current-user", response_model=ApplicationsResponse)
-async def get_applications_for_current_user():
-    """Obtener aplicaciones para el usuario actual"""
+async def get_applications_for_current_user(request: Request):
+    """Obtener aplicaciones para el usuario actual.
+
+    Responde con ETag; si el cliente envía If-None-Match con la versión
+    vigente se devuelve 304 sin cuerpo.
+    """
     try:
         user = user_service.get_current_user()
         
@@ -65,12 +76,15 @@ async def get_applications_for_current_user():
                 detail="Usuario actual no encontrado"
             )
         
-        applications = application_service.get_applications_for_user(user)
-        
-        return ApplicationsResponse(
-            applications=applications,
-            success=True,
-            message=f"Aplicaciones para {user.name} obtenidas correctamente"
+        return response_cache.respond(
+            request,
+            f"applications:current:{user.id}",
+            make_etag("applications:current", user.id, user_service.data_version(), application_service.data_version()),
+            lambda: ApplicationsResponse(
+                applications=application_service.get_applications_for_user(user),
+                success=True,
+                message=f"Aplicaciones para {user.name} obtenidas correctamente"
+            )
         )
     
     except Exception as e:
@@ -1,16 +1,29 @@
 # backend/app/routers/import_router.py
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from fastapi.responses import FileResponse
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse, Response
+from typing import Any, Dict, List, Optional
+from datetime import date, timedelta
 import os
+import asyncio
 
 from app.models.import_models import (
-    UploadResponse, ValidationResponse, ConversionResponse, 
-    ImportHistoryResponse, FilePreview, ExecutionStatus
+    UploadResponse, ValidationResponse, ConversionResponse,
+    ImportHistoryResponse, FilePreview, ExecutionStatus,
+    QuickCheckResponse, SamplingStrategy, JobSubmissionResponse, ImportJob, JobType, JobStatus, JobPriority,
+    CancelResponse, BulkImportReport, AppendFilesResponse, ImportSummaryResponse
 )
 from app.services.upload_service import UploadService
 from app.services.validation_service import ValidationService
 from app.services.conversion_service import ConversionService
+from app.services.job_service import JobService
+from app.services.admission_service import AdmissionController, AdmissionRejected
+from app.services.idempotency_service import IdempotencyService, IdempotencyConflict, request_fingerprint
+from app.services.pipeline_service import PipelineService
+from app.services.bulk_import_service import BulkImportService, group_files_by_period
+from app.services.progress_service import stream_progress_events
+from app.services.fast_json import FastJSONResponse
+from app.config.settings import IMPORT_HISTORY_PAGE_SIZE, IMPORT_HISTORY_MAX_PAGE_SIZE, PROGRESS_STREAM_POLL_INTERVAL
 from app.services.user_service import UserService
 from app.services.project_service import ProjectService
 
@@ -18,17 +31,161 @@ router = APIRouter()
 upload_service = UploadService()
 validation_service = ValidationService()
 conversion_service = ConversionService()
+admission_controller = AdmissionController()
+job_service = JobService(admission=admission_controller)
+pipeline_service = PipelineService(job_service, upload_service)
+bulk_import_service = BulkImportService(job_service, pipeline_service, upload_service)
+idempotency_service = IdempotencyService()
 user_service = UserService()
 project_service = ProjectService()
 
+def _too_many_requests(error: AdmissionRejected) -> HTTPException:
+    """Respuesta 429 con el tiempo sugerido para reintentar"""
+    return HTTPException(
+        status_code=429,
+        detail=error.message,
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+async def _wait_for_job(job: ImportJob, request: Request, action: str) -> Response:
+    """Esperar a que termine el trabajo y responder con su resultado (``?wait=true``).
+
+    Mantiene el contrato síncrono anterior: 200 con ValidationResponse o
+    ConversionResponse, o 500 si el trabajo falla. Si el cliente se
+    desconecta, el trabajo sigue en segundo plano.
+    """
+    while job.status in (JobStatus.QUEUED, JobStatus.RUNNING):
+        if await request.is_disconnected():
+            return FastJSONResponse(job, status_code=202)
+        await asyncio.sleep(PROGRESS_STREAM_POLL_INTERVAL)
+        job = await run_in_threadpool(job_service.get_job, job.jobId) or job
+    if job.status == JobStatus.COMPLETED:
+        return FastJSONResponse(job.result)
+    if job.status == JobStatus.CANCELLED:
+        raise HTTPException(
+            status_code=409,
+            detail=f"La {action} fue cancelada"
+        )
+    raise HTTPException(
+        status_code=500,
+        detail=f"Error durante la {action}: {job.error}"
+    )
+
+def _start_job(job_type: JobType, execution_id: str, params: Dict[str, Any], priority: Optional[JobPriority]) -> ImportJob:
+    """Comprobar la ejecución, marcarla en proceso y encolar el trabajo.
+
+    Lee metadatos y escribe ``executions.json`` y el archivo del trabajo bajo
+    bloqueo: se llama con run_in_threadpool para no bloquear el bucle de eventos.
+    """
+    metadatas = upload_service.get_metadatas_by_execution_id(execution_id)
+    if not metadatas:
+        raise HTTPException(
+            status_code=404,
+            detail="Ejecución no encontrada"
+        )
+    
+    # Rechazar antes de tocar el estado si la cola está llena
+    job_service.check_admission()
+    
+    # Actualizar estado a procesando
+    upload_service.update_execution_status(
+        execution_id, 
+        ExecutionStatus.PROCESSING
+    )
+    
+    return job_service.submit(job_type, execution_id, params, priority=priority)
+
+def _find_duplicate_upload(files, project_id, period, user_id, test_type) -> Optional[UploadResponse]:
+    """Respuesta de una subida reciente con los mismos archivos, si la hay"""
+    duplicate = upload_service.find_duplicate_upload(files, project_id, period, user_id, test_type)
+    if duplicate is None:
+        return None
+    execution_id, metadatas = duplicate
+    print(f"🔁 Upload matches recent execution {execution_id}; reusing it")
+    return UploadResponse(
+        executionId=execution_id,
+        success=True,
+        message=f"Estos archivos ya se subieron en la ejecución {execution_id}; se reutiliza",
+        metadata=metadatas[0],
+        pipelineJobs=[job.jobId for job in job_service.store.list_jobs(execution_id) if job.params.get("pipeline")]
+    )
+
+async def _create_upload(files, project_id, project_name, period, user, test_type, pipeline, base_execution_id=None) -> UploadResponse:
+    """Guardar los archivos en una ejecución nueva y, en modo pipeline, lanzar sus etapas"""
+    # Trabajos de lectura lanzados mientras se guardan los archivos
+    pipeline_jobs = []
+    
+    def start_parse(metadata):
+        job = pipeline_service.on_file_uploaded(metadata)
+        if job:
+            pipeline_jobs.append(job.jobId)
+    
+    # Procesar múltiples archivos (en un hilo, para no bloquear el bucle de eventos)
+    execution_id, metadatas = await run_in_threadpool(
+        upload_service.upload_multiple_files,
+        files=files,
+        project_id=project_id,
+        period=period,
+        user_id=user.id,
+        user_name=user.name,
+        test_type=test_type,
+        on_file_saved=start_parse if pipeline else None
+    )
+    
+    # Crear registro en historial
+    upload_service.create_execution_record(
+        execution_id=execution_id,
+        metadatas=metadatas,
+        project_name=project_name,
+        base_execution_id=base_execution_id
+    )
+    
+    message = f"{len(files)} archivo(s) subido(s) correctamente"
+    if pipeline:
+        try:
+            pipeline_jobs.append(pipeline_service.start(execution_id).jobId)
+            message += "; validación y conversión en curso"
+        except AdmissionRejected as e:
+            message += f"; no se pudo iniciar el pipeline: {e.message}"
+    
+    # Retornar información del primer archivo (o un resumen)
+    primary_metadata = metadatas[0] if metadatas else None
+    
+    return UploadResponse(
+        executionId=execution_id,
+        success=True,
+        message=message,
+        metadata=primary_metadata,
+        pipelineJobs=pipeline_jobs
+    )
+
 @router.post("/upload", response_model=UploadResponse)
 async def upload_files(
+    response: Response,
     files: List[UploadFile] = File(...),  # Cambio: ahora acepta múltiples archivos
     project_id: str = Form(...),
     period: str = Form(...),
-    test_type: str = Form("libro_diario_import")
+    test_type: str = Form("libro_diario_import"),
+    pipeline: bool = Form(False),
+    base_execution_id: Optional[str] = Form(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
-    """Subir múltiples archivos contables"""
+    """Subir múltiples archivos contables.
+
+    Con ``pipeline`` las etapas se encadenan solas: cada archivo SAP empieza a
+    leerse en cuanto está en disco, la validación se encola al terminar la
+    subida y la conversión cuando la validación permite continuar.
+
+    Un reintento con la misma cabecera ``Idempotency-Key`` devuelve la
+    respuesta original sin guardar otra copia de los archivos. Sin clave, una
+    subida con el mismo contenido dentro de IMPORT_UPLOAD_DEDUP_WINDOW
+    reutiliza la ejecución anterior. En ambos casos la respuesta lleva la
+    cabecera ``Idempotent-Replayed: true``.
+
+    La ejecución se registra como nueva versión de ``base_execution_id`` (por
+    defecto, la última del mismo proyecto y período): al convertirla solo se
+    leen y fusionan los archivos cuyo contenido cambió.
+    """
     try:
         # Validar que se enviaron archivos
         if not files or len(files) == 0:
@@ -59,32 +216,261 @@ async def upload_files(
                 status_code=403,
                 detail="No tienes acceso a este proyecto"
             )
+        
+        if base_execution_id:
+            base_execution = upload_service.get_execution_by_id(base_execution_id)
+            if not base_execution or base_execution.projectId != project_id:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"La ejecución {base_execution_id} no existe en el proyecto {project_id}"
+                )
 
-        # Procesar múltiples archivos
-        execution_id, metadatas = upload_service.upload_multiple_files(
-            files=files,
-            project_id=project_id,
-            period=period,
-            user_id=user.id,
-            user_name=user.name,
-            test_type=test_type
+        # Un reintento con la misma Idempotency-Key recibe la respuesta original
+        fingerprint = None
+        if idempotency_key:
+            fingerprint = request_fingerprint(
+                project_id, period, test_type, pipeline, base_execution_id, upload_service.upload_signature(files)
+            )
+            replayed = await idempotency_service.begin("upload", user.id, idempotency_key, fingerprint)
+            if replayed is not None:
+                response.headers["Idempotent-Replayed"] = "true"
+                return UploadResponse(**replayed)
+        
+        try:
+            result = None
+            if not idempotency_key:
+                # Sin clave: los mismos archivos subidos hace poco reutilizan su ejecución
+                result = await run_in_threadpool(
+                    _find_duplicate_upload, files, project_id, period, user.id, test_type
+                )
+                if result is not None:
+                    response.headers["Idempotent-Replayed"] = "true"
+            if result is None:
+                result = await _create_upload(
+                    files, project_id, project.name, period, user, test_type, pipeline, base_execution_id
+                )
+        except BaseException:
+            if idempotency_key:
+                idempotency_service.abandon("upload", user.id, idempotency_key)
+            raise
+        
+        if idempotency_key:
+            idempotency_service.complete("upload", user.id, idempotency_key, fingerprint, result.dict())
+        return result
+        
+    except HTTPException:
+        raise
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error interno del servidor: {str(e)}"
         )
+
+@router.post("/bulk-upload", response_model=BulkImportReport, status_code=202)
+async def bulk_upload_files(
+    response: Response,
+    files: List[UploadFile] = File(...),
+    periods: List[str] = Form(..., description="Período de cada archivo, en el mismo orden que los archivos"),
+    project_id: str = Form(...),
+    test_type: str = Form("libro_diario_import"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Importar varios períodos de un proyecto en una sola petición.
+
+    Se crea una ejecución por período con sus archivos, y cada una recorre el
+    pipeline (lectura, validación y conversión) en paralelo con las demás,
+    dentro de los límites de procesos y memoria. El avance agregado se
+    consulta en ``/bulk/{bulk_id}``.
+
+    Un reintento con la misma cabecera ``Idempotency-Key`` devuelve el
+    informe actual del lote original en lugar de crear otro.
+    """
+    try:
+        if not files or len(files) == 0:
+            raise HTTPException(
+                status_code=400,
+                detail="Debe enviar al menos un archivo"
+            )
+        
+        try:
+            groups = group_files_by_period(files, periods)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Crear registro en historial
-        upload_service.create_execution_record(
-            execution_id=execution_id,
-            metadatas=metadatas,
-            project_name=project.name
+        # Validar proyecto
+        project = project_service.get_project_by_id(project_id)
+        if not project:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Proyecto {project_id} no encontrado"
+            )
+        
+        # Obtener usuario actual
+        user = user_service.get_current_user()
+        if not user:
+            raise HTTPException(
+                status_code=404,
+                detail="Usuario no encontrado"
+            )
+        
+        # Verificar que el usuario tiene acceso al proyecto
+        if project_id not in user.projects:
+            raise HTTPException(
+                status_code=403,
+                detail="No tienes acceso a este proyecto"
+            )
+        
+        fingerprint = None
+        if idempotency_key:
+            fingerprint = request_fingerprint(
+                project_id, test_type, periods, upload_service.upload_signature(files)
+            )
+            replayed = await idempotency_service.begin("bulk-upload", user.id, idempotency_key, fingerprint)
+            if replayed is not None:
+                response.headers["Idempotent-Replayed"] = "true"
+                return bulk_import_service.get_report(replayed["bulkId"])
+        
+        try:
+            # Rechazar el lote completo antes de guardar nada si la cola no lo admite
+            bulk_import_service.check_capacity(groups)
+            
+            bulk = await run_in_threadpool(
+                bulk_import_service.create_bulk,
+                groups=groups,
+                project_id=project_id,
+                project_name=project.name,
+                user_id=user.id,
+                user_name=user.name,
+                test_type=test_type
+            )
+        except BaseException:
+            if idempotency_key:
+                idempotency_service.abandon("bulk-upload", user.id, idempotency_key)
+            raise
+        
+        if idempotency_key:
+            idempotency_service.complete("bulk-upload", user.id, idempotency_key, fingerprint, {"bulkId": bulk.bulkId})
+        return bulk_import_service.get_report(bulk.bulkId)
+        
+    except HTTPException:
+        raise
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error interno del servidor: {str(e)}"
         )
+
+@router.get("/bulk/{bulk_id}", response_model=BulkImportReport)
+async def get_bulk_import_report(bulk_id: str):
+    """Informe agregado de una importación masiva: estado por período y totales"""
+    report = bulk_import_service.get_report(bulk_id)
+    if not report:
+        raise HTTPException(
+            status_code=404,
+            detail="Importación masiva no encontrada"
+        )
+    return report
+
+@router.post("/bulk/{bulk_id}/cancel", response_model=BulkImportReport, status_code=202)
+async def cancel_bulk_import(bulk_id: str):
+    """Cancelar los trabajos pendientes o en curso de todos los períodos del lote"""
+    cancelled = bulk_import_service.cancel_bulk(bulk_id)
+    if cancelled is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Importación masiva no encontrada"
+        )
+    return bulk_import_service.get_report(bulk_id)
+
+@router.post("/execution/{execution_id}/files", response_model=AppendFilesResponse)
+async def append_execution_files(
+    execution_id: str,
+    files: List[UploadFile] = File(...),
+    pipeline: bool = Form(False)
+):
+    """Añadir archivos BKPF/BSEG a una ejecución existente.
+
+    Permite entregar un extracto SAP grande por partes sin reenviar lo ya
+    subido: solo se escriben los archivos nuevos, y los que ya están en la
+    ejecución con el mismo contenido se omiten. Las lecturas y validaciones
+    de los archivos anteriores se reutilizan; la ejecución vuelve a quedar
+    pendiente de validar y, al convertirla, se parte del libro ya fusionado.
+    Con ``pipeline`` se lanzan de nuevo lectura, validación y conversión.
+    """
+    try:
+        if not files or len(files) == 0:
+            raise HTTPException(
+                status_code=400,
+                detail="Debe enviar al menos un archivo"
+            )
+        
+        execution = upload_service.get_execution_by_id(execution_id)
+        if not execution:
+            raise HTTPException(
+                status_code=404,
+                detail="Ejecución no encontrada"
+            )
         
-        # Retornar información del primer archivo (o un resumen)
-        primary_metadata = metadatas[0] if metadatas else None
+        # Obtener usuario actual
+        user = user_service.get_current_user()
+        if not user:
+            raise HTTPException(
+                status_code=404,
+                detail="Usuario no encontrado"
+            )
+        
+        # Verificar que el usuario tiene acceso al proyecto
+        if execution.projectId not in user.projects:
+            raise HTTPException(
+                status_code=403,
+                detail="No tienes acceso a este proyecto"
+            )
+        
+        # No cambiar los archivos mientras un trabajo los está leyendo
+        if any(job.status in (JobStatus.QUEUED, JobStatus.RUNNING) for job in job_service.store.list_jobs(execution_id)):
+            raise HTTPException(
+                status_code=409,
+                detail="La ejecución tiene trabajos en curso; espera a que terminen o cancélalos"
+            )
+        
+        pipeline_jobs = []
+        
+        def start_parse(metadata):
+            job = pipeline_service.on_file_uploaded(metadata)
+            if job:
+                pipeline_jobs.append(job.jobId)
+        
+        added, skipped, metadatas = await run_in_threadpool(
+            upload_service.append_files,
+            execution_id,
+            files,
+            on_file_saved=start_parse if pipeline else None
+        )
         
-        return UploadResponse(
+        message = f"{len(added)} archivo(s) añadido(s) a la ejecución"
+        if skipped:
+            message += f"; {len(skipped)} ya estaba(n) en la ejecución"
+        if pipeline and added:
+            try:
+                pipeline_jobs.append(pipeline_service.start(execution_id).jobId)
+                message += "; validación y conversión en curso"
+            except AdmissionRejected as e:
+                message += f"; no se pudo iniciar el pipeline: {e.message}"
+        
+        return AppendFilesResponse(
             executionId=execution_id,
             success=True,
-            message=f"{len(files)} archivo(s) subido(s) correctamente",
-            metadata=primary_metadata
+            message=message,
+            addedFiles=added,
+            skippedFiles=skipped,
+            fileCount=len(metadatas),
+            pipelineJobs=pipeline_jobs
         )
         
     except HTTPException:
@@ -95,11 +481,18 @@ async def upload_files(
             detail=f"Error interno del servidor: {str(e)}"
         )
 
-@router.post("/validate/{execution_id}", response_model=ValidationResponse)
-async def validate_files(execution_id: str):
-    """Validar archivos subidos"""
+@router.post("/quick-check/{execution_id}", response_model=QuickCheckResponse)
+async def quick_check_files(
+    execution_id: str,
+    sample_size: Optional[int] = Query(None, ge=10, le=20000, description="Número de filas a muestrear por archivo"),
+    strategy: SamplingStrategy = Query(SamplingStrategy.STRATIFIED, description="Muestreo aleatorio o estratificado")
+):
+    """Pre-validación rápida por muestreo de los archivos subidos.
+
+    No modifica el estado de la ejecución: solo estima tasas de error para
+    avisar de exportaciones defectuosas antes de la validación completa.
+    """
     try:
-        # Obtener metadatas de todos los archivos
         metadatas = upload_service.get_metadatas_by_execution_id(execution_id)
         if not metadatas:
             raise HTTPException(
@@ -107,132 +500,236 @@ async def validate_files(execution_id: str):
                 detail="Ejecución no encontrada"
             )
         
-        # Actualizar estado a procesando
-        upload_service.update_execution_status(
-            execution_id, 
-            ExecutionStatus.PROCESSING
+        results = await run_in_threadpool(
+            validation_service.quick_check_files,
+            metadatas,
+            sample_size=sample_size,
+            strategy=strategy
         )
+        has_issues = any(r.status.value != "ok" for r in results)
         
-        # Realizar validación de todos los archivos
-        validation_results = validation_service.validate_files(metadatas)
+        return QuickCheckResponse(
+            executionId=execution_id,
+            success=True,
+            message="Posibles errores detectados en la muestra" if has_issues else "Muestra sin errores",
+            results=results,
+            hasIssues=has_issues
+        )
         
-        # Determinar si se puede proceder
-        can_proceed = validation_service.can_proceed_to_conversion(validation_results)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error durante la pre-validación: {str(e)}"
+        )
+
+@router.post(
+    "/validate/{execution_id}",
+    response_model=JobSubmissionResponse,
+    status_code=202,
+    responses={200: {"model": ValidationResponse, "description": "Resultado de la validación (con wait=true)"}}
+)
+async def validate_files(
+    execution_id: str,
+    request: Request,
+    fail_fast: bool = Query(False, description="Detener la validación al primer bloque con errores"),
+    max_errors: Optional[int] = Query(None, ge=1, description="Número máximo de errores antes de detenerse"),
+    max_error_rate: Optional[float] = Query(None, gt=0, le=1, description="Tasa máxima de errores por fila (0-1)"),
+    priority: Optional[JobPriority] = Query(None, description="Prioridad en la cola (por defecto interactiva)"),
+    wait: bool = Query(False, description="Esperar al resultado y responder con ValidationResponse, como antes de los trabajos en segundo plano")
+):
+    """Encolar la validación de los archivos subidos.
+
+    Sin parámetros se realiza la validación completa (auditoría final). Con
+    ``fail_fast`` o un presupuesto de errores se obtiene un veredicto rápido
+    sobre archivos defectuosos con cobertura parcial. La validación se ejecuta
+    en segundo plano: el avance se consulta en ``/status/{execution_id}`` y el
+    resultado (ValidationResponse) en ``/jobs/{job_id}``. Con ``wait=true``
+    la petición espera y responde directamente con el ValidationResponse.
+    """
+    try:
+        job = await run_in_threadpool(
+            _start_job,
+            JobType.VALIDATION,
+            execution_id,
+            {"fail_fast": fail_fast, "max_errors": max_errors, "max_error_rate": max_error_rate},
+            priority
+        )
+        if wait:
+            return await _wait_for_job(job, request, "validación")
         
-        # Actualizar estado según resultado
-        has_errors = any(v.status.value == "error" for v in validation_results)
-        has_warnings = any(v.status.value == "warning" for v in validation_results)
+        return JobSubmissionResponse(
+            executionId=execution_id,
+            jobId=job.jobId,
+            success=True,
+            message=f"Validación encolada (posición {job.queuePosition})" if job.queuePosition else "Validación encolada",
+            job=job
+        )
         
-        if has_errors:
-            upload_service.update_execution_status(
-                execution_id, 
-                ExecutionStatus.ERROR,
-                "Errores encontrados en la validación"
-            )
-        elif has_warnings:
-            upload_service.update_execution_status(
-                execution_id, 
-                ExecutionStatus.WARNING
-            )
-        else:
-            upload_service.update_execution_status(
-                execution_id, 
-                ExecutionStatus.SUCCESS
-            )
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
+    except Exception as e:
+        await run_in_threadpool(
+            upload_service.update_execution_status,
+            execution_id, 
+            ExecutionStatus.ERROR,
+            str(e)
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error durante la validación: {str(e)}"
+        )
+
+@router.post(
+    "/convert/{execution_id}",
+    response_model=JobSubmissionResponse,
+    status_code=202,
+    responses={200: {"model": ConversionResponse, "description": "Resultado de la conversión (con wait=true)"}}
+)
+async def convert_files(
+    execution_id: str,
+    request: Request,
+    priority: Optional[JobPriority] = Query(None, description="Prioridad en la cola (por defecto masiva)"),
+    delta: bool = Query(True, description="Partir de la versión anterior y fusionar solo los archivos modificados"),
+    wait: bool = Query(False, description="Esperar al resultado y responder con ConversionResponse, como antes de los trabajos en segundo plano")
+):
+    """Encolar la conversión a formato estándar con merge de BKPF/BSEG.
+
+    El resultado (ConversionResponse) se obtiene en ``/jobs/{job_id}``; con
+    ``wait=true`` la petición espera y responde directamente con él.
+    """
+    try:
+        job = await run_in_threadpool(_start_job, JobType.CONVERSION, execution_id, {"delta": delta}, priority)
+        if wait:
+            return await _wait_for_job(job, request, "conversión")
         
-        return ValidationResponse(
+        return JobSubmissionResponse(
             executionId=execution_id,
+            jobId=job.jobId,
             success=True,
-            message="Validación completada",
-            validations=validation_results,
-            canProceed=can_proceed
+            message=f"Conversión encolada (posición {job.queuePosition})" if job.queuePosition else "Conversión encolada",
+            job=job
         )
         
     except HTTPException:
         raise
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
     except Exception as e:
-        upload_service.update_execution_status(
+        await run_in_threadpool(
+            upload_service.update_execution_status,
             execution_id, 
             ExecutionStatus.ERROR,
             str(e)
         )
         raise HTTPException(
             status_code=500,
-            detail=f"Error durante la validación: {str(e)}"
+            detail=f"Error durante la conversión: {str(e)}"
         )
 
-@router.post("/convert/{execution_id}", response_model=ConversionResponse)
-async def convert_files(execution_id: str):
-    """Convertir archivos a formato estándar con merge de BKPF/BSEG"""
+@router.post("/cancel/{execution_id}", response_model=CancelResponse, status_code=202)
+async def cancel_execution(execution_id: str):
+    """Cancelar la validación o conversión en curso de una ejecución.
+
+    Los trabajos se detienen en su siguiente punto de cancelación (entre
+    bloques de lectura, reglas de validación y filas del merge); la ejecución
+    queda con estado ``cancelled`` y se eliminan los archivos convertidos a medias.
+    """
     try:
-        # Obtener metadatas
-        metadatas = upload_service.get_metadatas_by_execution_id(execution_id)
+        metadatas = await run_in_threadpool(upload_service.get_metadatas_by_execution_id, execution_id)
         if not metadatas:
             raise HTTPException(
                 status_code=404,
                 detail="Ejecución no encontrada"
             )
         
-        # Actualizar estado a procesando
-        upload_service.update_execution_status(
-            execution_id, 
-            ExecutionStatus.PROCESSING
-        )
-        
-        # Realizar conversión con merge de archivos SAP
-        conversion_results = conversion_service.convert_files_with_merge(metadatas)
-        
-        success_count = sum(1 for result in conversion_results if result["success"])
-        
-        if success_count > 0:
-            # URLs de descarga
-            download_urls = []
-            converted_files = []
-            
-            for result in conversion_results:
-                if result["success"]:
-                    converted_files.append(result["filename"])
-                    download_urls.append(conversion_service.get_download_url(result["filename"]))
-            
-            upload_service.update_execution_status(
-                execution_id, 
-                ExecutionStatus.SUCCESS
-            )
-            
-            return ConversionResponse(
-                executionId=execution_id,
-                success=True,
-                message=f"Conversión completada exitosamente - {success_count} archivo(s) procesado(s)",
-                convertedFiles=converted_files,
-                downloadUrls=download_urls
-            )
-        else:
-            upload_service.update_execution_status(
-                execution_id, 
-                ExecutionStatus.ERROR,
-                "Error durante la conversión de todos los archivos"
-            )
+        jobs = await run_in_threadpool(job_service.cancel_execution, execution_id)
+        if not jobs:
             raise HTTPException(
-                status_code=500,
-                detail="Error durante la conversión"
+                status_code=409,
+                detail="La ejecución no tiene trabajos en curso"
             )
         
+        return CancelResponse(
+            executionId=execution_id,
+            success=True,
+            message=f"Cancelación solicitada para {len(jobs)} trabajo(s)",
+            jobs=jobs
+        )
+        
     except HTTPException:
         raise
     except Exception as e:
-        upload_service.update_execution_status(
-            execution_id, 
-            ExecutionStatus.ERROR,
-            str(e)
-        )
         raise HTTPException(
             status_code=500,
-            detail=f"Error durante la conversión: {str(e)}"
+            detail=f"Error cancelando la ejecución: {str(e)}"
         )
 
+@router.get("/jobs/{job_id}", response_model=ImportJob)
+async def get_job(job_id: str):
+    """Obtener estado, progreso y resultado de un trabajo"""
+    job = job_service.get_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail="Trabajo no encontrado"
+        )
+    # El resultado puede incluir informes de validación extensos
+    return FastJSONResponse(job)
+
+@router.get("/events/{execution_id}")
+async def stream_execution_events(
+    execution_id: str,
+    request: Request,
+    last_event_id: Optional[str] = Header(None)
+):
+    """Stream SSE con las etapas de una ejecución.
+
+    Emite las transiciones de subida, lectura, fases de validación 1-4, merge
+    y guardado con filas procesadas, throughput (filas/s) y ETA. Al reconectar,
+    la cabecera ``Last-Event-ID`` reanuda el stream tras el último evento recibido.
+    """
+    metadatas = upload_service.get_metadatas_by_execution_id(execution_id)
+    if not metadatas:
+        raise HTTPException(
+            status_code=404,
+            detail="Ejecución no encontrada"
+        )
+    
+    offset = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+    
+    def has_active_jobs() -> bool:
+        jobs = job_service.store.list_jobs(execution_id)
+        if any(job.status in (JobStatus.QUEUED, JobStatus.RUNNING) for job in jobs):
+            return True
+        # En modo pipeline la conversión se encola al terminar la validación
+        return pipeline_service.is_pending(execution_id)
+    
+    return StreamingResponse(
+        stream_progress_events(execution_id, offset, has_active_jobs, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/history", response_model=ImportHistoryResponse)
-async def get_import_history():
-    """Obtener historial de importaciones"""
+async def get_import_history(
+    limit: int = Query(IMPORT_HISTORY_PAGE_SIZE, ge=1, le=IMPORT_HISTORY_MAX_PAGE_SIZE, description="Ejecuciones por página"),
+    cursor: Optional[str] = Query(None, description="nextCursor de la página anterior"),
+    project_id: Optional[str] = Query(None),
+    period: Optional[str] = Query(None),
+    status: Optional[ExecutionStatus] = Query(None),
+    date_from: Optional[date] = Query(None, description="Ejecuciones desde este día (incluido)"),
+    date_to: Optional[date] = Query(None, description="Ejecuciones hasta este día (incluido)")
+):
+    """Obtener historial de importaciones, de la más reciente a la más antigua.
+
+    Paginado por cursor: si ``hasMore`` es true, se pide la página siguiente
+    con ``cursor=nextCursor`` y los mismos filtros. Los filtros se resuelven
+    con los índices del historial, así que el coste no crece con su tamaño.
+    """
     try:
         user = user_service.get_current_user()
         if not user:
@@ -242,26 +739,79 @@ async def get_import_history():
             )
         
         # Obtener historial (filtrado por usuario actual)
-        executions = upload_service.get_execution_history(user.id)
+        try:
+            executions, next_cursor = upload_service.query_execution_history(
+                user_id=user.id,
+                project_id=project_id,
+                period=period,
+                status=status,
+                date_from=date_from.isoformat() if date_from else None,
+                date_to=(date_to + timedelta(days=1)).isoformat() if date_to else None,
+                cursor=cursor,
+                limit=limit
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        return ImportHistoryResponse(
+        # Las ejecuciones ya son modelos validados: se serializan sin volver a validarlas
+        return FastJSONResponse(ImportHistoryResponse.construct(
             executions=executions,
             success=True,
-            message="Historial obtenido correctamente"
-        )
+            message="Historial obtenido correctamente",
+            nextCursor=next_cursor,
+            hasMore=next_cursor is not None
+        ))
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error obteniendo historial: {str(e)}"
         )
 
+@router.get("/summary", response_model=ImportSummaryResponse)
+async def get_import_summary(
+    project_id: Optional[str] = Query(None, description="Proyecto (por defecto, todos los del usuario)"),
+    period: Optional[str] = Query(None)
+):
+    """Resumen de importaciones por proyecto y período.
+
+    Recuento de ejecuciones por estado, filas importadas, bytes subidos y
+    última versión correcta. Se mantiene al cambiar cada ejecución, así que
+    no recorre el historial.
+    """
+    try:
+        user = user_service.get_current_user()
+        if not user:
+            raise HTTPException(
+                status_code=404,
+                detail="Usuario no encontrado"
+            )
+        
+        if project_id and project_id not in user.projects:
+            raise HTTPException(
+                status_code=403,
+                detail="No tienes acceso a este proyecto"
+            )
+        
+        summaries = upload_service.summary.get_summaries([project_id] if project_id else user.projects, period)
+        return ImportSummaryResponse(summaries=summaries)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error obteniendo resumen: {str(e)}"
+        )
+
 @router.get("/preview/{execution_id}")
 async def preview_converted_file(execution_id: str, filename: str):
     """Previsualizar archivo convertido"""
     try:
         # Obtener datos del archivo convertido
-        file_data = conversion_service.get_converted_file_data(execution_id, filename)
+        file_data = await run_in_threadpool(conversion_service.get_converted_file_data, execution_id, filename)
         
         if not file_data:
             raise HTTPException(
@@ -272,12 +822,12 @@ async def preview_converted_file(execution_id: str, filename: str):
         # Limitar a las primeras 10 filas para preview
         preview_data = file_data["data"][:10] if len(file_data["data"]) > 10 else file_data["data"]
         
-        return FilePreview(
+        return FastJSONResponse(FilePreview(
             fileName=filename,
             headers=file_data["headers"],
             rows=preview_data,
             totalRows=file_data["metadata"]["total_records"]
-        )
+        ))
         
     except HTTPException:
         raise
@@ -291,10 +841,7 @@ async def preview_converted_file(execution_id: str, filename: str):
 async def download_converted_file(filename: str):
     """Descargar archivo convertido"""
     try:
-        file_path = os.path.join(
-            conversion_service.converted_files_path, 
-            filename
-        )
+        file_path = conversion_service.converted_file_path(filename)
         
         if not os.path.exists(file_path):
             raise HTTPException(
@@ -327,11 +874,11 @@ async def get_execution_details(execution_id: str):
                 detail="Ejecución no encontrada"
             )
         
-        return {
+        return FastJSONResponse({
             "executionId": execution_id,
             "details": details,
             "success": True
-        }
+        })
         
     except HTTPException:
         raise
@@ -355,11 +902,17 @@ async def get_execution_status(execution_id: str):
         # Usar el primer metadata para el estado general
         primary_metadata = metadatas[0]
         
+        # El estado de la ejecución vive en el historial; el de las metadatas
+        # no se actualiza tras la subida
+        execution = upload_service.get_execution_by_id(execution_id)
+        job = job_service.get_latest_job(execution_id)
+        
         return {
             "executionId": execution_id,
-            "status": primary_metadata.status,
+            "status": execution.status if execution else primary_metadata.status,
             "version": primary_metadata.version,
             "fileCount": len(metadatas),
+            "job": job.dict(exclude={"result"}) if job else None,
             "success": True
         }
         
@@ -369,4 +922,22 @@ async def get_execution_status(execution_id: str):
         raise HTTPException(
             status_code=500,
             detail=f"Error obteniendo estado: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.get("/admission")
+async def get_admission_status():
+    """Ocupación de los endpoints pesados, del presupuesto de memoria y de la cola de trabajos"""
+    return {
+        **admission_controller.stats(),
+        "jobs": job_service.stats(),
+        "success": True
+    }
+
+@router.get("/queue")
+async def get_job_queue_metrics():
+    """Profundidad de la cola y tiempos de espera de los trabajos por proyecto"""
+    return {
+        **job_service.stats(),
+        "projects": job_service.queue_stats(),
+        "success": True
+    }
@@ -1,24 +1,28 @@
 # backend/app/routers/projects.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from typing import List
 from app.models.project import Project, ProjectsResponse
 from app.services.project_service import ProjectService
 from app.services.user_service import UserService
+from app.services.response_cache import response_cache, make_etag
 
 router = APIRouter()
 project_service = ProjectService()
 user_service = UserService()
 
 @router.get("/", response_model=ProjectsResponse)
-async def get_all_projects():
+async def get_all_projects(request: Request):
     """Obtener todos los proyectos disponibles"""
     try:
-        projects = project_service.get_all_projects()
-        
-        return ProjectsResponse(
-            projects=projects,
-            success=True,
-            message="Proyectos obtenidos correctamente"
+        return response_cache.respond(
+            request,
+            "projects:all",
+            make_etag("projects:all", project_service.data_version()),
+            lambda: ProjectsResponse(
+                projects=project_service.get_all_projects(),
+                success=True,
+                message="Proyectos obtenidos correctamente"
+            )
         )
     
     except Exception as e:
@@ -28,7 +32,7 @@ async def get_all_projects():
         )
 
 @router.get("/user/{user_id}", response_model=ProjectsResponse)
-async def get_projects_for_user(user_id: str):
+async def get_projects_for_user(user_id: str, request: Request):
     """Obtener proyectos disponibles para un usuario específico"""
     try:
         user = user_service.get_user_by_id(user_id)
@@ -39,12 +43,15 @@ async def get_projects_for_user(user_id: str):
                 detail=f"Usuario {user_id} no encontrado"
             )
         
-        projects = project_service.get_projects_for_user(user)
-        
-        return ProjectsResponse(
-            projects=projects,
-            success=True,
-            message=f"Proyectos para {user.name} obtenidos correctamente"
+        return response_cache.respond(
+            request,
+            f"projects:user:{user.id}",
+            make_etag("projects:user", user.id, user_service.data_version(), project_service.data_version()),
+            lambda: ProjectsResponse(
+                projects=project_service.get_projects_for_user(user),
+                success=True,
+                message=f"Proyectos para {user.name} obtenidos correctamente"
+            )
         )
     
     except Exception as e:
@@ -54,8 +61,12 @@ async def get_projects_for_user(user_id: str):
         )
 
 @router.get("/current-user", response_model=ProjectsResponse)
-async def get_projects_for_current_user():
-    """Obtener proyectos para el usuario actual"""
+async def get_projects_for_current_user(request: Request):
+    """Obtener proyectos para el usuario actual.
+
+    Responde con ETag; si el cliente envía If-None-Match con la versión
+    vigente se devuelve 304 sin cuerpo.
+    """
     try:
         user = user_service.get_current_user()
         
@@ -65,12 +76,15 @@ async def get_projects_for_current_user():
                 detail="Usuario actual no encontrado"
             )
         
-        projects = project_service.get_projects_for_user(user)
-        
-        return ProjectsResponse(
-            projects=projects,
-            success=True,
-            message=f"Proyectos para {user.name} obtenidos correctamente"
+        return response_cache.respond(
+            request,
+            f"projects:current:{user.id}",
+            make_etag("projects:current", user.id, user_service.data_version(), project_service.data_version()),
+            lambda: ProjectsResponse(
+                projects=project_service.get_projects_for_user(user),
+                success=True,
+                message=f"Proyectos para {user.name} obtenidos correctamente"
+            )
         )
     
     except Exception as e:
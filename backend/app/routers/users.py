@@ -1,15 +1,20 @@
 # Rutas de usuarios
 # backend/app/routers/users.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from app.models.user import UserResponse, UsersListResponse
 from app.services.user_service import UserService
+from app.services.response_cache import response_cache, make_etag
 
 router = APIRouter()
 user_service = UserService()
 
 @router.get("/current", response_model=UserResponse)
-async def get_current_user():
-    """Obtener información del usuario actual"""
+async def get_current_user(request: Request):
+    """Obtener información del usuario actual.
+
+    Responde con ETag; si el cliente envía If-None-Match con la versión
+    vigente se devuelve 304 sin cuerpo.
+    """
     try:
         user = user_service.get_current_user()
         
@@ -19,10 +24,15 @@ async def get_current_user():
                 detail="Usuario no encontrado"
             )
         
-        return UserResponse(
-            user=user,
-            success=True,
-            message="Usuario obtenido correctamente"
+        return response_cache.respond(
+            request,
+            f"users:current:{user.id}",
+            make_etag("users:current", user.id, user_service.data_version()),
+            lambda: UserResponse(
+                user=user,
+                success=True,
+                message="Usuario obtenido correctamente"
+            )
         )
     
     except Exception as e:
@@ -32,15 +42,18 @@ async def get_current_user():
         )
 
 @router.get("/all", response_model=UsersListResponse)
-async def get_all_users():
+async def get_all_users(request: Request):
     """Obtener todos los usuarios disponibles"""
     try:
-        users = user_service.get_all_users()
-        
-        return UsersListResponse(
-            users=users,
-            success=True,
-            message="Usuarios obtenidos correctamente"
+        return response_cache.respond(
+            request,
+            "users:all",
+            make_etag("users:all", user_service.data_version()),
+            lambda: UsersListResponse(
+                users=user_service.get_all_users(),
+                success=True,
+                message="Usuarios obtenidos correctamente"
+            )
         )
     
     except Exception as e:
@@ -50,7 +63,7 @@ async def get_all_users():
         )
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user_by_id(user_id: str):
+async def get_user_by_id(user_id: str, request: Request):
     """Obtener información de un usuario específico"""
     try:
         user = user_service.get_user_by_id(user_id)
@@ -61,10 +74,15 @@ async def get_user_by_id(user_id: str):
                 detail=f"Usuario {user_id} no encontrado"
             )
         
-        return UserResponse(
-            user=user,
-            success=True,
-            message="Usuario obtenido correctamente"
+        return response_cache.respond(
+            request,
+            f"users:{user_id}",
+            make_etag("users", user_id, user_service.data_version()),
+            lambda: UserResponse(
+                user=user,
+                success=True,
+                message="Usuario obtenido correctamente"
+            )
         )
     
     except Exception as e:
@@ -0,0 +1,362 @@
+# backend/app/services/admission_service.py
+import os
+import re
+import math
+import time
+import asyncio
+import itertools
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, Callable, List, Deque
+from urllib.parse import parse_qs
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from app.config.settings import (
+    IMPORT_MEMORY_BUDGET_MB, IMPORT_MEMORY_PER_FILE_BYTE, IMPORT_MIN_FREE_MEMORY_MB,
+    ADMISSION_UPLOAD_CONCURRENCY, ADMISSION_QUICK_CHECK_CONCURRENCY, ADMISSION_PREVIEW_CONCURRENCY,
+    ADMISSION_QUEUE_LIMIT, ADMISSION_QUEUE_TIMEOUT, ADMISSION_DEFAULT_RETRY_AFTER,
+    QUICK_CHECK_FULL_SCAN_BYTES
+)
+from app.services.storage import atomic_write_json, read_json, locked, process_alive
+
+MB = 1024 * 1024
+# Tope del Retry-After (segundos) que se sugiere al cliente
+MAX_RETRY_AFTER = 300
+
+
+class AdmissionRejected(Exception):
+    """Petición rechazada por falta de capacidad; se responde 429 con Retry-After"""
+
+    def __init__(self, message: str, retry_after: int, queue_depth: int = 0):
+        super().__init__(message)
+        self.message = message
+        self.retry_after = retry_after
+        self.queue_depth = queue_depth
+
+
+def estimate_retry_after(avg_duration: Optional[float], ahead: int, parallel: int) -> int:
+    """Segundos hasta que previsiblemente quede hueco, según la duración media"""
+    if avg_duration is None:
+        return ADMISSION_DEFAULT_RETRY_AFTER
+    seconds = math.ceil(avg_duration * (ahead + 1) / max(parallel, 1))
+    return min(max(seconds, 1), MAX_RETRY_AFTER)
+
+
+def available_system_memory() -> Optional[int]:
+    """Memoria disponible del sistema en bytes (None si no se puede leer)"""
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class MemoryReservations:
+    """Reservas de memoria compartidas por todos los procesos de la API.
+
+    Con varios workers de gunicorn el presupuesto tiene que ser uno solo: las
+    reservas se guardan en un archivo JSON que se modifica bajo ``locked()``.
+    Cada entrada lleva el PID de su proceso y las de procesos que ya no
+    existen (p. ej. un worker reiniciado) se descartan.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        # Crear directorio si no existe
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def _key(self, key: str) -> str:
+        return f"{os.getpid()}:{key}"
+
+    def _live_entries(self) -> Dict[str, Dict[str, int]]:
+        entries = read_json(self.path, {}) or {}
+        alive: Dict[int, bool] = {}
+        live = {}
+        for key, entry in entries.items():
+            pid = entry.get("pid")
+            if pid not in alive:
+                alive[pid] = process_alive(pid)
+            if alive[pid]:
+                live[key] = entry
+        return live
+
+    def _save(self, entries: Dict[str, Dict[str, int]]) -> None:
+        # Estado efímero: tras un corte de luz no queda ningún proceso con reservas
+        atomic_write_json(self.path, entries, indent=None, fsync=False)
+
+    def total(self) -> int:
+        return sum(entry["bytes"] for entry in self._live_entries().values())
+
+    def try_reserve(self, key: str, nbytes: int, fits: Callable[[int, int], bool]) -> bool:
+        """Reservar ``nbytes`` si ``fits(reservado, nbytes)`` con lo reservado por todos los procesos"""
+        with locked(self.path):
+            entries = self._live_entries()
+            if not fits(sum(entry["bytes"] for entry in entries.values()), nbytes):
+                return False
+            entries[self._key(key)] = {"pid": os.getpid(), "bytes": nbytes}
+            self._save(entries)
+            return True
+
+    def release(self, key: str) -> bool:
+        with locked(self.path):
+            entries = self._live_entries()
+            if entries.pop(self._key(key), None) is None:
+                return False
+            self._save(entries)
+            return True
+
+
+class EndpointSlots:
+    """Plazas de ejecución y cola de espera FIFO de un endpoint pesado"""
+
+    def __init__(self, name: str, limit: int, queue_limit: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.queue_limit = max(0, queue_limit)
+        self.active = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.avg_duration: Optional[float] = None
+        self.admitted = 0
+        self.rejected = 0
+
+    def record_duration(self, seconds: float) -> None:
+        # Media exponencial: se adapta al tamaño de los archivos del momento
+        self.avg_duration = seconds if self.avg_duration is None else 0.8 * self.avg_duration + 0.2 * seconds
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "limit": self.limit,
+            "waiting": len(self.waiters),
+            "queueLimit": self.queue_limit,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avgDurationSeconds": round(self.avg_duration, 3) if self.avg_duration is not None else None
+        }
+
+
+class AdmissionController:
+    """Control de admisión de los endpoints pesados de /api/import.
+
+    Cada endpoint pesado tiene un límite de peticiones simultáneas y una cola
+    de espera FIFO acotada; con la cola llena, o si la espera supera
+    ADMISSION_QUEUE_TIMEOUT, se responde 429 con Retry-After.
+
+    Además hay un presupuesto de memoria compartido con los trabajos de
+    validación y conversión: cada petición o trabajo reserva una estimación
+    de lo que va a cargar. Las peticiones que no caben se rechazan; los
+    trabajos esperan en su cola. Lo que por sí solo supera el presupuesto se
+    admite cuando no hay nada más reservado, para que no quede bloqueado.
+    El presupuesto es uno para todos los workers de la API
+    (MemoryReservations); las plazas y colas por endpoint son de cada worker.
+
+    Los endpoints ligeros (historial, estado, eventos...) no pasan por aquí.
+    """
+
+    def __init__(
+        self,
+        memory_budget_bytes: int = IMPORT_MEMORY_BUDGET_MB * MB,
+        limits: Optional[Dict[str, int]] = None,
+        queue_limit: int = ADMISSION_QUEUE_LIMIT,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+        min_free_memory_bytes: int = IMPORT_MIN_FREE_MEMORY_MB * MB,
+        reservations_file: Optional[str] = None
+    ):
+        self.memory_budget = memory_budget_bytes
+        self.queue_timeout = queue_timeout
+        self.min_free_memory = min_free_memory_bytes
+        limits = limits or {
+            "upload": ADMISSION_UPLOAD_CONCURRENCY,
+            "quick_check": ADMISSION_QUICK_CHECK_CONCURRENCY,
+            "preview": ADMISSION_PREVIEW_CONCURRENCY
+        }
+        self.slots = {name: EndpointSlots(name, limit, queue_limit) for name, limit in limits.items()}
+        self._reservations = MemoryReservations(reservations_file or os.path.join(
+            os.path.dirname(__file__), '..', 'storage', 'admission', 'memory_reservations.json'
+        ))
+        self._release_listeners: List[Callable[[], None]] = []
+        self._keys = itertools.count()
+
+    # --- Presupuesto de memoria (compartido con los trabajos) ---
+
+    @property
+    def reserved_memory(self) -> int:
+        return self._reservations.total()
+
+    def _fits(self, reserved: int, nbytes: int) -> bool:
+        if not reserved:
+            return True
+        if reserved + nbytes > self.memory_budget:
+            return False
+        available = available_system_memory()
+        return available is None or available - nbytes >= self.min_free_memory
+
+    def can_reserve(self, nbytes: int) -> bool:
+        return self._fits(self._reservations.total(), nbytes)
+
+    def try_reserve(self, key: str, nbytes: int) -> bool:
+        """Reservar memoria para una petición o trabajo si cabe en el presupuesto"""
+        return self._reservations.try_reserve(key, nbytes, self._fits)
+
+    def release(self, key: str) -> None:
+        if not self._reservations.release(key):
+            return
+        for listener in list(self._release_listeners):
+            try:
+                listener()
+            except Exception as e:
+                print(f"⚠️ Error in admission listener: {str(e)}")
+
+    def add_release_listener(self, listener: Callable[[], None]) -> None:
+        """Avisar cuando se libera memoria (p. ej. para lanzar trabajos en espera)"""
+        self._release_listeners.append(listener)
+
+    # --- Plazas por endpoint ---
+
+    def retry_after(self, endpoint: str) -> int:
+        slots = self.slots[endpoint]
+        return estimate_retry_after(slots.avg_duration, len(slots.waiters), slots.limit)
+
+    def _reject(self, slots: EndpointSlots, message: str) -> AdmissionRejected:
+        slots.rejected += 1
+        print(f"🚦 Rejected {slots.name} request: {message}")
+        return AdmissionRejected(message, self.retry_after(slots.name), len(slots.waiters))
+
+    async def _acquire_slot(self, slots: EndpointSlots) -> None:
+        if slots.active < slots.limit and not slots.waiters:
+            slots.active += 1
+            return
+        if len(slots.waiters) >= slots.queue_limit:
+            raise self._reject(slots, "Demasiadas peticiones en curso; inténtalo más tarde")
+
+        waiter = asyncio.get_running_loop().create_future()
+        slots.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # El turno llegó justo al expirar: cederlo al siguiente
+                self._release_slot(slots)
+            else:
+                try:
+                    slots.waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject(slots, "Tiempo de espera en cola agotado; inténtalo más tarde")
+            raise
+
+    def _release_slot(self, slots: EndpointSlots) -> None:
+        # La plaza pasa directamente al primero de la cola
+        while slots.waiters:
+            waiter = slots.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        slots.active -= 1
+
+    @asynccontextmanager
+    async def admit(self, endpoint: str, memory_bytes: int = 0):
+        """Esperar plaza en el endpoint y reservar memoria durante la petición"""
+        slots = self.slots[endpoint]
+        # Sin memoria no tiene sentido hacer cola: rechazar de inmediato.
+        # Las reservas están en disco: se consultan fuera del bucle de eventos
+        if not await run_in_threadpool(self.can_reserve, memory_bytes):
+            raise self._reject(slots, "Memoria insuficiente para atender la petición; inténtalo más tarde")
+
+        await self._acquire_slot(slots)
+        key = f"{endpoint}:{next(self._keys)}"
+        if not await run_in_threadpool(self.try_reserve, key, memory_bytes):
+            self._release_slot(slots)
+            raise self._reject(slots, "Memoria insuficiente para atender la petición; inténtalo más tarde")
+
+        slots.admitted += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            slots.record_duration(time.monotonic() - started)
+            self._release_slot(slots)
+            await run_in_threadpool(self.release, key)
+
+    def stats(self) -> Dict[str, Any]:
+        available = available_system_memory()
+        return {
+            "memoryBudgetMb": round(self.memory_budget / MB, 1),
+            "memoryReservedMb": round(self.reserved_memory / MB, 1),
+            "systemAvailableMb": round(available / MB, 1) if available is not None else None,
+            "endpoints": {name: slots.stats() for name, slots in self.slots.items()}
+        }
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI que aplica el control de admisión antes de leer el cuerpo.
+
+    Así una subida rechazada no llega a transferirse ni a ocupar disco, y las
+    peticiones en espera no ocupan hilos del servidor.
+    """
+
+    ROUTES = (
+        ("POST", re.compile(r"^/api/import/upload/?$"), "upload"),
+        ("POST", re.compile(r"^/api/import/bulk-upload/?$"), "upload"),
+        ("POST", re.compile(r"^/api/import/execution/[^/]+/files/?$"), "upload"),
+        ("POST", re.compile(r"^/api/import/quick-check/[^/]+/?$"), "quick_check"),
+        ("GET", re.compile(r"^/api/import/preview/[^/]+/?$"), "preview"),
+    )
+
+    def __init__(self, app, controller: AdmissionController, converted_file_path: Callable[[str], str]):
+        self.app = app
+        self.controller = controller
+        # Nombre de un archivo convertido → su ruta en disco
+        self.converted_file_path = converted_file_path
+
+    def _match(self, scope) -> Optional[str]:
+        for method, pattern, endpoint in self.ROUTES:
+            if scope["method"] == method and pattern.match(scope["path"]):
+                return endpoint
+        return None
+
+    def _estimate_memory(self, endpoint: str, scope) -> int:
+        if endpoint == "upload":
+            headers = dict(scope["headers"])
+            try:
+                return int(headers.get(b"content-length", b"0"))
+            except ValueError:
+                return 0
+        if endpoint == "quick_check":
+            # Muestreo o, en archivos pequeños, lectura completa
+            return int(QUICK_CHECK_FULL_SCAN_BYTES * IMPORT_MEMORY_PER_FILE_BYTE)
+        if endpoint == "preview":
+            # La previsualización carga el JSON convertido completo
+            filename = parse_qs(scope["query_string"].decode("latin-1")).get("filename", [""])[0]
+            try:
+                return int(os.path.getsize(self.converted_file_path(filename)) * IMPORT_MEMORY_PER_FILE_BYTE)
+            except (OSError, ValueError):
+                return 0
+        return 0
+
+    async def __call__(self, scope, receive, send):
+        endpoint = self._match(scope) if scope["type"] == "http" else None
+        if endpoint is None:
+            await self.app(scope, receive, send)
+            return
+
+        admission = self.controller.admit(endpoint, self._estimate_memory(endpoint, scope))
+        try:
+            await admission.__aenter__()
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": e.message, "retryAfter": e.retry_after, "queueDepth": e.queue_depth},
+                headers={"Retry-After": str(e.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await admission.__aexit__(None, None, None)
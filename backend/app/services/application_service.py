@@ -2,9 +2,10 @@
 # backend/app/services/application_service.py
 import json
 import os
-from typing import List
+from typing import List, Dict
 from app.models.application import Application
 from app.models.user import User
+from app.services.reference_data import reference_data, ReferenceData
 
 class ApplicationService:
     def __init__(self):
@@ -21,21 +22,35 @@ class ApplicationService:
         except json.JSONDecodeError:
             return []
     
+    def _applications(self) -> ReferenceData:
+        """Aplicaciones en caché; se vuelven a leer solo si cambia el archivo"""
+        return reference_data.get(self.data_file, self._load_applications_data)
+    
+    def _build_applications_index(self, applications_data: List[dict]) -> Dict[str, Application]:
+        """Índice ID de aplicación → aplicación, en el orden del archivo"""
+        return {app.id: app for app in (Application(**app_data) for app_data in applications_data)}
+    
+    def data_version(self) -> str:
+        """Versión de los datos de aplicaciones (cambia al modificarse el archivo)"""
+        return self._applications().version
+    
     def get_all_applications(self) -> List[Application]:
         """Obtener todas las aplicaciones disponibles"""
-        applications_data = self._load_applications_data()
-        return [Application(**app_data) for app_data in applications_data]
+        return list(self._applications().index("applications_by_id", self._build_applications_index).values())
     
     def get_applications_for_user(self, user: User) -> List[Application]:
         """Obtener aplicaciones filtradas según los permisos del usuario"""
-        all_applications = self.get_all_applications()
-        user_applications = []
+        applications = self._applications()
         
-        for app in all_applications:
-            if app.isActive and self._user_has_permission(user, app.permissionRequired):
-                user_applications.append(app)
+        def build(_):
+            return [
+                app for app in applications.index("applications_by_id", self._build_applications_index).values()
+                if app.isActive and self._user_has_permission(user, app.permissionRequired)
+            ]
         
-        return user_applications
+        # Índice por permisos: sigue siendo válido si cambia el usuario
+        permissions = tuple(sorted(user.permissions.dict().items()))
+        return list(applications.index(("for_user", permissions), build))
     
     def _user_has_permission(self, user: User, permission_required: str) -> bool:
         """Verificar si el usuario tiene el permiso requerido"""
@@ -46,10 +61,4 @@ class ApplicationService:
     
     def get_application_by_id(self, app_id: str) -> Application:
         """Obtener una aplicación específica por ID"""
-        applications = self.get_all_applications()
-        
-        for app in applications:
-            if app.id == app_id:
-                return app
-        
-        return None
\ No newline at end of file
+        return self._applications().index("applications_by_id", self._build_applications_index).get(app_id)
\ No newline at end of file
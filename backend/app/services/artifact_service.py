@@ -0,0 +1,160 @@
+# backend/app/services/artifact_service.py
+import os
+import json
+import pickle
+import shutil
+import hashlib
+from datetime import datetime
+from typing import Optional, Any, List, Dict, Tuple
+from app.config.settings import IMPORT_ARTIFACT_CACHE
+from app.models.import_models import FileMetadata
+from app.services.storage import atomic_write_bytes, temp_path
+
+# Cambiar al modificar el formato de los artefactos o la lógica que los genera
+ARTIFACT_FORMAT_VERSION = "1"
+
+
+def fingerprint(*parts: Any) -> str:
+    """Huella estable de las entradas de una etapa"""
+    digest = hashlib.sha1(ARTIFACT_FORMAT_VERSION.encode('utf-8'))
+    for part in parts:
+        digest.update(b"\0")
+        digest.update(str(part).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def input_fingerprint(metadata: FileMetadata) -> str:
+    """Huella de un archivo subido: ruta, tamaño y fecha de modificación"""
+    stat = os.stat(metadata.filePath)
+    return fingerprint(metadata.filePath, stat.st_size, stat.st_mtime_ns)
+
+
+def try_input_fingerprint(metadata: FileMetadata) -> Optional[str]:
+    """Huella del archivo subido, o None si no se puede leer (movido, borrado...)"""
+    try:
+        return input_fingerprint(metadata)
+    except OSError:
+        return None
+
+
+class ArtifactStore:
+    """Resultados intermedios de las etapas de una ejecución.
+
+    Cada artefacto se guarda en ``storage/artifacts/{execution_id}`` como
+    pickle junto a un manifiesto con la huella de sus entradas. Solo se
+    reutiliza si la huella coincide, así que al cambiar un archivo se
+    recalcula desde la etapa afectada y no desde el principio.
+    """
+
+    def __init__(self, execution_id: str, enabled: bool = IMPORT_ARTIFACT_CACHE):
+        self.execution_id = execution_id
+        self.enabled = enabled
+        self.storage_path = os.path.join(os.path.dirname(__file__), '..', 'storage')
+        self.artifacts_path = os.path.join(self.storage_path, 'artifacts', execution_id)
+
+    def _paths(self, name: str) -> Tuple[str, str]:
+        base = os.path.join(self.artifacts_path, name)
+        return f"{base}.pkl", f"{base}.json"
+
+    def _write_manifest(self, name: str, stage: str, fp: str, **extra: Any) -> None:
+        _, manifest_file = self._paths(name)
+        manifest = {
+            "name": name,
+            "stage": stage,
+            "fingerprint": fp,
+            "createdAt": datetime.now().isoformat(),
+            **extra
+        }
+        atomic_write_bytes(manifest_file, json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8'))
+
+    def manifest(self, name: str) -> Optional[Dict[str, Any]]:
+        _, manifest_file = self._paths(name)
+        try:
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def load(self, name: str, fp: str) -> Optional[Any]:
+        """Cargar un artefacto si existe y se generó con las mismas entradas"""
+        if not self.enabled:
+            return None
+        manifest = self.manifest(name)
+        if not manifest or manifest.get("fingerprint") != fp:
+            return None
+        data_file, _ = self._paths(name)
+        try:
+            with open(data_file, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as e:
+            print(f"⚠️ Discarding unreadable artifact {name}: {str(e)}")
+            return None
+        print(f"♻️ Reusing artifact {self.execution_id}/{name}")
+        return value
+
+    def save(self, name: str, fp: str, value: Any, stage: str, **extra: Any) -> None:
+        """Guardar un artefacto; un fallo de la caché no interrumpe la etapa.
+
+        ``extra`` se añade al manifiesto (p. ej. los archivos de entrada).
+        """
+        if not self.enabled:
+            return
+        try:
+            os.makedirs(self.artifacts_path, exist_ok=True)
+            data_file, _ = self._paths(name)
+            content = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            # Primero los datos y después el manifiesto: un manifiesto siempre
+            # describe datos completos
+            atomic_write_bytes(data_file, content)
+            self._write_manifest(name, stage, fp, sizeBytes=len(content), **extra)
+        except Exception as e:
+            print(f"⚠️ Error saving artifact {name}: {str(e)}")
+
+    def adopt(self, source: "ArtifactStore", source_name: str, name: str, fp: str, stage: str) -> None:
+        """Tomar un artefacto de otra ejecución sin volver a serializarlo (enlace o copia)"""
+        if not self.enabled:
+            return
+        source_file, _ = source._paths(source_name)
+        data_file, _ = self._paths(name)
+        try:
+            os.makedirs(self.artifacts_path, exist_ok=True)
+            tmp_path = temp_path(data_file)
+            try:
+                os.link(source_file, tmp_path)
+            except OSError:
+                shutil.copyfile(source_file, tmp_path)
+            os.replace(tmp_path, data_file)
+            self._write_manifest(name, stage, fp, sizeBytes=os.path.getsize(data_file))
+        except Exception as e:
+            print(f"⚠️ Error saving artifact {name}: {str(e)}")
+
+    def record_file(self, name: str, fp: str, path: str, stage: str, **extra: Any) -> None:
+        """Registrar como artefacto un archivo que la etapa ya guarda por su cuenta"""
+        if not self.enabled:
+            return
+        try:
+            os.makedirs(self.artifacts_path, exist_ok=True)
+            self._write_manifest(name, stage, fp, path=os.path.abspath(path), **extra)
+        except Exception as e:
+            print(f"⚠️ Error saving artifact {name}: {str(e)}")
+
+    def lookup_file(self, name: str, fp: str) -> Optional[str]:
+        """Ruta del archivo registrado si sigue existiendo y las entradas no cambiaron"""
+        if not self.enabled:
+            return None
+        manifest = self.manifest(name)
+        if not manifest or manifest.get("fingerprint") != fp:
+            return None
+        path = manifest.get("path")
+        return path if path and os.path.exists(path) else None
+
+    def list_artifacts(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.artifacts_path):
+            return []
+        manifests = []
+        for filename in sorted(os.listdir(self.artifacts_path)):
+            if filename.endswith('.json'):
+                manifest = self.manifest(filename[:-len('.json')])
+                if manifest:
+                    manifests.append(manifest)
+        return manifests
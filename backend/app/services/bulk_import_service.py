@@ -0,0 +1,266 @@
+# backend/app/services/bulk_import_service.py
+import os
+import json
+import uuid
+from datetime import datetime
+from typing import List, Optional, Dict, Tuple
+from fastapi import UploadFile
+from app.config.settings import IMPORT_BULK_MAX_PERIODS
+from app.models.import_models import (
+    BulkImport, BulkPeriod, BulkImportReport, BulkPeriodReport,
+    ExecutionStatus, ImportJob, JobType, JobStatus, JobPriority
+)
+from app.services.job_service import JobService
+from app.services.pipeline_service import PipelineService
+from app.services.upload_service import UploadService
+from app.services.admission_service import AdmissionRejected
+from app.services.storage import atomic_write_json
+
+# Peso de cada etapa en el progreso de un período
+VALIDATION_PROGRESS_SHARE = 0.5
+
+
+def group_files_by_period(files: List[UploadFile], periods: List[str]) -> List[Tuple[str, List[UploadFile]]]:
+    """Agrupar los archivos por período, en el orden en que aparece cada período"""
+    if len(periods) != len(files):
+        raise ValueError(f"Se recibieron {len(files)} archivo(s) y {len(periods)} período(s)")
+
+    groups: Dict[str, List[UploadFile]] = {}
+    for file, period in zip(files, periods):
+        period = period.strip()
+        if not period:
+            raise ValueError(f"El archivo {file.filename} no tiene período")
+        groups.setdefault(period, []).append(file)
+
+    if len(groups) > IMPORT_BULK_MAX_PERIODS:
+        raise ValueError(f"Máximo {IMPORT_BULK_MAX_PERIODS} períodos por lote")
+    return list(groups.items())
+
+
+class BulkImportService:
+    """Importación de varios períodos de un proyecto en una sola petición.
+
+    Cada período se convierte en una ejecución independiente que recorre el
+    pipeline (lectura, validación y conversión) en cuanto sus archivos están
+    en disco, sin esperar a los demás períodos. Los trabajos de todos los
+    períodos comparten el pool de procesos, de modo que el lote avanza en
+    paralelo hasta el límite de procesos y de memoria, y se encolan con
+    prioridad masiva para no retrasar las validaciones interactivas.
+
+    El lote se guarda en ``storage/bulk``; su informe agregado se calcula a
+    partir del estado de los trabajos de cada ejecución.
+    """
+
+    def __init__(self, job_service: JobService, pipeline_service: PipelineService, upload_service: Optional[UploadService] = None):
+        self.job_service = job_service
+        self.pipeline_service = pipeline_service
+        self.upload_service = upload_service or UploadService()
+        self.storage_path = os.path.join(os.path.dirname(__file__), '..', 'storage')
+        self.bulk_path = os.path.join(self.storage_path, 'bulk')
+
+        # Crear directorio si no existe
+        os.makedirs(self.bulk_path, exist_ok=True)
+
+    def _bulk_file(self, bulk_id: str) -> str:
+        return os.path.join(self.bulk_path, f"{bulk_id}.json")
+
+    def _save(self, bulk: BulkImport) -> None:
+        atomic_write_json(self._bulk_file(bulk.bulkId), bulk.dict())
+
+    def get_bulk(self, bulk_id: str) -> Optional[BulkImport]:
+        try:
+            with open(self._bulk_file(os.path.basename(bulk_id)), 'r', encoding='utf-8') as f:
+                return BulkImport(**json.load(f))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def check_capacity(self, groups: List[Tuple[str, List[UploadFile]]]) -> None:
+        """Lanzar AdmissionRejected si la cola no admite las validaciones del lote"""
+        self.job_service.check_admission(slots=len(groups))
+
+    def create_bulk(
+        self,
+        groups: List[Tuple[str, List[UploadFile]]],
+        project_id: str,
+        project_name: str,
+        user_id: str,
+        user_name: str,
+        test_type: str = "libro_diario_import"
+    ) -> BulkImport:
+        """Guardar los archivos de cada período y lanzar su pipeline.
+
+        Un período que no puede iniciarse (p. ej. por la cola llena) queda
+        registrado con su error y no impide el resto del lote.
+        """
+        bulk = BulkImport(
+            bulkId=uuid.uuid4().hex[:12],
+            projectId=project_id,
+            projectName=project_name,
+            testType=test_type,
+            userId=user_id,
+            userName=user_name,
+            createdAt=datetime.now().isoformat(),
+            periods=[BulkPeriod(period=period, files=[f.filename for f in files]) for period, files in groups]
+        )
+        self._save(bulk)
+        print(f"📦 Bulk import {bulk.bulkId}: {len(groups)} period(s) for project {project_id}")
+
+        for entry, (period, files) in zip(bulk.periods, groups):
+            try:
+                def start_parse(metadata, entry=entry):
+                    job = self.pipeline_service.on_file_uploaded(metadata)
+                    if job:
+                        entry.jobIds.append(job.jobId)
+
+                execution_id, metadatas = self.upload_service.upload_multiple_files(
+                    files=files,
+                    project_id=project_id,
+                    period=period,
+                    user_id=user_id,
+                    user_name=user_name,
+                    test_type=test_type,
+                    on_file_saved=start_parse
+                )
+                entry.executionId = execution_id
+                self.upload_service.create_execution_record(execution_id, metadatas, project_name)
+                job = self.pipeline_service.start(execution_id, priority=JobPriority.BULK)
+                entry.jobIds.append(job.jobId)
+            except AdmissionRejected as e:
+                entry.error = e.message
+            except Exception as e:
+                print(f"❌ Bulk import {bulk.bulkId}, period {period}: {str(e)}")
+                entry.error = str(e)
+                if entry.executionId:
+                    self.upload_service.update_execution_status(entry.executionId, ExecutionStatus.ERROR, str(e))
+            # Guardar tras cada período: el informe ya refleja los que están en marcha
+            self._save(bulk)
+
+        return bulk
+
+    def _period_report(self, entry: BulkPeriod) -> BulkPeriodReport:
+        report = BulkPeriodReport(
+            period=entry.period,
+            executionId=entry.executionId,
+            files=entry.files,
+            status=ExecutionStatus.PENDING
+        )
+        if entry.error or not entry.executionId:
+            report.status = ExecutionStatus.ERROR
+            report.errorMessage = entry.error or "El período no llegó a iniciarse"
+            return report
+
+        jobs = [job for job in self.job_service.store.list_jobs(entry.executionId) if job.params.get("pipeline")]
+        validation = self._last_job(jobs, JobType.VALIDATION)
+        conversion = self._last_job(jobs, JobType.CONVERSION)
+
+        # Tras añadir archivos a la ejecución, la nueva validación manda sobre la conversión anterior
+        if conversion is not None and (validation is None or conversion.submittedAt > validation.submittedAt):
+            report.stage = "conversion"
+            report.canProceed = True
+            report.progress = 100 * VALIDATION_PROGRESS_SHARE + conversion.progress * (1 - VALIDATION_PROGRESS_SHARE)
+            self._apply_job_status(report, conversion)
+            if conversion.status == JobStatus.COMPLETED:
+                report.convertedFiles = (conversion.result or {}).get("convertedFiles", [])
+                report.downloadUrls = (conversion.result or {}).get("downloadUrls", [])
+            return report
+
+        if validation is None:
+            report.status = ExecutionStatus.ERROR
+            report.errorMessage = "La validación no llegó a encolarse"
+            return report
+
+        report.stage = "validation"
+        report.progress = validation.progress * VALIDATION_PROGRESS_SHARE
+        self._apply_job_status(report, validation)
+        if validation.status == JobStatus.COMPLETED:
+            report.canProceed = bool((validation.result or {}).get("canProceed"))
+            if report.canProceed and any(job.status == JobStatus.CANCELLED for job in jobs):
+                # Se canceló una lectura: el pipeline ya no lanzará la conversión
+                report.status = ExecutionStatus.CANCELLED
+                report.errorMessage = "Cancelado por el usuario"
+            elif report.canProceed:
+                # El pipeline encola la conversión en cuanto terminan las lecturas
+                report.status = ExecutionStatus.PROCESSING
+                report.stage = "conversion"
+                report.finishedAt = None
+            else:
+                report.status = ExecutionStatus.ERROR
+                report.errorMessage = "La validación encontró errores; no se puede convertir"
+        return report
+
+    def _last_job(self, jobs: List[ImportJob], job_type: JobType) -> Optional[ImportJob]:
+        matching = [job for job in jobs if job.jobType == job_type]
+        return matching[-1] if matching else None
+
+    def _apply_job_status(self, report: BulkPeriodReport, job: ImportJob) -> None:
+        if job.status in (JobStatus.QUEUED, JobStatus.RUNNING):
+            report.status = ExecutionStatus.PROCESSING
+        elif job.status == JobStatus.COMPLETED:
+            report.status = ExecutionStatus.SUCCESS
+            report.progress = 100.0 if job.jobType == JobType.CONVERSION else report.progress
+            report.finishedAt = job.finishedAt
+        elif job.status == JobStatus.CANCELLED:
+            report.status = ExecutionStatus.CANCELLED
+            report.errorMessage = job.message
+            report.finishedAt = job.finishedAt
+        else:
+            report.status = ExecutionStatus.ERROR
+            report.errorMessage = job.error
+            report.finishedAt = job.finishedAt
+
+    def get_report(self, bulk_id: str) -> Optional[BulkImportReport]:
+        """Informe agregado del lote: estado por período y totales"""
+        bulk = self.get_bulk(bulk_id)
+        if bulk is None:
+            return None
+
+        periods = [self._period_report(entry) for entry in bulk.periods]
+        totals: Dict[str, int] = {}
+        for period in periods:
+            totals[period.status.value] = totals.get(period.status.value, 0) + 1
+
+        succeeded = totals.get(ExecutionStatus.SUCCESS.value, 0)
+        if any(p.status in (ExecutionStatus.PENDING, ExecutionStatus.PROCESSING) for p in periods):
+            status = ExecutionStatus.PROCESSING
+            message = f"{succeeded} de {len(periods)} período(s) completado(s)"
+        elif succeeded == len(periods):
+            status = ExecutionStatus.SUCCESS
+            message = f"{len(periods)} período(s) importado(s) correctamente"
+        elif succeeded:
+            status = ExecutionStatus.WARNING
+            message = f"{succeeded} de {len(periods)} período(s) importado(s); revisa los períodos con errores"
+        elif all(p.status == ExecutionStatus.CANCELLED for p in periods):
+            status = ExecutionStatus.CANCELLED
+            message = "Importación masiva cancelada"
+        else:
+            status = ExecutionStatus.ERROR
+            message = "Ningún período se pudo importar"
+
+        finished_at = None
+        if status != ExecutionStatus.PROCESSING:
+            finished_at = max((p.finishedAt for p in periods if p.finishedAt), default=bulk.createdAt)
+        end = datetime.fromisoformat(finished_at) if finished_at else datetime.now()
+
+        return BulkImportReport(
+            bulkId=bulk.bulkId,
+            projectId=bulk.projectId,
+            status=status,
+            message=message,
+            createdAt=bulk.createdAt,
+            finishedAt=finished_at,
+            elapsedSeconds=round((end - datetime.fromisoformat(bulk.createdAt)).total_seconds(), 3),
+            progress=round(sum(p.progress for p in periods) / len(periods), 1) if periods else 0.0,
+            totals=totals,
+            periods=periods
+        )
+
+    def cancel_bulk(self, bulk_id: str) -> Optional[List[ImportJob]]:
+        """Cancelar los trabajos pendientes o en curso de todos los períodos del lote"""
+        bulk = self.get_bulk(bulk_id)
+        if bulk is None:
+            return None
+        cancelled = []
+        for entry in bulk.periods:
+            if entry.executionId:
+                cancelled.extend(self.job_service.cancel_execution(entry.executionId))
+        return cancelled
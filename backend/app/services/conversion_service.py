@@ -3,9 +3,15 @@ import os
 import json
 import time
 import random
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from app.models.import_models import FileMetadata, ExecutionStatus
 from app.services.sap_merge_service import SAPMergeService
+from app.services.progress_service import ProgressReporter, NULL_PROGRESS
+from app.services.artifact_service import ArtifactStore
+from app.services.reference_data import reference_data
+from app.services import fast_json
+from app.services.storage import atomic_write_json
+from app.services.storage_layout import StorageLayout
 
 class ConversionService:
     def __init__(self):
@@ -15,12 +21,22 @@ class ConversionService:
             os.path.dirname(__file__), '..', 'data', 'conversion_templates.json'
         )
         self.sap_merge_service = SAPMergeService()
+        # Los convertidos se guardan junto a los demás archivos de su ejecución
+        self.layout = StorageLayout(self.storage_path)
         
-        # Crear directorio si no existe
+        # Crear directorio si no existe (directorio plano de las ejecuciones sin migrar)
         os.makedirs(self.converted_files_path, exist_ok=True)
+
+    def converted_file_path(self, filename: str) -> str:
+        """Ruta de un archivo convertido a partir de su nombre ('<id>_..._converted.json')"""
+        return self.layout.path_for_filename("converted", filename)
     
     def _load_conversion_templates(self) -> dict:
-        """Cargar plantillas de conversión simuladas"""
+        """Cargar plantillas de conversión simuladas (en caché hasta que cambie el archivo)"""
+        return reference_data.get(self.simulation_data_path, self._read_conversion_templates).raw
+    
+    def _read_conversion_templates(self) -> dict:
+        """Leer las plantillas de conversión del archivo"""
         try:
             with open(self.simulation_data_path, 'r', encoding='utf-8') as f:
                 return json.load(f)
@@ -75,17 +91,39 @@ class ConversionService:
         base_name = original_filename.rsplit('.', 1)[0]
         return f"{execution_id}_{base_name}_converted.json"
     
-    def _save_converted_file(self, filename: str, data: dict) -> str:
-        """Guardar archivo convertido"""
-        file_path = os.path.join(self.converted_files_path, filename)
+    def _save_converted_file(self, filename: str, data: dict, progress: ProgressReporter = NULL_PROGRESS) -> str:
+        """Guardar archivo convertido.
+
+        Se escribe en un temporal que se renombra al terminar, así una
+        conversión interrumpida nunca deja un JSON incompleto con el nombre final.
+        """
+        file_path = self.layout.path_for_filename("converted", filename, create=True)
+        total_records = len(data.get("data") or [])
+        progress.stage("serialize", f"Guardando {filename}", total=total_records)
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        atomic_write_json(file_path, data)
         
+        progress.advance(total_records)
+        progress.complete()
         return file_path
 
-    def convert_files_with_merge(self, metadatas: List[FileMetadata]) -> List[Dict[str, Any]]:
-        """Convertir múltiples archivos con merge automático de SAP"""
+    def convert_files_with_merge(
+        self,
+        metadatas: List[FileMetadata],
+        progress: Optional[ProgressReporter] = None,
+        artifacts: Optional[ArtifactStore] = None,
+        base_metadatas: Optional[List[FileMetadata]] = None,
+        base_artifacts: Optional[ArtifactStore] = None
+    ) -> List[Dict[str, Any]]:
+        """Convertir múltiples archivos con merge automático de SAP.
+
+        ``progress`` recibe las etapas de lectura, merge y guardado. Con
+        ``artifacts`` la conversión parte del artefacto más avanzado que siga
+        vigente: el archivo convertido, el libro fusionado o la lectura de
+        cada archivo. Con la versión anterior (``base_metadatas`` y
+        ``base_artifacts``) el merge se limita a los archivos que cambiaron.
+        """
+        progress = progress or NULL_PROGRESS
         converted_files = []
         
         try:
@@ -100,22 +138,43 @@ class ConversionService:
             
             if has_sap_files and len(metadatas) > 1:
                 print("📋 Detected SAP files, performing merge...")
+                execution_id = metadatas[0].executionId
+                converted_filename = f"{execution_id}_libro_diario_merged.json"
+                merged_fp = self.sap_merge_service.merged_fingerprint(metadatas) if artifacts is not None else None
+                cached_path = artifacts.lookup_file("converted", merged_fp) if artifacts is not None else None
+                if cached_path:
+                    # Las entradas no han cambiado desde la última conversión
+                    progress.stage("serialize", f"Reutilizando {converted_filename}")
+                    progress.complete()
+                    return [{
+                        "filename": converted_filename,
+                        "filepath": cached_path,
+                        "data": None,
+                        "success": True,
+                        "cached": True,
+                        "records": (artifacts.manifest("converted") or {}).get("records")
+                    }]
+                
                 # Procesar archivos SAP con merge
-                merge_result = self.sap_merge_service.process_sap_files(metadatas)
+                merge_result = self.sap_merge_service.process_sap_files(
+                    metadatas, progress, artifacts, base_metadatas, base_artifacts
+                )
                 
                 if merge_result["success"]:
                     # Generar archivo consolidado
-                    execution_id = metadatas[0].executionId
-                    converted_filename = f"{execution_id}_libro_diario_merged.json"
-                    
-                    file_path = self._save_converted_file(converted_filename, merge_result["data"])
+                    progress.set_overall(0.9)
+                    file_path = self._save_converted_file(converted_filename, merge_result["data"], progress)
+                    records = merge_result["data"]["metadata"]["total_records"]
+                    if artifacts is not None:
+                        artifacts.record_file("converted", merged_fp, file_path, "convert", records=records)
                     
                     converted_files.append({
                         "filename": converted_filename,
                         "filepath": file_path,
                         "data": merge_result["data"],
                         "success": True,
-                        "summary": merge_result.get("summary", {})
+                        "summary": merge_result.get("summary", {}),
+                        "records": records
                     })
                     print(f"✅ SAP merge completed: {converted_filename}")
                 else:
@@ -136,9 +195,10 @@ class ConversionService:
             else:
                 # Conversión individual para archivos no-SAP o archivo único
                 print("📄 Processing files individually...")
-                for metadata in metadatas:
+                for index, metadata in enumerate(metadatas):
+                    progress.set_overall(index / len(metadatas))
                     try:
-                        result = self.convert_file(metadata)
+                        result = self.convert_file(metadata, progress)
                         converted_files.append(result)
                     except Exception as e:
                         converted_files.append({
@@ -169,8 +229,9 @@ class ConversionService:
             
             return converted_files
     
-    def convert_file(self, metadata: FileMetadata) -> Dict[str, Any]:
+    def convert_file(self, metadata: FileMetadata, progress: Optional[ProgressReporter] = None) -> Dict[str, Any]:
         """Simular conversión de archivo a formato estándar"""
+        progress = progress or NULL_PROGRESS
         
         # Simular tiempo de procesamiento
         self._simulate_conversion_delay()
@@ -192,7 +253,8 @@ class ConversionService:
                 "total_records": random.randint(100, 1000)
             },
             "headers": template["headers"],
-            "data": template["sample_data"]
+            # Copia: las plantillas en caché no deben crecer con cada conversión
+            "data": list(template["sample_data"])
         }
         
         # Generar más datos aleatorios para simular un archivo real
@@ -237,26 +299,43 @@ class ConversionService:
             metadata.originalFileName
         )
         
-        file_path = self._save_converted_file(converted_filename, converted_data)
+        file_path = self._save_converted_file(converted_filename, converted_data, progress)
         
         return {
             "filename": converted_filename,
             "filepath": file_path,
             "data": converted_data,
-            "success": True
+            "success": True,
+            "records": converted_data["metadata"]["total_records"]
         }
     
     def convert_files(self, metadatas: List[FileMetadata]) -> List[Dict[str, Any]]:
         """Convertir múltiples archivos (versión anterior - mantener compatibilidad)"""
         return self.convert_files_with_merge(metadatas)
     
+    def cleanup_converted_files(self, execution_id: str, since: float) -> List[str]:
+        """Eliminar los archivos de una ejecución escritos desde ``since`` (timestamp)
+        y los temporales (``.tmp``, ``.partial``) que hayan quedado a medias"""
+        removed = []
+        for filename in self.layout.list_execution_files("converted", execution_id):
+            file_path = self.layout.path("converted", execution_id, filename)
+            try:
+                if filename.endswith(('.tmp', '.partial')) or os.path.getmtime(file_path) >= since:
+                    os.remove(file_path)
+                    removed.append(filename)
+            except FileNotFoundError:
+                continue
+        if removed:
+            print(f"🧹 Removed {len(removed)} partial artifact(s) of execution {execution_id}")
+        return removed
+    
     def get_converted_file_data(self, execution_id: str, filename: str) -> Dict[str, Any]:
         """Obtener datos de archivo convertido para visualización"""
-        file_path = os.path.join(self.converted_files_path, filename)
+        file_path = self.converted_file_path(filename)
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(file_path, 'rb') as f:
+                return fast_json.loads(f.read())
         except FileNotFoundError:
             return None
     
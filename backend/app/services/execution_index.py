@@ -0,0 +1,139 @@
+# backend/app/services/execution_index.py
+import os
+import json
+import base64
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from app.models.import_models import ImportExecution
+from app.services.storage import file_signature
+
+# Campos por los que se puede filtrar el historial con un índice
+INDEXED_FIELDS = ("userId", "projectId", "period", "status")
+
+SortKey = Tuple[str, str]
+
+
+def _sort_key(execution: ImportExecution) -> SortKey:
+    return execution.executionDate, execution.executionId
+
+
+def encode_cursor(key: SortKey) -> str:
+    """Cursor opaco con la posición (fecha, ID) del último elemento devuelto"""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    """Lanza ValueError si el cursor no es válido"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date, execution_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return str(date), str(execution_id)
+    except Exception:
+        raise ValueError("Cursor de paginación no válido")
+
+
+class ExecutionIndex:
+    """Índices en memoria sobre el historial de ejecuciones.
+
+    Las ejecuciones se guardan ordenadas por (fecha, ID) y, por cada campo de
+    INDEXED_FIELDS, las posiciones de cada valor en ese orden. Una consulta
+    acota el rango de fechas y el cursor con búsqueda binaria y recorre la
+    lista de posiciones más corta entre los filtros pedidos, de modo que su
+    coste depende del tamaño de la página y de la selectividad de los
+    filtros, no del total del historial.
+    """
+
+    def __init__(self, executions: Iterable[ImportExecution]):
+        self.executions: List[ImportExecution] = sorted(executions, key=_sort_key)
+        self.keys: List[SortKey] = [_sort_key(e) for e in self.executions]
+        self.by_id: Dict[str, ImportExecution] = {e.executionId: e for e in self.executions}
+        self.positions: Dict[str, Dict[str, List[int]]] = {field: {} for field in INDEXED_FIELDS}
+        for position, execution in enumerate(self.executions):
+            for field in INDEXED_FIELDS:
+                value = getattr(execution, field)
+                value = value.value if hasattr(value, "value") else value
+                self.positions[field].setdefault(value, []).append(position)
+
+    def query(
+        self,
+        filters: Dict[str, str],
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        after: Optional[SortKey] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[List[ImportExecution], Optional[SortKey]]:
+        """Ejecuciones de la más reciente a la más antigua.
+
+        ``filters`` compara por igualdad campos de INDEXED_FIELDS; las fechas
+        acotan ``executionDate`` (``date_from`` incluida, ``date_to``
+        excluida); ``after`` es la clave del último elemento de la página
+        anterior. Devuelve la página y la clave para pedir la siguiente (None
+        si no hay más).
+        """
+        low = bisect_left(self.keys, (date_from, "")) if date_from else 0
+        high = bisect_left(self.keys, (date_to, "")) if date_to else len(self.keys)
+        if after is not None:
+            high = min(high, bisect_left(self.keys, after))
+
+        candidates: Optional[List[int]] = None
+        for field, value in filters.items():
+            field_positions = self.positions[field].get(value, [])
+            if candidates is None or len(field_positions) < len(candidates):
+                candidates = field_positions
+
+        if candidates is None:
+            scan = range(high - 1, low - 1, -1)
+        else:
+            start, end = bisect_left(candidates, low), bisect_left(candidates, high)
+            scan = (candidates[i] for i in range(end - 1, start - 1, -1))
+
+        page: List[ImportExecution] = []
+        for position in scan:
+            execution = self.executions[position]
+            if all(self._value(execution, field) == value for field, value in filters.items()):
+                if limit is not None and len(page) == limit:
+                    return page, _sort_key(page[-1])
+                page.append(execution)
+        return page, None
+
+    def _value(self, execution: ImportExecution, field: str) -> str:
+        value = getattr(execution, field)
+        return value.value if hasattr(value, "value") else value
+
+
+class ExecutionIndexCache:
+    """Índice del historial compartido por las instancias de UploadService del proceso.
+
+    Las escrituras del propio proceso reconstruyen el índice al guardar. Si
+    otro proceso (p. ej. un trabajo de validación) modifica el archivo, el
+    cambio de fecha, tamaño o inodo obliga a volver a leerlo.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Optional[Tuple[int, int, int]], ExecutionIndex]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str, loader: Callable[[], List[ImportExecution]]) -> ExecutionIndex:
+        path = os.path.abspath(path)
+        signature = file_signature(path)
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == signature:
+                return entry[1]
+            index = ExecutionIndex(loader())
+            self._entries[path] = (signature, index)
+            return index
+
+    def store(self, path: str, executions: List[ImportExecution]) -> None:
+        """Reconstruir el índice con el historial recién guardado en ``path``"""
+        path = os.path.abspath(path)
+        index = ExecutionIndex(executions)
+        with self._lock:
+            self._entries[path] = (file_signature(path), index)
+
+
+execution_indexes = ExecutionIndexCache()
@@ -0,0 +1,53 @@
+# backend/app/services/fast_json.py
+import json
+from datetime import date, datetime
+from typing import Any, Union
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa la librería estándar
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Serializar los tipos que el codificador no conoce"""
+    if isinstance(obj, BaseModel):
+        # Los campos ya están validados: se vuelcan tal cual, sin .dict() ni otra validación
+        return obj.__dict__
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if hasattr(obj, "item"):
+        # Escalares de numpy/pandas
+        return obj.item()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """JSON compacto en UTF-8 (orjson si está instalado)"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode('utf-8')
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Parsear JSON (orjson si está instalado)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """Respuesta JSON para cargas grandes.
+
+    Al devolverla directamente desde un endpoint, FastAPI no vuelve a validar
+    el contenido contra ``response_model`` ni lo pasa por
+    ``jsonable_encoder``: los modelos que ya construyeron los servicios se
+    serializan una sola vez.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
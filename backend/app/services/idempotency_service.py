@@ -0,0 +1,183 @@
+# backend/app/services/idempotency_service.py
+import os
+import json
+import time
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any
+from app.config.settings import IMPORT_IDEMPOTENCY_TTL_HOURS, IMPORT_IDEMPOTENCY_WAIT_SECONDS
+from app.services.storage import atomic_write_json
+
+# Longitud máxima aceptada para la cabecera Idempotency-Key
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+# Frecuencia con la que se revisa una clave en curso en otro proceso
+INFLIGHT_POLL_SECONDS = 0.25
+# Antigüedad a partir de la cual una marca .inflight se considera de un proceso que murió
+INFLIGHT_STALE_SECONDS = 3600
+
+
+class IdempotencyConflict(Exception):
+    """La clave ya se usó con otra petición, o la original sigue en curso"""
+
+    def __init__(self, message: str, status_code: int = 422):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """Huella de los parámetros de una petición, para detectar claves reutilizadas"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(b"\0")
+        digest.update(str(part).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class IdempotencyService:
+    """Respuestas de las subidas indexadas por la cabecera Idempotency-Key.
+
+    Un reintento con la misma clave (del mismo usuario y endpoint) recibe la
+    respuesta original sin volver a guardar archivos ni crear otra ejecución.
+    Si la petición original aún está en curso, el reintento espera a que
+    termine. Solo se guardan las respuestas correctas: tras un error el
+    cliente puede reintentar con la misma clave.
+
+    Las claves caducan a las IMPORT_IDEMPOTENCY_TTL_HOURS horas. Una clave en
+    curso se marca también con un archivo ``.inflight``, de modo que un
+    reintento que llegue a otro worker de gunicorn espera igualmente.
+    """
+
+    def __init__(self, ttl_hours: float = IMPORT_IDEMPOTENCY_TTL_HOURS, wait_seconds: float = IMPORT_IDEMPOTENCY_WAIT_SECONDS):
+        self.ttl = timedelta(hours=ttl_hours)
+        self.wait_seconds = wait_seconds
+        self.storage_path = os.path.join(os.path.dirname(__file__), '..', 'storage')
+        self.keys_path = os.path.join(self.storage_path, 'idempotency')
+        self._inflight: Dict[str, asyncio.Event] = {}
+
+        # Crear directorio si no existe
+        os.makedirs(self.keys_path, exist_ok=True)
+
+    def _record_id(self, scope: str, user_id: str, key: str) -> str:
+        # La clave la elige el cliente: se guarda con un nombre de archivo seguro
+        return hashlib.sha256(f"{scope}\0{user_id}\0{key}".encode('utf-8')).hexdigest()
+
+    def _record_file(self, record_id: str) -> str:
+        return os.path.join(self.keys_path, f"{record_id}.json")
+
+    def _inflight_file(self, record_id: str) -> str:
+        return os.path.join(self.keys_path, f"{record_id}.inflight")
+
+    def _claim(self, record_id: str) -> bool:
+        """Marcar la clave como en curso; False si otro proceso ya la tiene"""
+        inflight_file = self._inflight_file(record_id)
+        try:
+            fd = os.open(inflight_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                age = time.time() - os.path.getmtime(inflight_file)
+            except FileNotFoundError:
+                return self._claim(record_id)
+            if age < INFLIGHT_STALE_SECONDS:
+                return False
+            # Marca de un proceso que murió con la petición en curso
+            os.remove(inflight_file)
+            return self._claim(record_id)
+        os.close(fd)
+        return True
+
+    def _load(self, record_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._record_file(record_id), 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if datetime.fromisoformat(record["createdAt"]) + self.ttl < datetime.now():
+            self._delete(record_id)
+            return None
+        return record
+
+    def _delete(self, record_id: str) -> None:
+        try:
+            os.remove(self._record_file(record_id))
+        except FileNotFoundError:
+            pass
+
+    async def begin(self, scope: str, user_id: str, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Reservar la clave para esta petición.
+
+        Devuelve la respuesta guardada si la clave ya se completó (la petición
+        no debe repetirse) o None si la petición debe ejecutarse; en ese caso
+        hay que llamar después a ``complete`` o ``abandon``.
+        """
+        if not key or len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            raise IdempotencyConflict(f"Idempotency-Key debe tener entre 1 y {MAX_IDEMPOTENCY_KEY_LENGTH} caracteres", 400)
+        record_id = self._record_id(scope, user_id, key)
+
+        while True:
+            record = self._load(record_id)
+            if record is not None:
+                if record["fingerprint"] != fingerprint:
+                    raise IdempotencyConflict("Idempotency-Key ya utilizada con una petición distinta")
+                print(f"🔁 Replaying {scope} response for idempotency key")
+                return record["response"]
+
+            event = self._inflight.get(record_id)
+            if event is None:
+                if self._claim(record_id):
+                    self._inflight[record_id] = asyncio.Event()
+                    return None
+                # En curso en otro proceso: esperar a que guarde la respuesta o libere la clave
+                waited = 0.0
+                while os.path.exists(self._inflight_file(record_id)) and self._load(record_id) is None:
+                    if waited >= self.wait_seconds:
+                        raise IdempotencyConflict("La petición original con esta Idempotency-Key sigue en curso", 409)
+                    await asyncio.sleep(INFLIGHT_POLL_SECONDS)
+                    waited += INFLIGHT_POLL_SECONDS
+                continue
+            # La petición original sigue en curso (p. ej. el cliente cortó la conexión y reintentó)
+            try:
+                await asyncio.wait_for(event.wait(), self.wait_seconds)
+            except asyncio.TimeoutError:
+                raise IdempotencyConflict("La petición original con esta Idempotency-Key sigue en curso", 409)
+
+    def complete(self, scope: str, user_id: str, key: str, fingerprint: str, response: Dict[str, Any]) -> None:
+        """Guardar la respuesta de la petición y despertar a los reintentos en espera"""
+        record_id = self._record_id(scope, user_id, key)
+        record = {
+            "scope": scope,
+            "userId": user_id,
+            "fingerprint": fingerprint,
+            "createdAt": datetime.now().isoformat(),
+            "response": response
+        }
+        try:
+            atomic_write_json(self._record_file(record_id), record)
+        except Exception as e:
+            print(f"⚠️ Error saving idempotency record: {str(e)}")
+        finally:
+            self._release(record_id)
+
+    def abandon(self, scope: str, user_id: str, key: str) -> None:
+        """Liberar la clave tras un error, para que un reintento vuelva a ejecutarse"""
+        self._release(self._record_id(scope, user_id, key))
+
+    def _release(self, record_id: str) -> None:
+        event = self._inflight.pop(record_id, None)
+        if event is not None:
+            try:
+                os.remove(self._inflight_file(record_id))
+            except FileNotFoundError:
+                pass
+            event.set()
+
+    def purge_expired(self) -> int:
+        """Borrar las claves caducadas"""
+        purged = 0
+        for filename in os.listdir(self.keys_path):
+            if filename.endswith('.json'):
+                record_id = filename[:-len('.json')]
+                if self._load(record_id) is None and not os.path.exists(self._record_file(record_id)):
+                    purged += 1
+        return purged
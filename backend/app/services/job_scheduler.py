@@ -0,0 +1,176 @@
+# backend/app/services/job_scheduler.py
+import time
+import itertools
+from collections import deque
+from typing import Optional, Dict, Any, List, Tuple, Deque
+from app.config.settings import (
+    IMPORT_JOB_WEIGHT_INTERACTIVE, IMPORT_JOB_WEIGHT_BULK, IMPORT_PROJECT_WEIGHTS,
+    IMPORT_QUEUE_METRICS_WINDOW
+)
+from app.models.import_models import JobPriority
+
+PRIORITY_WEIGHTS = {
+    JobPriority.INTERACTIVE: IMPORT_JOB_WEIGHT_INTERACTIVE,
+    JobPriority.BULK: IMPORT_JOB_WEIGHT_BULK,
+}
+# Coste mínimo (MB) de un trabajo, para que los archivos diminutos también consuman turno
+MIN_JOB_COST = 1.0
+
+
+def parse_project_weights(value: str) -> Dict[str, float]:
+    """Interpretar pesos por proyecto con el formato "proyecto:peso,proyecto:peso" """
+    weights = {}
+    for item in value.split(','):
+        project_id, separator, weight = item.strip().partition(':')
+        if not separator:
+            continue
+        try:
+            weights[project_id.strip()] = float(weight)
+        except ValueError:
+            print(f"⚠️ Invalid project weight: {item}")
+    return weights
+
+
+class QueuedJob:
+    """Trabajo en espera con sus etiquetas de planificación"""
+
+    def __init__(self, job_id: str, flow: Tuple[str, str, str], project_id: str,
+                 start_tag: float, finish_tag: float, sequence: int):
+        self.job_id = job_id
+        self.flow = flow
+        self.project_id = project_id
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.sequence = sequence
+        self.enqueued_at = time.monotonic()
+
+
+class ProjectQueueMetrics:
+    """Trabajos despachados y tiempos de espera recientes de un proyecto"""
+
+    def __init__(self, window: int = IMPORT_QUEUE_METRICS_WINDOW):
+        self.waits: Deque[float] = deque(maxlen=window)
+        self.dispatched = 0
+
+    def record_wait(self, seconds: float) -> None:
+        self.waits.append(seconds)
+        self.dispatched += 1
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.waits:
+            return {"dispatched": self.dispatched, "avgWaitSeconds": None, "p95WaitSeconds": None, "maxWaitSeconds": None}
+        waits = sorted(self.waits)
+        return {
+            "dispatched": self.dispatched,
+            "avgWaitSeconds": round(sum(waits) / len(waits), 3),
+            "p95WaitSeconds": round(waits[int(0.95 * (len(waits) - 1))], 3),
+            "maxWaitSeconds": round(waits[-1], 3)
+        }
+
+
+class FairJobQueue:
+    """Cola de trabajos con reparto justo ponderado (start-time fair queuing).
+
+    Cada flujo (prioridad, proyecto, usuario) recibe turno en proporción a su
+    peso, de modo que un proyecto que encola 40 conversiones no deja sin
+    turno al resto: cada flujo avanza en paralelo según su peso. El peso es
+    el de la prioridad (los trabajos interactivos pesan
+    IMPORT_JOB_WEIGHT_INTERACTIVE veces más que los masivos) por el del
+    proyecto (IMPORT_PROJECT_WEIGHTS). El coste de un trabajo es el tamaño
+    en MB de sus archivos, así que los trabajos grandes gastan más turno.
+
+    Se despacha el trabajo con menor etiqueta de fin; al despacharlo el
+    tiempo virtual avanza hasta su etiqueta de inicio. No es thread-safe:
+    JobService la protege con su cerrojo de cola.
+    """
+
+    def __init__(
+        self,
+        project_weights: Optional[Dict[str, float]] = None,
+        priority_weights: Optional[Dict[JobPriority, float]] = None
+    ):
+        self.project_weights = project_weights if project_weights is not None else parse_project_weights(IMPORT_PROJECT_WEIGHTS)
+        self.priority_weights = priority_weights or PRIORITY_WEIGHTS
+        self.virtual_time = 0.0
+        self._entries: Dict[str, QueuedJob] = {}
+        self._flow_finish: Dict[Tuple[str, str, str], float] = {}
+        self._running: Dict[str, str] = {}  # job_id -> project_id
+        self._sequence = itertools.count()
+        self._metrics: Dict[str, ProjectQueueMetrics] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._entries
+
+    def weight(self, project_id: str, priority: JobPriority) -> float:
+        weight = self.priority_weights.get(priority, 1.0) * self.project_weights.get(project_id, 1.0)
+        return max(weight, 1e-6)
+
+    def push(self, job_id: str, project_id: str, user_id: str, priority: JobPriority, cost: float) -> None:
+        flow = (priority.value, project_id, user_id)
+        start = max(self.virtual_time, self._flow_finish.get(flow, 0.0))
+        finish = start + max(cost, MIN_JOB_COST) / self.weight(project_id, priority)
+        self._flow_finish[flow] = finish
+        self._entries[job_id] = QueuedJob(job_id, flow, project_id, start, finish, next(self._sequence))
+
+    def _ordered(self) -> List[QueuedJob]:
+        return sorted(self._entries.values(), key=lambda entry: (entry.finish_tag, entry.sequence))
+
+    def peek(self) -> Optional[str]:
+        """Siguiente trabajo a despachar, sin retirarlo"""
+        if not self._entries:
+            return None
+        return min(self._entries.values(), key=lambda entry: (entry.finish_tag, entry.sequence)).job_id
+
+    def pop(self, job_id: str) -> QueuedJob:
+        """Retirar un trabajo para despacharlo"""
+        entry = self._entries.pop(job_id)
+        self.virtual_time = max(self.virtual_time, entry.start_tag)
+        self._running[job_id] = entry.project_id
+        self._metrics.setdefault(entry.project_id, ProjectQueueMetrics()).record_wait(
+            time.monotonic() - entry.enqueued_at
+        )
+        self._prune_flows()
+        return entry
+
+    def remove(self, job_id: str) -> bool:
+        """Retirar un trabajo cancelado sin que su flujo pierda el turno que no usó"""
+        entry = self._entries.pop(job_id, None)
+        if entry is None:
+            return False
+        if self._flow_finish.get(entry.flow) == entry.finish_tag:
+            self._flow_finish[entry.flow] = entry.start_tag
+        return True
+
+    def finished(self, job_id: str) -> None:
+        self._running.pop(job_id, None)
+
+    def _prune_flows(self) -> None:
+        # Un flujo sin trabajos y por detrás del tiempo virtual ya no influye
+        active = {entry.flow for entry in self._entries.values()}
+        for flow in [f for f, finish in self._flow_finish.items() if finish <= self.virtual_time and f not in active]:
+            del self._flow_finish[flow]
+
+    def position(self, job_id: str) -> Optional[int]:
+        """Posición (desde 1) en el orden de despacho previsto"""
+        for index, entry in enumerate(self._ordered()):
+            if entry.job_id == job_id:
+                return index + 1
+        return None
+
+    def project_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Profundidad de cola y tiempos de espera por proyecto"""
+        now = time.monotonic()
+        projects: Dict[str, Dict[str, Any]] = {}
+        for project_id in set(self._metrics) | set(self._running.values()) | {e.project_id for e in self._entries.values()}:
+            waiting = [entry for entry in self._entries.values() if entry.project_id == project_id]
+            projects[project_id] = {
+                "queued": len(waiting),
+                "running": sum(1 for p in self._running.values() if p == project_id),
+                "oldestWaitSeconds": round(now - min(e.enqueued_at for e in waiting), 3) if waiting else None,
+                "weight": self.project_weights.get(project_id, 1.0),
+                **self._metrics.get(project_id, ProjectQueueMetrics()).summary()
+            }
+        return projects
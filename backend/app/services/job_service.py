@@ -0,0 +1,888 @@
+# backend/app/services/job_service.py
+import os
+import gc
+import sys
+import json
+import time
+import uuid
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import partial
+from typing import Optional, List, Dict, Any, Callable
+from app.config.settings import (
+    IMPORT_JOB_WORKERS, IMPORT_JOB_QUEUE_LIMIT, IMPORT_MEMORY_PER_FILE_BYTE,
+    IMPORT_WORKER_MAX_JOBS, IMPORT_WORKER_MAX_RSS_MB, IMPORT_JOB_RETENTION_HOURS
+)
+from app.models.import_models import (
+    ImportJob, JobType, JobStatus, JobPriority, ExecutionStatus,
+    ValidationResponse, ConversionResponse, FileValidation
+)
+from app.services.upload_service import UploadService
+from app.services.validation_service import ValidationService
+from app.services.conversion_service import ConversionService
+from app.services.sap_merge_service import SAPMergeService
+from app.services.lazy_import import preload_data_stack
+from app.services.storage import atomic_write_json, atomic_write_text, locked, process_alive
+from app.services.storage_layout import safe_segment
+from app.services.artifact_service import ArtifactStore, fingerprint, try_input_fingerprint
+from app.services.progress_service import ProgressReporter, OperationCancelled, execution_reporter
+from app.services.admission_service import AdmissionController, AdmissionRejected, estimate_retry_after, MB
+from app.services.job_scheduler import FairJobQueue
+
+class JobStore:
+    """Estado persistido de los trabajos: un archivo JSON por trabajo.
+
+    La API y los procesos de trabajo comparten estos archivos, de modo que el
+    progreso es visible desde cualquier proceso y sobrevive a un reinicio.
+    Cada ejecución tiene su directorio (``jobs/<ID de ejecución>/``): listar
+    sus trabajos solo lee los suyos, y los trabajos terminados se borran al
+    cumplir IMPORT_JOB_RETENTION_HOURS.
+    """
+
+    def __init__(self):
+        self.storage_path = os.path.join(os.path.dirname(__file__), '..', 'storage')
+        self.jobs_path = os.path.join(self.storage_path, 'jobs')
+
+        # Crear directorio si no existe
+        os.makedirs(self.jobs_path, exist_ok=True)
+
+    def _execution_dir(self, execution_id: str) -> str:
+        return os.path.join(self.jobs_path, safe_segment(execution_id))
+
+    def _job_path(self, job_id: str, extension: str) -> str:
+        # El ID del trabajo es '<ID de ejecución>-<sufijo>'
+        execution_id = job_id.rsplit('-', 1)[0]
+        return os.path.join(self._execution_dir(execution_id), f"{safe_segment(job_id)}{extension}")
+
+    def _job_file(self, job_id: str) -> str:
+        return self._job_path(job_id, '.json')
+
+    def _cancel_file(self, job_id: str) -> str:
+        return self._job_path(job_id, '.cancel')
+
+    def request_cancel(self, job_id: str) -> None:
+        """Marcar un trabajo para cancelación; el proceso que lo ejecuta lo comprueba"""
+        atomic_write_text(self._cancel_file(job_id), datetime.now().isoformat())
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        return os.path.exists(self._cancel_file(job_id))
+
+    def clear_cancel(self, job_id: str) -> None:
+        try:
+            os.remove(self._cancel_file(job_id))
+        except FileNotFoundError:
+            pass
+
+    def save(self, job: ImportJob) -> None:
+        """Guardar el trabajo de forma atómica (escritura + renombrado)"""
+        job_file = self._job_file(job.jobId)
+        os.makedirs(os.path.dirname(job_file), exist_ok=True)
+        atomic_write_json(job_file, job.dict())
+
+    def claim(self, job_id: str) -> Optional[ImportJob]:
+        """Pasar el trabajo de en cola a en ejecución; None si no estaba en cola.
+
+        La comprobación y el cambio se hacen bajo el bloqueo del archivo, así
+        que un trabajo despachado por dos procesos solo se ejecuta una vez.
+        """
+        with locked(self._job_file(job_id)):
+            job = self.load(job_id)
+            if job is None or job.status != JobStatus.QUEUED:
+                return None
+            job.status = JobStatus.RUNNING
+            job.startedAt = datetime.now().isoformat()
+            job.message = "En ejecución"
+            job.ownerPid = os.getpid()
+            self.save(job)
+            return job
+
+    def adopt(self, job_id: str) -> Optional[ImportJob]:
+        """Volver a poner en cola, a nombre de este proceso, un trabajo cuyo dueño ya no existe.
+
+        None si el trabajo ya terminó o su dueño sigue vivo (lo está
+        esperando o ejecutando otro proceso). Bajo el bloqueo del archivo, así
+        que si varios workers arrancan a la vez solo uno lo adopta.
+        """
+        with locked(self._job_file(job_id)):
+            job = self.load(job_id)
+            if job is None or job.status not in (JobStatus.QUEUED, JobStatus.RUNNING):
+                return None
+            if job.ownerPid != os.getpid() and process_alive(job.ownerPid):
+                return None
+            job.status = JobStatus.QUEUED
+            job.progress = 0.0
+            job.stage = None
+            job.message = "Reanudado tras reinicio"
+            job.ownerPid = os.getpid()
+            self.save(job)
+            return job
+
+    def load(self, job_id: str) -> Optional[ImportJob]:
+        return self._load_file(self._job_file(job_id))
+
+    def _load_file(self, job_file: str) -> Optional[ImportJob]:
+        try:
+            with open(job_file, 'r', encoding='utf-8') as f:
+                return ImportJob(**json.load(f))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _list_dir(self, directory: str) -> List[ImportJob]:
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        jobs = []
+        for filename in names:
+            if filename.endswith('.json'):
+                job = self._load_file(os.path.join(directory, filename))
+                if job:
+                    jobs.append(job)
+        return jobs
+
+    def _execution_ids(self) -> List[str]:
+        with os.scandir(self.jobs_path) as entries:
+            return [entry.name for entry in entries if entry.is_dir()]
+
+    def list_jobs(self, execution_id: str = None) -> List[ImportJob]:
+        """Listar trabajos, opcionalmente de una ejecución, del más antiguo al más reciente.
+
+        Sin ``execution_id`` se recorren todos los directorios: solo para las
+        tareas de arranque.
+        """
+        if execution_id:
+            jobs = self._list_dir(self._execution_dir(execution_id))
+        else:
+            jobs = [job for directory in self._execution_ids() for job in self._list_dir(self._execution_dir(directory))]
+        jobs.sort(key=lambda job: job.submittedAt)
+        return jobs
+
+    def migrate_flat_jobs(self) -> int:
+        """Mover los trabajos del formato anterior (``jobs/<ID>.json``) al directorio de su ejecución"""
+        moved = 0
+        with os.scandir(self.jobs_path) as entries:
+            legacy = [entry.name for entry in entries if entry.is_file() and entry.name.endswith(('.json', '.cancel'))]
+        for filename in legacy:
+            job_id, extension = os.path.splitext(filename)
+            target = self._job_path(job_id, extension)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                os.replace(os.path.join(self.jobs_path, filename), target)
+                moved += 1
+            except FileNotFoundError:
+                # Otro proceso lo movió
+                pass
+        if moved:
+            print(f"📦 Moved {moved} job file(s) to per-execution directories")
+        return moved
+
+    def purge_finished(self, retention_seconds: float) -> int:
+        """Borrar los trabajos terminados hace más de ``retention_seconds``.
+
+        El directorio de una ejecución se borra cuando ya no le queda ningún
+        trabajo.
+        """
+        if retention_seconds <= 0:
+            return 0
+        cutoff = datetime.now().timestamp() - retention_seconds
+        purged = 0
+        for execution_id in self._execution_ids():
+            directory = self._execution_dir(execution_id)
+            for job in self._list_dir(directory):
+                if job.status in (JobStatus.QUEUED, JobStatus.RUNNING) or not job.finishedAt:
+                    continue
+                if datetime.fromisoformat(job.finishedAt).timestamp() > cutoff:
+                    continue
+                for extension in ('.json', '.cancel'):
+                    try:
+                        os.remove(self._job_path(job.jobId, extension))
+                    except FileNotFoundError:
+                        pass
+                purged += 1
+            try:
+                # Solo se borra si quedó vacío
+                os.rmdir(directory)
+            except OSError:
+                pass
+        if purged:
+            print(f"🧹 Purged {purged} finished job(s)")
+        return purged
+
+
+class JobProgress:
+    """Refleja los eventos de progreso en el estado persistido del trabajo"""
+
+    def __init__(self, store: JobStore, job: ImportJob):
+        self.store = store
+        self.job = job
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        # Los eventos ya llegan limitados en frecuencia por el ProgressReporter
+        if event["event"] in ("finished", "failed"):
+            return
+        self.job.progress = event["overallProgress"]
+        self.job.stage = event["label"]
+        self.store.save(self.job)
+
+
+def _run_validation(job: ImportJob, progress: ProgressReporter) -> Dict[str, Any]:
+    """Validar los archivos de la ejecución y actualizar su estado"""
+    upload_service = UploadService()
+    validation_service = ValidationService()
+
+    metadatas = upload_service.get_metadatas_by_execution_id(job.executionId)
+    if not metadatas:
+        raise ValueError("Ejecución no encontrada")
+
+    # Un informe anterior con los mismos archivos, período y parámetros sigue vigente.
+    # Si algún archivo no se puede leer no hay caché: la validación informa del error
+    artifacts = ArtifactStore(job.executionId)
+    input_fps = [try_input_fingerprint(m) for m in metadatas]
+    validation_fp = None
+    if None not in input_fps:
+        validation_fp = fingerprint(
+            "validation",
+            job.params.get("fail_fast", False), job.params.get("max_errors"), job.params.get("max_error_rate"),
+            *[f"{m.period}:{fp}" for m, fp in zip(metadatas, input_fps)]
+        )
+    cached = artifacts.load("validation", validation_fp) if validation_fp else None
+    if cached is not None:
+        progress.stage("validate", "Reutilizando la validación anterior")
+        validation_results = [FileValidation(**validation) for validation in cached]
+        progress.complete()
+    else:
+        validation_results = validation_service.validate_files(
+            metadatas,
+            fail_fast=job.params.get("fail_fast", False),
+            max_errors=job.params.get("max_errors"),
+            max_error_rate=job.params.get("max_error_rate"),
+            progress=progress,
+            artifacts=artifacts if validation_fp else None
+        )
+        # No guardar informes con errores de lectura, que pueden ser pasajeros
+        if validation_fp and not any(r.field == "general" for v in validation_results for r in v.validationResults):
+            artifacts.save("validation", validation_fp, [v.dict() for v in validation_results], "validate")
+
+    # Determinar si se puede proceder
+    can_proceed = validation_service.can_proceed_to_conversion(validation_results)
+
+    # Actualizar estado según resultado
+    has_errors = any(v.status.value == "error" for v in validation_results)
+    has_warnings = any(v.status.value == "warning" for v in validation_results)
+
+    if has_errors:
+        upload_service.update_execution_status(
+            job.executionId,
+            ExecutionStatus.ERROR,
+            "Errores encontrados en la validación"
+        )
+    elif has_warnings:
+        upload_service.update_execution_status(job.executionId, ExecutionStatus.WARNING)
+    else:
+        upload_service.update_execution_status(job.executionId, ExecutionStatus.SUCCESS)
+
+    partial_result = any(v.partial for v in validation_results)
+
+    return ValidationResponse(
+        executionId=job.executionId,
+        success=True,
+        message="Validación detenida anticipadamente (cobertura parcial)" if partial_result else "Validación completada",
+        validations=validation_results,
+        canProceed=can_proceed,
+        partial=partial_result
+    ).dict()
+
+
+def _run_conversion(job: ImportJob, progress: ProgressReporter) -> Dict[str, Any]:
+    """Convertir los archivos de la ejecución con merge de BKPF/BSEG"""
+    upload_service = UploadService()
+    conversion_service = ConversionService()
+
+    metadatas = upload_service.get_metadatas_by_execution_id(job.executionId)
+    if not metadatas:
+        raise ValueError("Ejecución no encontrada")
+
+    # Una nueva versión de una ejecución solo rehace el merge de lo que cambió
+    base_metadatas, base_artifacts = None, None
+    execution = upload_service.get_execution_by_id(job.executionId)
+    if execution and execution.baseExecutionId and job.params.get("delta", True):
+        base_metadatas = upload_service.get_metadatas_by_execution_id(execution.baseExecutionId)
+        base_artifacts = ArtifactStore(execution.baseExecutionId)
+
+    conversion_results = conversion_service.convert_files_with_merge(
+        metadatas,
+        progress=progress,
+        artifacts=ArtifactStore(job.executionId),
+        base_metadatas=base_metadatas,
+        base_artifacts=base_artifacts
+    )
+
+    converted_files = []
+    download_urls = []
+    rows_imported = 0
+    for result in conversion_results:
+        if result["success"]:
+            converted_files.append(result["filename"])
+            download_urls.append(conversion_service.get_download_url(result["filename"]))
+            rows_imported += result.get("records") or 0
+
+    if not converted_files:
+        raise RuntimeError("Error durante la conversión de todos los archivos")
+
+    upload_service.update_execution_status(job.executionId, ExecutionStatus.SUCCESS, rows_imported=rows_imported)
+
+    return ConversionResponse(
+        executionId=job.executionId,
+        success=True,
+        message=f"Conversión completada exitosamente - {len(converted_files)} archivo(s) procesado(s)",
+        convertedFiles=converted_files,
+        downloadUrls=download_urls
+    ).dict()
+
+
+def _run_parse(job: ImportJob, progress: ProgressReporter) -> Dict[str, Any]:
+    """Leer archivos SAP y guardar sus DataFrames como artefacto para la conversión"""
+    sap_merge_service = SAPMergeService()
+    files = job.params.get("files")
+    metadatas = [
+        m for m in UploadService().get_metadatas_by_execution_id(job.executionId)
+        if files is None or m.filePath in files
+    ]
+    if not metadatas:
+        raise ValueError("Ejecución no encontrada")
+
+    artifacts = ArtifactStore(job.executionId)
+    parsed = []
+    for index, metadata in enumerate(metadatas):
+        progress.set_overall(index / len(metadatas))
+        file_type = sap_merge_service.identify_file_type(metadata.originalFileName, metadata.filePath)
+        df = sap_merge_service.load_or_parse_sap_file(metadata, file_type, progress, artifacts)
+        parsed.append({"fileName": metadata.originalFileName, "fileType": file_type, "records": len(df)})
+
+    return {
+        "executionId": job.executionId,
+        "success": True,
+        "message": f"{len(parsed)} archivo(s) leído(s)",
+        "files": parsed
+    }
+
+
+JOB_RUNNERS = {
+    JobType.PARSE: _run_parse,
+    JobType.VALIDATION: _run_validation,
+    JobType.CONVERSION: _run_conversion,
+}
+
+# Segundos mínimos entre dos limpiezas de trabajos terminados
+JOB_PURGE_INTERVAL = 3600
+# Segundos entre reintentos de despacho mientras la cola espera memoria: la
+# puede liberar otro worker de la API, que no avisa a este proceso
+JOB_MEMORY_RETRY_INTERVAL = 1.0
+
+# Prioridad por defecto: la validación se espera en pantalla, la conversión no
+DEFAULT_JOB_PRIORITIES = {
+    JobType.PARSE: JobPriority.BULK,
+    JobType.VALIDATION: JobPriority.INTERACTIVE,
+    JobType.CONVERSION: JobPriority.BULK,
+}
+
+
+def _mark_cancelled(store: JobStore, job: ImportJob, started: Optional[float] = None) -> None:
+    """Dejar el trabajo y la ejecución como cancelados y borrar artefactos parciales"""
+    job.status = JobStatus.CANCELLED
+    job.stage = None
+    job.message = "Cancelado por el usuario"
+    job.finishedAt = datetime.now().isoformat()
+    store.save(job)
+    store.clear_cancel(job.jobId)
+    if job.jobType == JobType.CONVERSION and started is not None:
+        ConversionService().cleanup_converted_files(job.executionId, started)
+    UploadService().update_execution_status(job.executionId, ExecutionStatus.CANCELLED, job.message)
+    print(f"🛑 Job {job.jobId} cancelled")
+
+
+def _resident_memory() -> int:
+    """Memoria residente actual del proceso en bytes (0 si no se puede leer)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # Sin /proc: pico de memoria (KB en Linux, bytes en macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+def _worker_stats() -> Dict[str, int]:
+    return {"pid": os.getpid(), "rssBytes": _resident_memory()}
+
+
+def warm_worker() -> Dict[str, int]:
+    """Tarea vacía que obliga al pool a arrancar un proceso (y a cargar pandas en él)"""
+    return _worker_stats()
+
+
+def run_job(job_id: str) -> Dict[str, int]:
+    """Punto de entrada de un trabajo dentro del proceso de trabajo.
+
+    Devuelve el PID y la memoria residente del proceso al terminar, con los
+    que JobService decide cuándo sustituir el pool.
+    """
+    _execute_job(job_id)
+    # Liberar los datos del trabajo antes de medir la memoria
+    gc.collect()
+    return _worker_stats()
+
+
+def _execute_job(job_id: str) -> None:
+    store = JobStore()
+    job = store.load(job_id)
+    if job is None:
+        return
+
+    progress = execution_reporter(
+        job.executionId,
+        {"jobId": job.jobId, "jobType": job.jobType.value},
+        cancel_check=partial(store.is_cancel_requested, job_id)
+    )
+    if store.is_cancel_requested(job_id):
+        # Cancelado mientras esperaba en la cola
+        _mark_cancelled(store, job)
+        progress.cancel(job.message)
+        return
+
+    started = time.time()
+    job = store.claim(job_id)
+    if job is None:
+        # Otro proceso ya lo tomó (p. ej. relanzado por otro worker tras un reinicio)
+        print(f"⏭️ Job {job_id} already claimed by another process")
+        return
+    progress.add_listener(JobProgress(store, job))
+
+    try:
+        job.result = JOB_RUNNERS[job.jobType](job, progress)
+        job.status = JobStatus.COMPLETED
+        job.progress = 100.0
+        job.message = job.result.get("message")
+    except OperationCancelled:
+        _mark_cancelled(store, job, started)
+        progress.cancel(job.message)
+        return
+    except Exception as e:
+        print(f"❌ Job {job.jobId} failed: {str(e)}")
+        job.status = JobStatus.FAILED
+        job.error = str(e)
+        job.message = "Error durante el trabajo"
+        UploadService().update_execution_status(job.executionId, ExecutionStatus.ERROR, str(e))
+
+    job.stage = None
+    job.finishedAt = datetime.now().isoformat()
+    store.save(job)
+    if job.status == JobStatus.COMPLETED:
+        progress.finish(job.message)
+    else:
+        progress.fail(job.error)
+
+
+class JobService:
+    """Ejecuta validaciones y conversiones en un pool de procesos.
+
+    Las peticiones HTTP solo encolan el trabajo y devuelven su id; el trabajo
+    pesado no bloquea el bucle de eventos de la API. Los trabajos esperan en
+    una cola justa entre proyectos y usuarios (FairJobQueue, acotada a
+    IMPORT_JOB_QUEUE_LIMIT) y pasan al pool cuando hay un proceso libre y su
+    memoria estimada cabe en el presupuesto del control de admisión.
+
+    Cada proceso de trabajo ocupa su propio hueco (un ProcessPoolExecutor
+    de un proceso), es persistente y carga pandas una sola vez al arrancar
+    (``warm_up`` los arranca antes del primer trabajo). Se sustituyen de uno
+    en uno: tras IMPORT_WORKER_MAX_JOBS tareas el proceso sale solo
+    (``max_tasks_per_child``) y el executor arranca otro en su lugar; si tras
+    un trabajo supera IMPORT_WORKER_MAX_RSS_MB de memoria residente, se
+    retira solo ese hueco, que ya está libre, y se precalienta uno nuevo. Los
+    demás procesos siguen con sus trabajos.
+
+    Cada worker de gunicorn tiene su propio JobService, con su pool y su cola:
+    los valores por defecto de IMPORT_JOB_WORKERS e IMPORT_JOB_QUEUE_LIMIT se
+    dividen entre WEB_CONCURRENCY para que el total no se multiplique.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = IMPORT_JOB_WORKERS,
+        admission: Optional[AdmissionController] = None,
+        queue_limit: int = IMPORT_JOB_QUEUE_LIMIT,
+        worker_max_jobs: int = IMPORT_WORKER_MAX_JOBS,
+        worker_max_rss: int = IMPORT_WORKER_MAX_RSS_MB * MB
+    ):
+        self.store = JobStore()
+        self.max_workers = max(1, max_workers)
+        self.admission = admission
+        self.queue_limit = max(1, queue_limit)
+        self.worker_max_jobs = worker_max_jobs
+        self.worker_max_rss = worker_max_rss
+        # Un executor de un solo proceso por hueco; None hasta que se necesita
+        self._slots: List[Optional[ProcessPoolExecutor]] = [None] * self.max_workers
+        self._futures: Dict[str, Future] = {}
+        # Hueco de cada trabajo en curso, PID actual de cada hueco y trabajos hechos por cada proceso
+        self._job_slots: Dict[str, int] = {}
+        self._slot_pids: Dict[int, int] = {}
+        self._worker_jobs: Dict[int, int] = {}
+        self._recycled_workers = 0
+        self._queue = FairJobQueue()
+        self._memory_estimates: Dict[str, int] = {}
+        self._started: Dict[str, float] = {}
+        self._avg_duration: Optional[float] = None
+        self._lock = threading.Lock()
+        self._queue_lock = threading.RLock()
+        self._completion_listeners: List[Callable[[ImportJob], None]] = []
+        self._shutting_down = False
+        self._last_purge: Optional[float] = None
+        self._pump_timer: Optional[threading.Timer] = None
+        if admission is not None:
+            # Al liberarse memoria pueden caber trabajos en espera
+            admission.add_release_listener(self._pump)
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # 'spawn' evita heredar hilos y sockets del servidor al crear procesos.
+        # Los procesos de trabajos cargan pandas al arrancar; el servidor web, no.
+        # La tarea de precalentamiento cuenta como una de las max_tasks_per_child.
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=preload_data_stack,
+            max_tasks_per_child=self.worker_max_jobs or None
+        )
+
+    def _get_executor(self, slot: int) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._slots[slot] is None:
+                self._slots[slot] = self._new_executor()
+            return self._slots[slot]
+
+    def _retire_slot(self, slot: int, cancel: bool = False) -> None:
+        """Cerrar el proceso del hueco; el siguiente trabajo que lo use arranca otro"""
+        with self._lock:
+            executor = self._slots[slot]
+            self._slots[slot] = None
+            pid = self._slot_pids.pop(slot, None)
+            if pid is not None:
+                self._worker_jobs.pop(pid, None)
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=cancel)
+
+    def _warm_slot(self, slot: int) -> None:
+        try:
+            self._get_executor(slot).submit(warm_worker)
+        except (BrokenProcessPool, RuntimeError) as e:
+            print(f"⚠️ Could not warm up job worker: {str(e)}")
+
+    def warm_up(self) -> None:
+        """Arrancar los procesos de trabajos para que el primer trabajo no espere a pandas"""
+        if self._shutting_down:
+            return
+        for slot in range(self.max_workers):
+            self._warm_slot(slot)
+
+    def _idle_slot(self) -> int:
+        busy = set(self._job_slots.values())
+        return next(slot for slot in range(self.max_workers) if slot not in busy)
+
+    def _record_worker(self, slot: int, stats: Optional[Dict[str, int]]) -> None:
+        """Contar el trabajo del proceso y retirar su hueco si superó el límite de memoria"""
+        if not stats:
+            return
+        with self._lock:
+            previous_pid = self._slot_pids.get(slot)
+            if previous_pid != stats["pid"]:
+                if previous_pid is not None:
+                    # max_tasks_per_child sustituyó el proceso anterior
+                    self._worker_jobs.pop(previous_pid, None)
+                    self._recycled_workers += 1
+                self._slot_pids[slot] = stats["pid"]
+            self._worker_jobs[stats["pid"]] = self._worker_jobs.get(stats["pid"], 0) + 1
+        if not self.worker_max_rss or stats["rssBytes"] < self.worker_max_rss:
+            return
+        # El hueco está libre (su trabajo acaba de terminar): solo se sustituye este proceso
+        print(f"♻️ Recycling job worker {stats['pid']} ({stats['rssBytes'] // MB} MB resident)")
+        self._retire_slot(slot)
+        with self._lock:
+            self._recycled_workers += 1
+        if not self._shutting_down:
+            self._warm_slot(slot)
+
+    def _generate_job_id(self, execution_id: str) -> str:
+        return f"{execution_id}-{uuid.uuid4().hex[:12]}"
+
+    def _reservation_key(self, job_id: str) -> str:
+        return f"job:{job_id}"
+
+    def _enqueue(self, job: ImportJob) -> None:
+        # El tamaño de los archivos da el coste en la cola y la memoria estimada
+        metadatas = UploadService().get_metadatas_by_execution_id(job.executionId)
+        input_bytes = sum(m.fileSize for m in metadatas)
+        if metadatas and job.projectId is None:
+            job.projectId = metadatas[0].projectId
+            job.userId = metadatas[0].userId
+        # Mientras espera en la cola en memoria, el trabajo es de este proceso
+        job.ownerPid = os.getpid()
+        self.store.save(job)
+        with self._queue_lock:
+            self._memory_estimates[job.jobId] = int(input_bytes * IMPORT_MEMORY_PER_FILE_BYTE)
+            self._queue.push(job.jobId, job.projectId or "", job.userId or "", job.priority, input_bytes / MB)
+        self._pump()
+
+    def _pump(self) -> None:
+        """Pasar al pool los trabajos en cola mientras haya procesos y memoria libres"""
+        with self._queue_lock:
+            while len(self._queue) and len(self._futures) < self.max_workers and not self._shutting_down:
+                job_id = self._queue.peek()
+                estimate = self._memory_estimates.get(job_id, 0)
+                if self.admission is not None and not self.admission.try_reserve(self._reservation_key(job_id), estimate):
+                    # Se reintenta cuando termine otro trabajo o petición de
+                    # este proceso, o pasado JOB_MEMORY_RETRY_INTERVAL
+                    self._schedule_pump()
+                    break
+                self._queue.pop(job_id)
+                self._memory_estimates.pop(job_id, None)
+                job = self.store.load(job_id)
+                if job is None or job.status != JobStatus.QUEUED:
+                    self._release_memory(job_id)
+                    continue
+                self._dispatch(job)
+
+    def _schedule_pump(self) -> None:
+        with self._lock:
+            if self._pump_timer is not None or self._shutting_down:
+                return
+            self._pump_timer = threading.Timer(JOB_MEMORY_RETRY_INTERVAL, self._retry_pump)
+            self._pump_timer.daemon = True
+            self._pump_timer.start()
+
+    def _retry_pump(self) -> None:
+        with self._lock:
+            self._pump_timer = None
+        self._pump()
+
+    def _release_memory(self, job_id: str) -> None:
+        if self.admission is not None:
+            self.admission.release(self._reservation_key(job_id))
+
+    def _dispatch(self, job: ImportJob) -> None:
+        job.attempts += 1
+        self.store.save(job)
+        slot = self._idle_slot()
+        try:
+            future = self._get_executor(slot).submit(run_job, job.jobId)
+        except BrokenProcessPool:
+            # El proceso del hueco murió (p. ej. por memoria): sustituirlo y reintentar
+            self._retire_slot(slot, cancel=True)
+            future = self._get_executor(slot).submit(run_job, job.jobId)
+        self._futures[job.jobId] = future
+        self._job_slots[job.jobId] = slot
+        self._started[job.jobId] = time.monotonic()
+        future.add_done_callback(partial(self._on_job_done, job.jobId))
+
+    def _on_job_done(self, job_id: str, future: Future) -> None:
+        """Marcar como fallidos los trabajos cuyo proceso terminó sin informar"""
+        with self._queue_lock:
+            if self._shutting_down:
+                # Los trabajos interrumpidos se relanzan en el próximo arranque
+                return
+            # Con la cola bloqueada y antes de liberar el hueco: ningún trabajo
+            # nuevo puede ir a un proceso que se va a retirar
+            slot = self._job_slots.get(job_id)
+            if slot is not None and not future.cancelled() and future.exception() is None:
+                self._record_worker(slot, future.result())
+            self._futures.pop(job_id, None)
+            self._job_slots.pop(job_id, None)
+            self._queue.finished(job_id)
+            started = self._started.pop(job_id, None)
+        if started is not None and not future.cancelled():
+            duration = time.monotonic() - started
+            self._avg_duration = duration if self._avg_duration is None else 0.8 * self._avg_duration + 0.2 * duration
+        # Liberar la memoria reservada lanza también el siguiente trabajo en cola
+        self._release_memory(job_id)
+        self._pump()
+
+        job = self.store.load(job_id)
+        if future.cancelled():
+            # Cancelado antes de llegar a un proceso de trabajo
+            if job and job.status == JobStatus.QUEUED:
+                _mark_cancelled(self.store, job)
+                execution_reporter(job.executionId, {"jobId": job.jobId, "jobType": job.jobType.value}).cancel(job.message)
+        elif future.exception() is not None:
+            error = future.exception()
+            if isinstance(error, BrokenProcessPool) and slot is not None:
+                self._retire_slot(slot, cancel=True)
+            if job and job.status in (JobStatus.QUEUED, JobStatus.RUNNING):
+                job.status = JobStatus.FAILED
+                job.error = f"El proceso de trabajo terminó inesperadamente: {error}"
+                job.message = "Error durante el trabajo"
+                job.finishedAt = datetime.now().isoformat()
+                self.store.save(job)
+                UploadService().update_execution_status(job.executionId, ExecutionStatus.ERROR, job.error)
+        if job is not None:
+            self._notify_completion(job)
+        self.purge_finished_jobs()
+
+    def add_completion_listener(self, listener: Callable[[ImportJob], None]) -> None:
+        """Avisar cuando un trabajo termina (completado, fallido o cancelado)"""
+        self._completion_listeners.append(listener)
+
+    def _notify_completion(self, job: ImportJob) -> None:
+        for listener in list(self._completion_listeners):
+            try:
+                listener(job)
+            except Exception as e:
+                print(f"⚠️ Error in job completion listener: {str(e)}")
+
+    def retry_after(self) -> int:
+        return estimate_retry_after(self._avg_duration, len(self._queue), self.max_workers)
+
+    def check_admission(self, slots: int = 1) -> None:
+        """Lanzar AdmissionRejected si no caben ``slots`` trabajos más en la cola"""
+        if len(self._queue) + slots > self.queue_limit:
+            print(f"🚦 Rejected job submission: {len(self._queue)} job(s) queued")
+            raise AdmissionRejected(
+                "Hay demasiados trabajos en cola; inténtalo más tarde",
+                self.retry_after(),
+                len(self._queue)
+            )
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """Posición (desde 1) del trabajo en el orden de despacho, o None si no está esperando"""
+        with self._queue_lock:
+            return self._queue.position(job_id)
+
+    def _with_position(self, job: Optional[ImportJob]) -> Optional[ImportJob]:
+        if job is not None and job.status == JobStatus.QUEUED:
+            job.queuePosition = self.queue_position(job.jobId)
+        return job
+
+    def submit(
+        self,
+        job_type: JobType,
+        execution_id: str,
+        params: Dict[str, Any] = None,
+        priority: Optional[JobPriority] = None
+    ) -> ImportJob:
+        """Encolar un trabajo y devolverlo inmediatamente"""
+        self.check_admission()
+        job = ImportJob(
+            jobId=self._generate_job_id(execution_id),
+            executionId=execution_id,
+            jobType=job_type,
+            status=JobStatus.QUEUED,
+            priority=priority or DEFAULT_JOB_PRIORITIES[job_type],
+            message="En cola",
+            params=params or {},
+            submittedAt=datetime.now().isoformat()
+        )
+        self._enqueue(job)
+        print(f"📥 Job {job.jobId} queued ({job_type.value}, {job.priority.value})")
+        return self._with_position(job)
+
+    def get_job(self, job_id: str) -> Optional[ImportJob]:
+        return self._with_position(self.store.load(job_id))
+
+    def get_latest_job(self, execution_id: str) -> Optional[ImportJob]:
+        jobs = self.store.list_jobs(execution_id)
+        return self._with_position(jobs[-1]) if jobs else None
+
+    def cancel_execution(self, execution_id: str) -> List[ImportJob]:
+        """Solicitar la cancelación de los trabajos en cola o en curso de una ejecución.
+
+        Los trabajos en cola se retiran directamente; los que están en marcha
+        se detienen en su siguiente punto de cancelación.
+        """
+        cancelled = []
+        for job in self.store.list_jobs(execution_id):
+            if job.status not in (JobStatus.QUEUED, JobStatus.RUNNING):
+                continue
+            with self._queue_lock:
+                waiting = self._queue.remove(job.jobId)
+                if waiting:
+                    self._memory_estimates.pop(job.jobId, None)
+            if waiting:
+                _mark_cancelled(self.store, job)
+                execution_reporter(job.executionId, {"jobId": job.jobId, "jobType": job.jobType.value}).cancel(job.message)
+                cancelled.append(job)
+                continue
+            self.store.request_cancel(job.jobId)
+            future = self._futures.get(job.jobId)
+            if future is not None:
+                future.cancel()
+            cancelled.append(self.store.load(job.jobId) or job)
+        return cancelled
+
+    def purge_finished_jobs(self, force: bool = False) -> int:
+        """Borrar los trabajos terminados que superan IMPORT_JOB_RETENTION_HOURS (como mucho cada JOB_PURGE_INTERVAL)"""
+        now = time.monotonic()
+        if not force and self._last_purge is not None and now - self._last_purge < JOB_PURGE_INTERVAL:
+            return 0
+        self._last_purge = now
+        return self.store.purge_finished(IMPORT_JOB_RETENTION_HOURS * 3600)
+
+    def recover_jobs(self) -> int:
+        """Relanzar los trabajos que quedaron pendientes o a medias en un proceso que ya no existe.
+
+        Lo hace cada worker al arrancar: los trabajos que espera o ejecuta
+        otro proceso vivo (su ``ownerPid``) no se tocan, y ``adopt`` garantiza
+        que cada trabajo huérfano lo relanza un único worker.
+        """
+        self.store.migrate_flat_jobs()
+        recovered = 0
+        for job in self.store.list_jobs():
+            if job.status not in (JobStatus.QUEUED, JobStatus.RUNNING):
+                continue
+            if job.jobId in self._futures or job.jobId in self._queue:
+                continue
+            started_at = job.startedAt
+            job = self.store.adopt(job.jobId)
+            if job is None:
+                continue
+            if self.store.is_cancel_requested(job.jobId):
+                started = datetime.fromisoformat(started_at).timestamp() if started_at else None
+                _mark_cancelled(self.store, job, started)
+                continue
+            self._enqueue(job)
+            recovered += 1
+        if recovered:
+            print(f"🔁 Recovered {recovered} pending job(s)")
+        return recovered
+
+    def stats(self) -> Dict[str, Any]:
+        """Ocupación del pool y de la cola de trabajos"""
+        return {
+            "workers": self.max_workers,
+            "running": len(self._futures),
+            "queued": len(self._queue),
+            "queueLimit": self.queue_limit,
+            "avgDurationSeconds": round(self._avg_duration, 3) if self._avg_duration is not None else None,
+            "workerMaxJobs": self.worker_max_jobs,
+            "workerMaxRssMB": self.worker_max_rss // MB,
+            "workerJobs": dict(self._worker_jobs),
+            "recycledWorkers": self._recycled_workers
+        }
+
+    def queue_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Profundidad de cola y tiempos de espera por proyecto"""
+        with self._queue_lock:
+            return self._queue.project_stats()
+
+    def shutdown(self) -> None:
+        self._shutting_down = True
+        with self._lock:
+            if self._pump_timer is not None:
+                self._pump_timer.cancel()
+                self._pump_timer = None
+        for slot in range(self.max_workers):
+            self._retire_slot(slot, cancel=True)
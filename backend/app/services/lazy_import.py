@@ -0,0 +1,52 @@
+# backend/app/services/lazy_import.py
+import importlib
+import threading
+from types import ModuleType
+from typing import Any, Optional
+
+# Librerías de procesamiento de datos que solo necesitan la validación y la conversión
+DATA_STACK_MODULES = ("pandas", "numpy", "openpyxl")
+
+
+class LazyModule:
+    """Módulo que se importa la primera vez que se usa uno de sus atributos.
+
+    Sustituye a ``import pandas as pd`` en los servicios de procesamiento:
+    importar la aplicación web (``app.main``) no carga pandas, y un proceso
+    que solo atiende peticiones ligeras nunca paga su coste en tiempo de
+    arranque ni en memoria. Las anotaciones de tipo con ``pd.DataFrame``
+    requieren ``from __future__ import annotations`` en el módulo que lo usa.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_module(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def preload_data_stack() -> None:
+    """Importar de antemano las librerías de datos (en los procesos de trabajos)"""
+    for name in DATA_STACK_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            # openpyxl solo se usa con archivos .xlsx: no es imprescindible
+            pass
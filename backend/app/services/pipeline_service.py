@@ -0,0 +1,127 @@
+# backend/app/services/pipeline_service.py
+import threading
+from typing import List, Optional
+from app.models.import_models import FileMetadata, ImportJob, JobType, JobStatus, JobPriority, ExecutionStatus
+from app.services.job_service import JobService
+from app.services.upload_service import UploadService
+from app.services.admission_service import AdmissionRejected
+
+
+class PipelineService:
+    """Encadena subida → lectura → validación → conversión sin llamadas manuales.
+
+    Las etapas forman un DAG:
+
+    - lectura: un trabajo por archivo SAP en cuanto el archivo está en disco;
+      guarda el DataFrame como artefacto para la conversión.
+    - validación: se encola al terminar la subida, en paralelo con la lectura.
+    - conversión: se encola cuando la validación permite continuar y ninguna
+      lectura sigue pendiente; parte de los artefactos ya guardados.
+
+    Los trabajos del pipeline llevan ``pipeline: True`` en sus parámetros; el
+    estado del DAG se deduce de ellos, así que sobrevive a un reinicio. Al
+    añadir archivos a una ejecución el pipeline se lanza de nuevo: cada ronda
+    empieza tras la última validación o conversión de la ronda anterior.
+    """
+
+    def __init__(self, job_service: JobService, upload_service: Optional[UploadService] = None):
+        self.job_service = job_service
+        self.upload_service = upload_service or UploadService()
+        self._lock = threading.Lock()
+        job_service.add_completion_listener(self.on_job_finished)
+
+    def _is_sap_file(self, metadata: FileMetadata) -> bool:
+        name = metadata.originalFileName.lower()
+        return 'bkpf' in name or 'bseg' in name
+
+    def _current_round(self, execution_id: str) -> List[ImportJob]:
+        """Trabajos de la última ronda del pipeline de la ejecución"""
+        jobs = self.job_service.store.list_jobs(execution_id)
+        validations = [
+            index for index, job in enumerate(jobs)
+            if job.jobType == JobType.VALIDATION and job.params.get("pipeline")
+        ]
+        if len(validations) < 2:
+            return jobs
+        # La ronda anterior termina en su validación o, si llegó, en su conversión
+        boundary = max(
+            index for index, job in enumerate(jobs[:validations[-1]])
+            if job.jobType in (JobType.VALIDATION, JobType.CONVERSION) and job.params.get("pipeline")
+        )
+        return jobs[boundary + 1:]
+
+    def _pipeline_jobs(self, jobs: List[ImportJob], job_type: JobType) -> List[ImportJob]:
+        return [job for job in jobs if job.jobType == job_type and job.params.get("pipeline")]
+
+    def on_file_uploaded(self, metadata: FileMetadata) -> Optional[ImportJob]:
+        """Encolar la lectura de un archivo SAP recién guardado"""
+        if not self._is_sap_file(metadata):
+            return None
+        try:
+            return self.job_service.submit(
+                JobType.PARSE,
+                metadata.executionId,
+                {"files": [metadata.filePath], "pipeline": True}
+            )
+        except AdmissionRejected as e:
+            # La conversión leerá el archivo por su cuenta
+            print(f"⚠️ Pipeline parse not queued for {metadata.originalFileName}: {e.message}")
+            return None
+
+    def start(self, execution_id: str, params: dict = None, priority: JobPriority = JobPriority.INTERACTIVE) -> ImportJob:
+        """Encolar la validación del pipeline (lanza AdmissionRejected si no hay hueco)"""
+        job = self.job_service.submit(
+            JobType.VALIDATION,
+            execution_id,
+            {**(params or {}), "pipeline": True},
+            priority=priority
+        )
+        self.upload_service.update_execution_status(execution_id, ExecutionStatus.PROCESSING)
+        return job
+
+    def is_pending(self, execution_id: str) -> bool:
+        """Indica si el pipeline aún lanzará la conversión de la ejecución"""
+        jobs = self._current_round(execution_id)
+        validations = self._pipeline_jobs(jobs, JobType.VALIDATION)
+        if not validations or self._pipeline_jobs(jobs, JobType.CONVERSION):
+            return False
+        validation = validations[-1]
+        if validation.status in (JobStatus.QUEUED, JobStatus.RUNNING):
+            return True
+        return validation.status == JobStatus.COMPLETED and bool((validation.result or {}).get("canProceed"))
+
+    def resume(self) -> None:
+        """Retomar los pipelines que quedaron entre etapas antes de un reinicio"""
+        execution_ids = {job.executionId for job in self.job_service.store.list_jobs() if job.params.get("pipeline")}
+        for execution_id in execution_ids:
+            self._maybe_start_conversion(execution_id)
+
+    def on_job_finished(self, job: ImportJob) -> None:
+        if job.params.get("pipeline") and job.status == JobStatus.COMPLETED and job.jobType != JobType.CONVERSION:
+            self._maybe_start_conversion(job.executionId)
+
+    def _maybe_start_conversion(self, execution_id: str) -> Optional[ImportJob]:
+        with self._lock:
+            jobs = self._current_round(execution_id)
+            if self._pipeline_jobs(jobs, JobType.CONVERSION):
+                return None
+            validations = self._pipeline_jobs(jobs, JobType.VALIDATION)
+            if not validations:
+                return None
+            # Una ejecución cancelada no debe reanudarse
+            if any(job.status == JobStatus.CANCELLED for job in jobs):
+                return None
+            validation = validations[-1]
+            if validation.status != JobStatus.COMPLETED or not (validation.result or {}).get("canProceed"):
+                return None
+            # Una lectura fallida no bloquea: la conversión la repite
+            if any(job.status in (JobStatus.QUEUED, JobStatus.RUNNING) for job in self._pipeline_jobs(jobs, JobType.PARSE)):
+                return None
+            try:
+                job = self.job_service.submit(JobType.CONVERSION, execution_id, {"pipeline": True})
+            except AdmissionRejected as e:
+                print(f"⚠️ Pipeline conversion not queued for {execution_id}: {e.message}")
+                return None
+            self.upload_service.update_execution_status(execution_id, ExecutionStatus.PROCESSING)
+            print(f"🔗 Pipeline {execution_id}: conversion queued")
+            return job
@@ -0,0 +1,316 @@
+# backend/app/services/progress_service.py
+import os
+import json
+import time
+import asyncio
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Callable, Tuple, AsyncIterator, Awaitable
+from app.config.settings import (
+    IMPORT_JOB_PROGRESS_INTERVAL, PROGRESS_STREAM_POLL_INTERVAL, PROGRESS_STREAM_IDLE_TIMEOUT,
+    PROGRESS_LOG_RETENTION_HOURS
+)
+
+# Eventos que cierran el seguimiento de un trabajo
+TERMINAL_EVENTS = ("finished", "failed", "cancelled")
+# Segundos entre comentarios de keep-alive en el stream
+SSE_HEARTBEAT_SECONDS = 15
+
+class OperationCancelled(BaseException):
+    """Cancelación solicitada por el usuario.
+
+    Hereda de BaseException (como asyncio.CancelledError) para que los
+    ``except Exception`` de los servicios, que aplican alternativas ante
+    errores, no la absorban y el trabajo se detenga de verdad.
+    """
+
+
+def progress_path() -> str:
+    return os.path.join(os.path.dirname(__file__), '..', 'storage', 'progress')
+
+
+def purge_progress_logs(retention_hours: float = PROGRESS_LOG_RETENTION_HOURS) -> int:
+    """Borrar los registros de progreso sin eventos nuevos en ``retention_hours``.
+
+    Un registro que no cambia en ese tiempo es de una ejecución terminada y
+    sin streams que lo sigan (un stream se cierra tras
+    PROGRESS_STREAM_IDLE_TIMEOUT sin eventos).
+    """
+    if retention_hours <= 0:
+        return 0
+    cutoff = time.time() - retention_hours * 3600
+    purged = 0
+    try:
+        entries = list(os.scandir(progress_path()))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.name.endswith('.jsonl') and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                purged += 1
+        except FileNotFoundError:
+            pass
+    if purged:
+        print(f"🧹 Purged {purged} progress log(s)")
+    return purged
+
+
+class ProgressLog:
+    """Registro de eventos de progreso de una ejecución (un JSON por línea).
+
+    Lo escriben la API (subida) y los procesos de trabajo (validación y
+    conversión), y lo leen los streams SSE. La posición en bytes tras cada
+    línea sirve como id del evento para reanudar el stream.
+    """
+
+    def __init__(self, execution_id: str):
+        self.progress_path = progress_path()
+        self.log_file = os.path.join(self.progress_path, f"{execution_id}.jsonl")
+
+        # Crear directorio si no existe
+        os.makedirs(self.progress_path, exist_ok=True)
+
+    def append(self, event: Dict[str, Any]) -> None:
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        # Una sola escritura en modo append para no intercalar líneas entre procesos
+        with open(self.log_file, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+    def read_from(self, offset: int = 0) -> Tuple[List[Tuple[int, Dict[str, Any]]], int]:
+        """Leer los eventos completos a partir de ``offset``.
+
+        Devuelve [(posición_final, evento)] y la posición hasta la que se leyó;
+        una línea a medio escribir se deja para la siguiente lectura.
+        """
+        events = []
+        try:
+            f = open(self.log_file, 'rb')
+        except FileNotFoundError:
+            return events, offset
+        with f:
+            if offset > os.fstat(f.fileno()).st_size:
+                # El registro se purgó y se volvió a crear: empezar desde el principio
+                offset = 0
+            f.seek(offset)
+            for raw_line in f:
+                if not raw_line.endswith(b"\n"):
+                    break
+                offset += len(raw_line)
+                try:
+                    events.append((offset, json.loads(raw_line)))
+                except ValueError:
+                    continue
+        return events, offset
+
+
+class ProgressReporter:
+    """Informa del avance por etapas: filas procesadas, throughput y ETA.
+
+    ``advance`` solo suma contadores y consulta el reloj; los eventos de
+    progreso se emiten como mucho cada ``interval`` segundos, de modo que
+    llamarlo desde los bucles de lectura apenas tiene coste. Los cambios de
+    etapa se emiten siempre.
+
+    Cada llamada a ``stage``/``advance`` es además un punto de cancelación:
+    si ``cancel_check`` devuelve True se lanza OperationCancelled.
+    """
+
+    def __init__(
+        self,
+        execution_id: str,
+        listeners: Optional[List[Callable[[Dict[str, Any]], None]]] = None,
+        interval: float = IMPORT_JOB_PROGRESS_INTERVAL,
+        context: Optional[Dict[str, Any]] = None,
+        cancel_check: Optional[Callable[[], bool]] = None
+    ):
+        self.execution_id = execution_id
+        self.context = context or {}  # Campos fijos añadidos a cada evento (p. ej. jobId)
+        self.cancel_check = cancel_check
+        self.listeners = list(listeners or [])
+        self.interval = interval
+        self.overall = 0.0
+        self.stage_name = None
+        self.label = None
+        self.total = None
+        self.rows = 0
+        self.fraction = None
+        self._stage_started = 0.0
+        self._last_emit = 0.0
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        self.listeners.append(listener)
+
+    def set_overall(self, fraction: float) -> None:
+        """Fijar el avance global del trabajo (0-1), p. ej. por archivo procesado"""
+        self.overall = min(max(fraction, 0.0), 1.0)
+
+    def checkpoint(self) -> None:
+        """Punto de cancelación cooperativa"""
+        if self.cancel_check is not None and self.cancel_check():
+            raise OperationCancelled(f"Operación cancelada en la etapa {self.stage_name or 'inicial'}")
+
+    def stage(self, name: str, label: str = None, total: Optional[int] = None) -> None:
+        """Cerrar la etapa en curso y comenzar otra"""
+        self.checkpoint()
+        if self.stage_name is not None:
+            self._emit("completed")
+        self.stage_name = name
+        self.label = label or name
+        self.total = total
+        self.rows = 0
+        self.fraction = None
+        self._stage_started = self._last_emit = time.monotonic()
+        self._emit("started")
+
+    def advance(self, rows: int, fraction: Optional[float] = None, total: Optional[int] = None) -> None:
+        """Sumar filas procesadas en la etapa en curso.
+
+        ``fraction`` permite estimar la ETA cuando no se conoce el total de
+        filas (p. ej. bytes leídos / tamaño del archivo).
+        """
+        self.checkpoint()
+        self.rows += rows
+        if fraction is not None:
+            self.fraction = fraction
+        if total is not None:
+            self.total = total
+        now = time.monotonic()
+        if now - self._last_emit >= self.interval:
+            self._last_emit = now
+            self._emit("progress")
+
+    def complete(self) -> None:
+        """Cerrar la etapa en curso"""
+        if self.stage_name is not None:
+            self._emit("completed")
+            self.stage_name = None
+
+    def finish(self, message: str = None) -> None:
+        self.complete()
+        self.overall = 1.0
+        self._emit("finished", message=message)
+
+    def fail(self, error: str) -> None:
+        self._emit("failed", message=error)
+        self.stage_name = None
+
+    def cancel(self, message: str = None) -> None:
+        self._emit("cancelled", message=message)
+        self.stage_name = None
+
+    def _stage_fraction(self) -> Optional[float]:
+        if self.total:
+            return min(self.rows / self.total, 1.0)
+        return self.fraction
+
+    def _emit(self, event_type: str, message: str = None) -> None:
+        elapsed = time.monotonic() - self._stage_started if self.stage_name else 0.0
+        throughput = self.rows / elapsed if elapsed > 0 else None
+        fraction = 1.0 if event_type == "completed" else self._stage_fraction()
+        eta = None
+        if event_type in ("started", "progress") and fraction and 0 < fraction < 1 and elapsed > 0:
+            eta = round(elapsed * (1 - fraction) / fraction, 1)
+
+        event = {
+            "executionId": self.execution_id,
+            **self.context,
+            "event": event_type,
+            "stage": self.stage_name,
+            "label": self.label if self.stage_name else None,
+            "rowsProcessed": self.rows,
+            "totalRows": self.total,
+            "stageProgress": round(fraction * 100, 1) if fraction is not None else None,
+            "overallProgress": round(self.overall * 100, 1),
+            "throughput": round(throughput, 1) if throughput else None,  # filas/segundo
+            "etaSeconds": eta,
+            "elapsedSeconds": round(elapsed, 3),
+            "message": message,
+            "timestamp": datetime.now().isoformat()
+        }
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"⚠️ Error in progress listener: {str(e)}")
+
+
+class NullProgressReporter(ProgressReporter):
+    """Reporter sin destino para las llamadas que no siguen el progreso"""
+
+    def __init__(self):
+        super().__init__(execution_id="")
+
+    def stage(self, name: str, label: str = None, total: Optional[int] = None) -> None:
+        pass
+
+    def advance(self, rows: int, fraction: Optional[float] = None, total: Optional[int] = None) -> None:
+        pass
+
+    def complete(self) -> None:
+        pass
+
+    def finish(self, message: str = None) -> None:
+        pass
+
+    def fail(self, error: str) -> None:
+        pass
+
+    def cancel(self, message: str = None) -> None:
+        pass
+
+    def checkpoint(self) -> None:
+        pass
+
+
+NULL_PROGRESS = NullProgressReporter()
+
+
+def execution_reporter(
+    execution_id: str,
+    context: Optional[Dict[str, Any]] = None,
+    cancel_check: Optional[Callable[[], bool]] = None
+) -> ProgressReporter:
+    """Reporter que publica en el registro de eventos de la ejecución"""
+    return ProgressReporter(
+        execution_id, [ProgressLog(execution_id).append], context=context, cancel_check=cancel_check
+    )
+
+
+def format_sse(event: Dict[str, Any], event_id: int) -> str:
+    """Serializar un evento en formato Server-Sent Events"""
+    return f"id: {event_id}\nevent: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+async def stream_progress_events(
+    execution_id: str,
+    offset: int,
+    has_active_jobs: Callable[[], bool],
+    is_disconnected: Callable[[], Awaitable[bool]]
+) -> AsyncIterator[str]:
+    """Seguir el registro de eventos de una ejecución y emitirlo como SSE.
+
+    El stream termina cuando un trabajo finaliza y no queda ninguno en cola,
+    cuando el cliente se desconecta o tras PROGRESS_STREAM_IDLE_TIMEOUT
+    segundos sin eventos nuevos.
+    """
+    log = ProgressLog(execution_id)
+    idle = 0.0
+    since_heartbeat = 0.0
+    while True:
+        events, offset = log.read_from(offset)
+        for event_offset, event in events:
+            yield format_sse(event, event_offset)
+
+        if events:
+            idle = 0.0
+            if any(event["event"] in TERMINAL_EVENTS for _, event in events) and not has_active_jobs():
+                break
+        if await is_disconnected() or idle >= PROGRESS_STREAM_IDLE_TIMEOUT:
+            break
+
+        if since_heartbeat >= SSE_HEARTBEAT_SECONDS:
+            since_heartbeat = 0.0
+            yield ": keep-alive\n\n"
+        await asyncio.sleep(PROGRESS_STREAM_POLL_INTERVAL)
+        idle += PROGRESS_STREAM_POLL_INTERVAL
+        since_heartbeat += PROGRESS_STREAM_POLL_INTERVAL
@@ -1,9 +1,10 @@
 # backend/app/services/project_service.py
 import json
 import os
-from typing import List
+from typing import List, Dict
 from app.models.project import Project
 from app.models.user import User
+from app.services.reference_data import reference_data, ReferenceData
 
 class ProjectService:
     def __init__(self):
@@ -20,28 +21,33 @@ class ProjectService:
         except json.JSONDecodeError:
             return []
     
+    def _projects(self) -> ReferenceData:
+        """Proyectos en caché; se vuelven a leer solo si cambia el archivo"""
+        return reference_data.get(self.data_file, self._load_projects_data)
+    
+    def _build_projects_index(self, projects_data: List[dict]) -> Dict[str, Project]:
+        """Índice ID de proyecto → proyecto, en el orden del archivo"""
+        return {project.id: project for project in (Project(**data) for data in projects_data)}
+    
+    def data_version(self) -> str:
+        """Versión de los datos de proyectos (cambia al modificarse el archivo)"""
+        return self._projects().version
+    
     def get_all_projects(self) -> List[Project]:
         """Obtener todos los proyectos disponibles"""
-        projects_data = self._load_projects_data()
-        return [Project(**project_data) for project_data in projects_data]
+        return list(self._projects().index("projects_by_id", self._build_projects_index).values())
     
     def get_projects_for_user(self, user: User) -> List[Project]:
         """Obtener proyectos filtrados según los proyectos asignados al usuario"""
-        all_projects = self.get_all_projects()
-        user_projects = []
+        projects = self._projects()
         
-        for project in all_projects:
-            if project.id in user.projects:
-                user_projects.append(project)
+        def build(_):
+            allowed = set(user.projects)
+            return [project for project in projects.index("projects_by_id", self._build_projects_index).values() if project.id in allowed]
         
-        return user_projects
+        # Índice por lista de proyectos asignados: sigue siendo válido si cambia el usuario
+        return list(projects.index(("for_user", tuple(user.projects)), build))
     
     def get_project_by_id(self, project_id: str) -> Project:
         """Obtener un proyecto específico por ID"""
-        projects = self.get_all_projects()
-        
-        for project in projects:
-            if project.id == project_id:
-                return project
-        
-        return None
\ No newline at end of file
+        return self._projects().index("projects_by_id", self._build_projects_index).get(project_id)
\ No newline at end of file
@@ -0,0 +1,95 @@
+# backend/app/services/reference_data.py
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from app.config.settings import REFERENCE_DATA_CHECK_INTERVAL
+
+
+class ReferenceData:
+    """Contenido de un archivo de datos de referencia y los índices derivados de él.
+
+    Los índices se construyen la primera vez que se piden y se descartan
+    junto con el contenido cuando el archivo cambia. Los modelos que
+    contienen son compartidos entre peticiones: no deben modificarse.
+    """
+
+    def __init__(self, raw: Any, signature: Optional[Tuple[int, int, int]]):
+        self.raw = raw
+        self.signature = signature
+        # Versión del contenido (no de la fecha del archivo): estable entre reinicios
+        self.version = hashlib.sha256(
+            json.dumps(raw, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+        ).hexdigest()[:16]
+        self.checked_at = time.monotonic()
+        self._indexes: Dict[Hashable, Any] = {}
+        # Reentrante: un índice puede construirse a partir de otro
+        self._lock = threading.RLock()
+
+    def index(self, name: Hashable, builder: Callable[[Any], Any]) -> Any:
+        """Índice ``name`` construido con ``builder`` a partir del contenido"""
+        try:
+            return self._indexes[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._indexes:
+                self._indexes[name] = builder(self.raw)
+            return self._indexes[name]
+
+
+class ReferenceDataCache:
+    """Caché en memoria de los JSON de referencia (usuarios, proyectos, aplicaciones...).
+
+    Cada archivo se lee y se parsea una sola vez; las consultas posteriores
+    usan los modelos e índices ya construidos. Un archivo se vuelve a leer
+    cuando cambian su fecha de modificación, tamaño o inodo, que se revisan
+    como mucho cada REFERENCE_DATA_CHECK_INTERVAL segundos, o tras llamar
+    a ``invalidate``.
+    """
+
+    def __init__(self, check_interval: float = REFERENCE_DATA_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._entries: Dict[str, ReferenceData] = {}
+        self._lock = threading.Lock()
+
+    def _signature(self, path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def get(self, path: str, loader: Callable[[], Any]) -> ReferenceData:
+        """Contenido vigente de ``path``; ``loader`` lo lee cuando hace falta"""
+        path = os.path.abspath(path)
+        entry = self._entries.get(path)
+        if entry is not None and time.monotonic() - entry.checked_at < self.check_interval:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(path)
+            signature = self._signature(path)
+            if entry is not None and entry.signature == signature:
+                entry.checked_at = time.monotonic()
+                return entry
+            # La firma se toma antes de leer: si el archivo cambia durante la
+            # lectura, la siguiente revisión lo vuelve a cargar
+            entry = ReferenceData(loader(), signature)
+            self._entries[path] = entry
+            print(f"📚 Reference data loaded: {os.path.basename(path)} (version {entry.version})")
+            return entry
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Descartar un archivo (o todos) para que se vuelva a leer en la siguiente consulta"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(path), None)
+
+
+# Caché compartida por todas las instancias de los servicios
+reference_data = ReferenceDataCache()
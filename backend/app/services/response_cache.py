@@ -0,0 +1,83 @@
+# backend/app/services/response_cache.py
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+from app.config.settings import RESPONSE_CACHE_MAX_ENTRIES
+from app.services import fast_json
+
+# El navegador guarda la respuesta pero la revalida (If-None-Match) en cada uso
+REFERENCE_CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: str) -> str:
+    """ETag fuerte a partir de las versiones de los datos de los que depende la respuesta"""
+    return '"' + hashlib.sha256("\0".join(parts).encode('utf-8')).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Indica si la cabecera If-None-Match del cliente incluye ``etag``"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match usa comparación débil: se ignora el prefijo W/
+    for tag in header.split(","):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith("W/") else tag) == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """Cuerpos JSON ya serializados, indexados por clave (ruta y usuario) y ETag.
+
+    Una respuesta se reconstruye solo cuando cambia la versión de los datos
+    de referencia (y con ella el ETag). Si el cliente ya tiene esa versión,
+    se responde 304 sin cuerpo. Se conservan las RESPONSE_CACHE_MAX_ENTRIES
+    claves usadas más recientemente.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: str, etag: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _store(self, key: str, etag: str, body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def respond(self, request: Request, key: str, etag: str, build: Callable[[], BaseModel]) -> Response:
+        """304 si el cliente tiene la versión actual; si no, el cuerpo en caché o recién construido"""
+        headers = {"ETag": etag, "Cache-Control": REFERENCE_CACHE_CONTROL}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+
+        body = self._lookup(key, etag)
+        if body is None:
+            body = fast_json.dumps(build())
+            self._store(key, etag, body)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Caché compartida por los routers de usuarios, proyectos y aplicaciones
+response_cache = ResponseCache()
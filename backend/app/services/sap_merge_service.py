@@ -1,24 +1,39 @@
 # backend/app/services/sap_merge_service.py
+from __future__ import annotations
 import os
 import re
-import pandas as pd
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from app.models.import_models import FileMetadata
+from app.services.progress_service import ProgressReporter, NULL_PROGRESS
+from app.services.artifact_service import ArtifactStore, fingerprint, input_fingerprint
+from app.services.lazy_import import lazy_module
+
+# pandas se importa al usarse por primera vez, no al cargar la aplicación web
+pd = lazy_module("pandas")
+
+# Filas entre avisos de progreso (y puntos de cancelación) en los bucles por línea
+PROGRESS_BATCH_ROWS = 2000
 
 class SAPMergeService:
     def __init__(self):
         pass
     
-    def parse_sap_file(self, file_path: str, file_type: str) -> pd.DataFrame:
+    def parse_sap_file(
+        self,
+        file_path: str,
+        file_type: str,
+        progress: Optional[ProgressReporter] = None
+    ) -> pd.DataFrame:
         """Parsear archivo SAP (BKPF o BSEG) a DataFrame"""
+        progress = progress or NULL_PROGRESS
         try:
             with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
                 content = f.read()
             
             if file_type.upper() == 'BKPF':
-                return self._parse_bkpf_content(content)
+                return self._parse_bkpf_content(content, progress)
             elif file_type.upper() == 'BSEG':
-                return self._parse_bseg_content(content)
+                return self._parse_bseg_content(content, progress)
             else:
                 raise ValueError(f"Tipo de archivo SAP no soportado: {file_type}")
                 
@@ -26,13 +41,43 @@ class SAPMergeService:
             print(f"Error parsing SAP file {file_path}: {str(e)}")
             return pd.DataFrame()
     
-    def _parse_bkpf_content(self, content: str) -> pd.DataFrame:
+    def load_or_parse_sap_file(
+        self,
+        metadata: FileMetadata,
+        file_type: str,
+        progress: Optional[ProgressReporter] = None,
+        artifacts: Optional[ArtifactStore] = None
+    ) -> pd.DataFrame:
+        """Parsear un archivo SAP reutilizando su DataFrame si ya se leyó y no ha cambiado"""
+        progress = progress or NULL_PROGRESS
+        if artifacts is None:
+            return self.parse_sap_file(metadata.filePath, file_type, progress)
+        
+        name, fp = self._parsed_artifact(metadata, file_type)
+        df = artifacts.load(name, fp)
+        if df is not None:
+            progress.stage("parse", f"Reutilizando lectura de {metadata.originalFileName}")
+            return df
+        
+        df = self.parse_sap_file(metadata.filePath, file_type, progress)
+        if not df.empty:
+            artifacts.save(name, fp, df, "parse")
+        return df
+    
+    def _parsed_artifact(self, metadata: FileMetadata, file_type: str) -> Tuple[str, str]:
+        """Nombre y huella del artefacto con el DataFrame leído de un archivo"""
+        return f"parsed_{os.path.basename(metadata.filePath)}", fingerprint(file_type, input_fingerprint(metadata))
+    
+    def _parse_bkpf_content(self, content: str, progress: ProgressReporter = NULL_PROGRESS) -> pd.DataFrame:
         """Parsear contenido del archivo BKPF (cabeceras de documento)"""
         lines = content.split('\n')
         data = []
+        progress.stage("parse", "Leyendo BKPF", total=len(lines))
         
         # Buscar líneas que contengan datos (ignorar cabeceras y separadores)
-        for line in lines:
+        for line_number, line in enumerate(lines, 1):
+            if line_number % PROGRESS_BATCH_ROWS == 0:
+                progress.advance(PROGRESS_BATCH_ROWS)
             # Verificar si la línea contiene datos de BKPF
             if '|  OIVE|' in line and not line.startswith('---'):
                 parts = [part.strip() for part in line.split('|')]
@@ -60,16 +105,20 @@ class SAPMergeService:
                         print(f"Error parsing BKPF line: {line[:100]}... - {str(e)}")
                         continue
         
+        progress.advance(len(lines) % PROGRESS_BATCH_ROWS)
         print(f"Parsed {len(data)} BKPF records")
         return pd.DataFrame(data)
     
-    def _parse_bseg_content(self, content: str) -> pd.DataFrame:
+    def _parse_bseg_content(self, content: str, progress: ProgressReporter = NULL_PROGRESS) -> pd.DataFrame:
         """Parsear contenido del archivo BSEG (posiciones de documento) - VERSIÓN CORREGIDA"""
         lines = content.split('\n')
         data = []
+        progress.stage("parse", "Leyendo BSEG", total=len(lines))
         
         # Buscar líneas que contengan datos
-        for line in lines:
+        for line_number, line in enumerate(lines, 1):
+            if line_number % PROGRESS_BATCH_ROWS == 0:
+                progress.advance(PROGRESS_BATCH_ROWS)
             # Verificar si la línea contiene datos de BSEG y no es una línea de separación
             if '|  OIVE|' in line and not line.startswith('---'):
                 parts = [part.strip() for part in line.split('|')]
@@ -105,6 +154,7 @@ class SAPMergeService:
                 else:
                     print(f"Skipping line with insufficient columns ({len(parts)}): {line[:100]}...")
         
+        progress.advance(len(lines) % PROGRESS_BATCH_ROWS)
         print(f"Parsed {len(data)} BSEG records")
         return pd.DataFrame(data)
     
@@ -146,8 +196,14 @@ class SAPMergeService:
             print(f"Error parsing amount '{amount_str}': {str(e)}")
             return 0.0
     
-    def merge_bkpf_bseg(self, bkpf_df: pd.DataFrame, bseg_df: pd.DataFrame) -> pd.DataFrame:
+    def merge_bkpf_bseg(
+        self,
+        bkpf_df: pd.DataFrame,
+        bseg_df: pd.DataFrame,
+        progress: Optional[ProgressReporter] = None
+    ) -> pd.DataFrame:
         """Combinar DataFrames de BKPF y BSEG para crear libro diario"""
+        progress = progress or NULL_PROGRESS
         try:
             if bkpf_df.empty or bseg_df.empty:
                 print("Warning: One of the DataFrames is empty")
@@ -172,10 +228,18 @@ class SAPMergeService:
             
             print(f"Merged result: {len(merged_df)} records")
             
+            # Las posiciones sin cabecera quedan con campos BKPF vacíos tras el left join
+            orphan_lines = int(merged_df['fecha_contabilizacion'].isna().sum())
+            if orphan_lines:
+                print(f"Warning: {orphan_lines} BSEG records have no matching BKPF header")
+            
             # Crear estructura de libro diario estándar
             libro_diario = []
+            progress.advance(0, total=len(merged_df))
             
-            for _, row in merged_df.iterrows():
+            for row_number, (_, row) in enumerate(merged_df.iterrows(), 1):
+                if row_number % PROGRESS_BATCH_ROWS == 0:
+                    progress.advance(PROGRESS_BATCH_ROWS)
                 # Determinar debe y haber
                 debe = row['importe_moneda_local'] if row['indicador_debe_haber'] == 'S' else 0.0
                 haber = row['importe_moneda_local'] if row['indicador_debe_haber'] == 'H' else 0.0
@@ -197,6 +261,7 @@ class SAPMergeService:
                 }
                 libro_diario.append(registro)
             
+            progress.advance(len(merged_df) % PROGRESS_BATCH_ROWS)
             return pd.DataFrame(libro_diario)
             
         except Exception as e:
@@ -273,61 +338,273 @@ class SAPMergeService:
         # Por defecto, asumir BSEG si no está claro (porque es más común)
         return 'BSEG'
     
-    def process_sap_files(self, metadatas: List[FileMetadata]) -> Dict[str, Any]:
-        """Procesar múltiples archivos SAP y generar libro diario consolidado"""
-        try:
-            bkpf_files = []
-            bseg_files = []
+    def _classify_sap_files(self, metadatas: List[FileMetadata]) -> Tuple[List[FileMetadata], List[FileMetadata]]:
+        bkpf_files = []
+        bseg_files = []
+        for metadata in metadatas:
+            file_type = self.identify_file_type(metadata.originalFileName, metadata.filePath)
+            print(f"File {metadata.originalFileName} identified as {file_type}")
             
+            if file_type == 'BKPF':
+                bkpf_files.append(metadata)
+            elif file_type == 'BSEG':
+                bseg_files.append(metadata)
+        return bkpf_files, bseg_files
+    
+    def merged_fingerprint(self, metadatas: List[FileMetadata]) -> str:
+        """Huella del libro diario fusionado: tipo y huella de cada archivo de entrada"""
+        bkpf_files, bseg_files = self._classify_sap_files(metadatas)
+        inputs = [f"BKPF:{input_fingerprint(m)}" for m in bkpf_files] + [f"BSEG:{input_fingerprint(m)}" for m in bseg_files]
+        return fingerprint("merged", *sorted(inputs))
+    
+    def _document_keys(self, df: pd.DataFrame) -> pd.Series:
+        """Clave de documento (sociedad, ejercicio, número) de cada fila de BKPF o BSEG"""
+        return (
+            df['sociedad'].astype(str) + '-' + df['ejercicio'].astype(str) + '|' +
+            df['numero_documento'].astype(str).str.zfill(10)
+        )
+    
+    def _changed_documents(self, old_dfs: List[pd.DataFrame], new_dfs: List[pd.DataFrame]) -> set:
+        """Documentos cuyas filas difieren entre los archivos retirados y los nuevos de un tipo.
+
+        Se comparan las filas de cada documento como multiconjunto (hash de
+        fila), de modo que un archivo corregido solo marca los documentos que
+        realmente cambiaron y no todos los que contiene.
+        """
+        frames, hashes = [], []
+        for dfs in (old_dfs, new_dfs):
+            dfs = [df for df in dfs if not df.empty]
+            df = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+            frames.append(df)
+            hashes.append(pd.util.hash_pandas_object(df, index=False) if not df.empty else pd.Series(dtype='uint64'))
+        
+        # La clave forma parte de la fila: basta con las filas cuyo hash no cuadra
+        difference = hashes[0].value_counts().sub(hashes[1].value_counts(), fill_value=0)
+        differing = difference[difference != 0].index
+        changed = set()
+        for df, row_hashes in zip(frames, hashes):
+            if not df.empty:
+                changed.update(self._document_keys(df[row_hashes.isin(differing).values]))
+        return changed
+    
+    def _libro_document_keys(self, libro_diario_df: pd.DataFrame) -> pd.Series:
+        """Clave de documento de cada apunte fusionado (referencia = sociedad-ejercicio-posición)"""
+        return libro_diario_df['referencia'].astype(str).str.rsplit('-', n=1).str[0] + '|' + libro_diario_df['asiento'].astype(str)
+    
+    def _previous_inputs(self, metadatas: List[FileMetadata], artifacts: ArtifactStore) -> Optional[List[FileMetadata]]:
+        """Archivos del libro ya fusionado en la ejecución, si son parte de los actuales"""
+        manifest = artifacts.manifest("merged") or {}
+        inputs = set(manifest.get("inputs") or [])
+        bkpf_files, bseg_files = self._classify_sap_files(metadatas)
+        current = [m for m in bkpf_files + bseg_files if m.filePath in inputs]
+        if not inputs or len(current) != len(inputs) or len(current) == len(bkpf_files) + len(bseg_files):
+            return None
+        return current
+    
+    def _delta_merge(
+        self,
+        bkpf_files: List[FileMetadata],
+        bseg_files: List[FileMetadata],
+        base_metadatas: List[FileMetadata],
+        base_artifacts: ArtifactStore,
+        progress: ProgressReporter,
+        artifacts: Optional[ArtifactStore]
+    ) -> Optional[Tuple[pd.DataFrame, int, int]]:
+        """Rehacer el merge solo para los documentos de los archivos que cambiaron.
+
+        Compara los archivos con los de la versión anterior por hash de
+        contenido. Los archivos sin cambios se toman de la lectura guardada
+        de la versión anterior; solo se leen los nuevos. Entre los archivos
+        nuevos y los retirados de cada tipo se buscan los documentos con
+        alguna fila distinta, y solo esos se fusionan de nuevo; el resto de
+        apuntes se copian del libro fusionado anterior, ya que sus filas de
+        BKPF y BSEG no cambiaron. Los apuntes recalculados quedan al final
+        del libro.
+
+        Devuelve None si no es aplicable (sin libro anterior, sin hashes o
+        sin ningún archivo en común) y hay que hacer el merge completo.
+        """
+        new_files = [('BKPF', m) for m in bkpf_files] + [('BSEG', m) for m in bseg_files]
+        base_bkpf, base_bseg = self._classify_sap_files(base_metadatas)
+        base_files = [('BKPF', m) for m in base_bkpf] + [('BSEG', m) for m in base_bseg]
+        if not bkpf_files or not bseg_files or not base_bkpf or not base_bseg:
+            return None
+        if any(m.contentHash is None for _, m in new_files + base_files):
+            return None
+        
+        base_by_content = {(file_type, m.contentHash): m for file_type, m in base_files}
+        new_content = {(file_type, m.contentHash) for file_type, m in new_files}
+        unchanged = [(t, m) for t, m in new_files if (t, m.contentHash) in base_by_content]
+        if not unchanged:
+            return None
+        
+        try:
+            base_merged = base_artifacts.load("merged", self.merged_fingerprint(base_metadatas))
+        except OSError:
+            # Los archivos de la versión anterior ya no están en disco
+            return None
+        if base_merged is None or not base_merged["bkpf_records"] or not base_merged["bseg_records"]:
+            return None
+        
+        changed = [(t, m) for t, m in new_files if (t, m.contentHash) not in base_by_content]
+        removed = [(t, m) for t, m in base_files if (t, m.contentHash) not in new_content]
+        print(f"🔀 Delta merge: {len(changed)} changed, {len(removed)} removed, {len(unchanged)} unchanged file(s)")
+        
+        frames = {'BKPF': [], 'BSEG': []}
+        changed_frames = {'BKPF': [], 'BSEG': []}
+        removed_frames = {'BKPF': [], 'BSEG': []}
+        parse_count = len(new_files) + len(removed)
+        for index, (file_type, metadata) in enumerate(new_files):
+            progress.set_overall(0.5 * index / parse_count)
+            base_metadata = base_by_content.get((file_type, metadata.contentHash))
+            if base_metadata is not None:
+                df = self.load_or_parse_sap_file(base_metadata, file_type, progress, base_artifacts)
+                if artifacts is not None and not df.empty and base_metadata.filePath != metadata.filePath:
+                    # Enlazar la lectura también en esta ejecución para futuras versiones
+                    artifacts.adopt(base_artifacts, self._parsed_artifact(base_metadata, file_type)[0],
+                                    *self._parsed_artifact(metadata, file_type), "parse")
+            else:
+                df = self.load_or_parse_sap_file(metadata, file_type, progress, artifacts)
+                changed_frames[file_type].append(df)
+            if not df.empty:
+                frames[file_type].append(df)
+        
+        for index, (file_type, metadata) in enumerate(removed):
+            progress.set_overall(0.5 * (len(new_files) + index) / parse_count)
+            removed_frames[file_type].append(
+                self.load_or_parse_sap_file(metadata, file_type, progress, base_artifacts)
+            )
+        
+        changed_keys = set()
+        for file_type in ('BKPF', 'BSEG'):
+            if changed_frames[file_type] or removed_frames[file_type]:
+                changed_keys |= self._changed_documents(removed_frames[file_type], changed_frames[file_type])
+        
+        combined_bkpf = pd.concat(frames['BKPF'], ignore_index=True) if frames['BKPF'] else pd.DataFrame()
+        combined_bseg = pd.concat(frames['BSEG'], ignore_index=True) if frames['BSEG'] else pd.DataFrame()
+        if combined_bkpf.empty or combined_bseg.empty:
+            return None
+        
+        progress.set_overall(0.5)
+        progress.stage("merge", f"Fusionando {len(changed_keys)} documento(s) modificado(s)")
+        bkpf_delta = combined_bkpf[self._document_keys(combined_bkpf).isin(changed_keys)].copy()
+        bseg_delta = combined_bseg[self._document_keys(combined_bseg).isin(changed_keys)].copy()
+        if bseg_delta.empty:
+            libro_delta = pd.DataFrame()
+        elif bkpf_delta.empty:
+            # merge_bkpf_bseg trata un BKPF vacío como "solo BSEG": usar el merge completo
+            return None
+        else:
+            libro_delta = self.merge_bkpf_bseg(bkpf_delta, bseg_delta, progress)
+            if libro_delta.empty:
+                return None
+        
+        base_libro = base_merged["libro_diario"]
+        kept = base_libro[~self._libro_document_keys(base_libro).isin(changed_keys)]
+        libro_diario_df = pd.concat([kept, libro_delta], ignore_index=True) if not libro_delta.empty else kept.reset_index(drop=True)
+        print(f"🔀 Delta merge reused {len(kept)} of {len(base_libro)} entries")
+        progress.complete()
+        return libro_diario_df, len(combined_bkpf), len(combined_bseg)
+    
+    def process_sap_files(
+        self,
+        metadatas: List[FileMetadata],
+        progress: Optional[ProgressReporter] = None,
+        artifacts: Optional[ArtifactStore] = None,
+        base_metadatas: Optional[List[FileMetadata]] = None,
+        base_artifacts: Optional[ArtifactStore] = None
+    ) -> Dict[str, Any]:
+        """Procesar múltiples archivos SAP y generar libro diario consolidado.
+
+        ``progress`` recibe la lectura de cada archivo y el merge como etapas.
+        Con ``artifacts`` se reutilizan el libro fusionado o los DataFrames de
+        cada archivo guardados por una ejecución anterior de la etapa. Con la
+        versión anterior de la ejecución (``base_metadatas`` y
+        ``base_artifacts``) solo se leen y fusionan los archivos que cambiaron.
+        Si a la ejecución se le añadieron archivos después de fusionarla, el
+        libro anterior de la propia ejecución sirve de base.
+        """
+        progress = progress or NULL_PROGRESS
+        try:
             # Clasificar archivos
-            for metadata in metadatas:
-                file_type = self.identify_file_type(metadata.originalFileName, metadata.filePath)
-                print(f"File {metadata.originalFileName} identified as {file_type}")
-                
-                if file_type == 'BKPF':
-                    bkpf_files.append(metadata)
-                elif file_type == 'BSEG':
-                    bseg_files.append(metadata)
-            
+            bkpf_files, bseg_files = self._classify_sap_files(metadatas)
             print(f"Found {len(bkpf_files)} BKPF files and {len(bseg_files)} BSEG files")
             
-            # Procesar archivos BKPF
-            bkpf_dfs = []
-            for metadata in bkpf_files:
-                df = self.parse_sap_file(metadata.filePath, 'BKPF')
-                if not df.empty:
-                    bkpf_dfs.append(df)
-            
-            # Procesar archivos BSEG
-            bseg_dfs = []
-            for metadata in bseg_files:
-                df = self.parse_sap_file(metadata.filePath, 'BSEG')
-                if not df.empty:
-                    bseg_dfs.append(df)
-            
-            # Combinar todos los BKPF y BSEG
-            combined_bkpf = pd.concat(bkpf_dfs, ignore_index=True) if bkpf_dfs else pd.DataFrame()
-            combined_bseg = pd.concat(bseg_dfs, ignore_index=True) if bseg_dfs else pd.DataFrame()
-            
-            print(f"Combined: {len(combined_bkpf)} BKPF records, {len(combined_bseg)} BSEG records")
-            
-            if combined_bkpf.empty and combined_bseg.empty:
-                return {
-                    "success": False,
-                    "error": "No se pudieron procesar los archivos SAP",
-                    "data": None
-                }
+            merged_fp = self.merged_fingerprint(metadatas) if artifacts is not None else None
+            cached = artifacts.load("merged", merged_fp) if artifacts is not None else None
+            delta = None
+            if cached is None and artifacts is not None:
+                previous = self._previous_inputs(metadatas, artifacts)
+                if previous:
+                    base_metadatas, base_artifacts = previous, artifacts
+            if cached is None and base_metadatas and base_artifacts is not None:
+                delta = self._delta_merge(bkpf_files, bseg_files, base_metadatas, base_artifacts, progress, artifacts)
             
-            # Si solo tenemos uno de los dos tipos, intentar procesar lo que tenemos
-            if combined_bkpf.empty:
-                print("Warning: No BKPF data found, processing BSEG only")
-                libro_diario_df = self._create_libro_from_bseg_only(combined_bseg)
-            elif combined_bseg.empty:
-                print("Warning: No BSEG data found, processing BKPF only")
-                libro_diario_df = self._create_libro_from_bkpf_only(combined_bkpf)
+            if cached is not None:
+                progress.set_overall(0.5)
+                progress.stage("merge", "Reutilizando libro diario fusionado")
+                libro_diario_df = cached["libro_diario"]
+                bkpf_records = cached["bkpf_records"]
+                bseg_records = cached["bseg_records"]
+                progress.complete()
+            elif delta is not None:
+                libro_diario_df, bkpf_records, bseg_records = delta
             else:
-                # Merge normal
-                libro_diario_df = self.merge_bkpf_bseg(combined_bkpf, combined_bseg)
+                # La lectura ocupa la primera mitad del avance global y el merge el resto
+                parse_count = max(len(bkpf_files) + len(bseg_files), 1)
+                
+                # Procesar archivos BKPF
+                bkpf_dfs = []
+                for index, metadata in enumerate(bkpf_files):
+                    progress.set_overall(0.5 * index / parse_count)
+                    df = self.load_or_parse_sap_file(metadata, 'BKPF', progress, artifacts)
+                    if not df.empty:
+                        bkpf_dfs.append(df)
+                
+                # Procesar archivos BSEG
+                bseg_dfs = []
+                for index, metadata in enumerate(bseg_files):
+                    progress.set_overall(0.5 * (len(bkpf_files) + index) / parse_count)
+                    df = self.load_or_parse_sap_file(metadata, 'BSEG', progress, artifacts)
+                    if not df.empty:
+                        bseg_dfs.append(df)
+                
+                # Combinar todos los BKPF y BSEG
+                combined_bkpf = pd.concat(bkpf_dfs, ignore_index=True) if bkpf_dfs else pd.DataFrame()
+                combined_bseg = pd.concat(bseg_dfs, ignore_index=True) if bseg_dfs else pd.DataFrame()
+                bkpf_records = len(combined_bkpf)
+                bseg_records = len(combined_bseg)
+                
+                print(f"Combined: {bkpf_records} BKPF records, {bseg_records} BSEG records")
+                
+                if combined_bkpf.empty and combined_bseg.empty:
+                    return {
+                        "success": False,
+                        "error": "No se pudieron procesar los archivos SAP",
+                        "data": None
+                    }
+                
+                progress.set_overall(0.5)
+                progress.stage("merge", "Fusionando BKPF/BSEG")
+                
+                # Si solo tenemos uno de los dos tipos, intentar procesar lo que tenemos
+                if combined_bkpf.empty:
+                    print("Warning: No BKPF data found, processing BSEG only")
+                    libro_diario_df = self._create_libro_from_bseg_only(combined_bseg)
+                elif combined_bseg.empty:
+                    print("Warning: No BSEG data found, processing BKPF only")
+                    libro_diario_df = self._create_libro_from_bkpf_only(combined_bkpf)
+                else:
+                    # Merge normal
+                    libro_diario_df = self.merge_bkpf_bseg(combined_bkpf, combined_bseg, progress)
+                progress.complete()
+            
+            if cached is None and artifacts is not None and not libro_diario_df.empty:
+                artifacts.save("merged", merged_fp, {
+                    "libro_diario": libro_diario_df,
+                    "bkpf_records": bkpf_records,
+                    "bseg_records": bseg_records
+                }, "merge", inputs=[m.filePath for m in bkpf_files + bseg_files])
             
             if libro_diario_df.empty:
                 return {
@@ -359,8 +636,8 @@ class SAPMergeService:
                 "data": standard_data,
                 "summary": {
                     "total_records": len(libro_diario_df),
-                    "bkpf_records": len(combined_bkpf) if not combined_bkpf.empty else 0,
-                    "bseg_records": len(combined_bseg) if not combined_bseg.empty else 0
+                    "bkpf_records": bkpf_records,
+                    "bseg_records": bseg_records
                 }
             }
             
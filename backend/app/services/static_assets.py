@@ -0,0 +1,113 @@
+# backend/app/services/static_assets.py
+import os
+import re
+import hashlib
+import mimetypes
+from typing import Dict, List, Optional, Tuple
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+from app.services.response_cache import etag_matches
+
+# Archivos con hash de contenido en el nombre (main.3065f6a4.js): nunca cambian
+HASHED_ASSET_PATTERN = re.compile(r"\.[0-9a-f]{8,}\.")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# index.html, manifest.json...: el navegador los revalida en cada uso
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Variantes precomprimidas generadas en el build, por orden de preferencia
+COMPRESSED_VARIANTS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class StaticAsset:
+    """Archivo del build con los datos que necesita su respuesta, calculados al arrancar"""
+
+    def __init__(self, path: str, stat: os.stat_result, relative_path: str):
+        self.path = path
+        self.stat = stat
+        self.media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.etag = '"' + hashlib.sha256(
+            f"{relative_path}\0{stat.st_size}\0{stat.st_mtime_ns}".encode('utf-8')
+        ).hexdigest()[:32] + '"'
+        hashed = HASHED_ASSET_PATTERN.search(os.path.basename(path)) is not None
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if hashed else REVALIDATE_CACHE_CONTROL
+        # Codificación → (ruta, stat, ETag) de las variantes .br/.gz que existan
+        self.variants: Dict[str, Tuple[str, os.stat_result, str]] = {}
+
+    def add_variant(self, encoding: str, path: str) -> None:
+        # Cada codificación es una representación distinta: su propio ETag
+        self.variants[encoding] = (path, os.stat(path), f'{self.etag[:-1]}-{encoding}"')
+
+
+def _accepted_encodings(request: Request) -> List[str]:
+    """Codificaciones de Accept-Encoding que el cliente no rechaza (q=0)"""
+    accepted = []
+    for item in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = item.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if name:
+            accepted.append(name.strip().lower())
+    return accepted
+
+
+class StaticAssetManifest:
+    """Manifiesto en memoria del build del frontend.
+
+    El directorio se recorre una sola vez al arrancar: cada petición resuelve
+    su archivo con una búsqueda en un diccionario y responde con el stat, el
+    ETag y el Cache-Control ya calculados, sin consultar el sistema de
+    archivos salvo para leer el contenido. Los archivos con hash en el nombre
+    se cachean como inmutables; si el build incluye variantes ``.br``/``.gz``
+    (``npm run build`` las genera), se sirven precomprimidas a los clientes
+    que las aceptan. Un build nuevo requiere reiniciar el servidor.
+    """
+
+    def __init__(self, build_dir: str):
+        self.build_dir = build_dir
+        self.assets: Dict[str, StaticAsset] = {}
+        self._scan()
+
+    def _scan(self) -> None:
+        compressed: List[Tuple[str, str, str, str]] = []
+        for root, _, files in os.walk(self.build_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                relative_path = os.path.relpath(path, self.build_dir).replace(os.sep, "/")
+                variant = next((v for v in COMPRESSED_VARIANTS if name.endswith(v[1])), None)
+                if variant is not None:
+                    compressed.append((relative_path[:-len(variant[1])], variant[0], path, relative_path))
+                    continue
+                self.assets[relative_path] = StaticAsset(path, os.stat(path), relative_path)
+
+        for original_path, encoding, path, relative_path in compressed:
+            asset = self.assets.get(original_path)
+            if asset is not None:
+                asset.add_variant(encoding, path)
+            else:
+                # Archivo comprimido sin original: se sirve tal cual
+                self.assets[relative_path] = StaticAsset(path, os.stat(path), relative_path)
+
+        variants = sum(len(asset.variants) for asset in self.assets.values())
+        print(f"📦 Static asset manifest: {len(self.assets)} file(s), {variants} precompressed variant(s)")
+
+    def get(self, relative_path: str) -> Optional[StaticAsset]:
+        return self.assets.get(relative_path)
+
+    def respond(self, request: Request, asset: StaticAsset) -> Response:
+        """Respuesta del archivo (precomprimido si se puede): 304 si el cliente tiene esa versión"""
+        path, stat, etag = asset.path, asset.stat, asset.etag
+        headers = {"Cache-Control": asset.cache_control}
+        if asset.variants:
+            headers["Vary"] = "Accept-Encoding"
+            accepted = _accepted_encodings(request)
+            for encoding, _ in COMPRESSED_VARIANTS:
+                if encoding in accepted and encoding in asset.variants:
+                    path, stat, etag = asset.variants[encoding]
+                    headers["Content-Encoding"] = encoding
+                    break
+        headers["ETag"] = etag
+
+        if etag_matches(request, etag):
+            headers.pop("Content-Encoding", None)
+            return Response(status_code=304, headers=headers)
+        return FileResponse(path, media_type=asset.media_type, headers=headers, stat_result=stat)
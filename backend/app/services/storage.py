@@ -0,0 +1,244 @@
+# backend/app/services/storage.py
+# Escritura de app/storage segura entre procesos (workers de gunicorn y
+# procesos de trabajos): cada archivo se publica completo con os.replace y las
+# lecturas-modificaciones-escrituras se hacen bajo un bloqueo de archivo.
+import os
+import json
+import uuid
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+from app.config.settings import STORAGE_FSYNC
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos (un solo proceso)
+    fcntl = None
+
+
+def temp_path(path: str) -> str:
+    """Temporal único junto a ``path`` (mismo sistema de archivos para renombrar)"""
+    return f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+
+
+@contextmanager
+def atomic_writer(
+    path: str, mode: str = 'w', encoding: Optional[str] = 'utf-8', fsync: Optional[bool] = None
+) -> Iterator[IO]:
+    """Abrir un temporal que sustituye a ``path`` al cerrarse sin errores.
+
+    Si el bloque falla, el temporal se borra y ``path`` queda intacto.
+    ``fsync`` (por defecto STORAGE_FSYNC) se puede desactivar para estado
+    efímero que no tiene que sobrevivir a un corte de luz.
+    """
+    tmp_path = temp_path(path)
+    binary = 'b' in mode
+    try:
+        with open(tmp_path, mode, encoding=None if binary else encoding) as f:
+            yield f
+            if STORAGE_FSYNC if fsync is None else fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_bytes(path: str, content: bytes) -> None:
+    with atomic_writer(path, 'wb') as f:
+        f.write(content)
+
+
+def atomic_write_text(path: str, content: str) -> None:
+    with atomic_writer(path, 'w') as f:
+        f.write(content)
+
+
+def atomic_write_json(path: str, data: Any, indent: Optional[int] = 2, fsync: Optional[bool] = None) -> None:
+    with atomic_writer(path, 'w', fsync=fsync) as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+
+
+def read_json(path: str, default: Any = None) -> Any:
+    """Contenido JSON de ``path``, o ``default`` si no existe o no se puede leer"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return default
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """(mtime_ns, tamaño, inodo) de ``path``, o None si no existe.
+
+    Cambia con cada atomic_write_*: os.replace publica siempre un archivo nuevo.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def process_alive(pid: Optional[int]) -> bool:
+    """Indica si existe el proceso ``pid`` en esta máquina"""
+    if pid is None:
+        return False
+    if os.name == 'nt':
+        # os.kill terminaría el proceso en Windows; allí hay un solo proceso
+        # de API, así que lo de otro PID es de una ejecución anterior
+        return pid == os.getpid()
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# Los bloqueos de locked() van en un directorio propio y cada archivo de
+# bloqueo se borra al soltarlo: no quedan ``.lock`` junto a los datos
+LOCKS_PATH = os.path.join(os.path.dirname(__file__), '..', 'storage', 'locks')
+
+_thread_locks: Dict[str, List] = {}  # archivo de bloqueo → [Lock, hilos que lo usan]
+_thread_locks_guard = threading.Lock()
+_held = threading.local()
+
+
+def _lock_file(path: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+    return os.path.join(LOCKS_PATH, f"{digest}.lock")
+
+
+@contextmanager
+def _thread_lock(lock_file: str) -> Iterator[None]:
+    """Bloqueo entre hilos de ``lock_file``; se descarta cuando nadie lo usa"""
+    with _thread_locks_guard:
+        entry = _thread_locks.setdefault(lock_file, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _thread_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _thread_locks[lock_file]
+
+
+def _acquire_file_lock(lock_file: str) -> int:
+    """Abrir y bloquear ``lock_file``, reintentando si otro proceso lo borró.
+
+    Quien suelta el bloqueo borra el archivo antes de liberarlo; si al
+    conseguirlo ya no es el archivo publicado en esa ruta, el bloqueo no
+    protege nada y hay que repetir con el nuevo.
+    """
+    while True:
+        fd = os.open(lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                current = os.fstat(fd).st_ino == os.stat(lock_file).st_ino
+            except FileNotFoundError:
+                current = False
+        except BaseException:
+            os.close(fd)
+            raise
+        if current:
+            return fd
+        os.close(fd)
+
+
+def _release_file_lock(lock_file: str, fd: int) -> None:
+    try:
+        os.remove(lock_file)
+    except FileNotFoundError:
+        pass
+    finally:
+        os.close(fd)  # Cerrar el descriptor libera el flock
+
+
+@contextmanager
+def locked(path: str) -> Iterator[None]:
+    """Bloqueo exclusivo sobre ``path`` entre procesos e hilos.
+
+    Se bloquea un archivo auxiliar en LOCKS_PATH con el hash de la ruta
+    (``path`` se sustituye al escribirse, así que no puede llevar el
+    bloqueo), que se borra al soltarlo. Es reentrante dentro del mismo hilo.
+    """
+    lock_file = _lock_file(path)
+    held = getattr(_held, "files", None)
+    if held is None:
+        held = _held.files = {}
+    if held.get(lock_file):
+        held[lock_file] += 1
+        try:
+            yield
+        finally:
+            held[lock_file] -= 1
+        return
+
+    with _thread_lock(lock_file):
+        fd = None
+        if fcntl is not None:
+            os.makedirs(LOCKS_PATH, exist_ok=True)
+            fd = _acquire_file_lock(lock_file)
+        held[lock_file] = 1
+        try:
+            yield
+        finally:
+            held.pop(lock_file, None)
+            if fd is not None:
+                _release_file_lock(lock_file, fd)
+
+
+def remove_legacy_lock_files(storage_path: str) -> int:
+    """Borrar los ``<archivo>.lock`` que locked() dejaba junto a cada archivo.
+
+    Solo es seguro con el servidor y los trabajos parados. No toca
+    LOCKS_PATH ni los bloqueos de hold_process_lock (``startup.lock``).
+    """
+    locks_path = os.path.abspath(LOCKS_PATH)
+    removed = 0
+    for root, dirs, files in os.walk(storage_path):
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != locks_path]
+        for name in files:
+            # Los bloqueos de locked() eran siempre de un archivo con extensión (.json.lock)
+            if name.endswith('.lock') and '.' in name[:-len('.lock')]:
+                try:
+                    os.remove(os.path.join(root, name))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+    return removed
+
+
+_process_locks: Dict[str, IO] = {}
+
+
+def hold_process_lock(path: str) -> bool:
+    """Intentar quedarse ``<path>.lock`` durante toda la vida del proceso.
+
+    Solo un proceso lo consigue a la vez; el sistema lo libera cuando ese
+    proceso termina. Sirve para que las tareas de arranque (relanzar
+    trabajos, reconstruir resúmenes) las haga un único worker de gunicorn.
+    """
+    lock_file = os.path.abspath(f"{path}.lock")
+    if lock_file in _process_locks:
+        return True
+    if fcntl is None:
+        return True
+    lock = open(lock_file, 'a')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return False
+    _process_locks[lock_file] = lock
+    return True
@@ -0,0 +1,138 @@
+# backend/app/services/storage_layout.py
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+from app.services.storage import atomic_write_json, locked, read_json
+
+# Directorios de app/storage con un subdirectorio por ejecución
+STORAGE_KINDS = ("files", "metadata", "converted")
+# Caracteres del ID de ejecución que forman el último nivel de reparto
+SHARD_PREFIX_LENGTH = 2
+
+_UNSAFE_SEGMENT = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def safe_segment(value: Optional[str]) -> str:
+    """Nombre de directorio seguro para un proyecto o período ('2023-01-01 a 2023-12-31' → '2023-01-01_a_2023-12-31')"""
+    segment = _UNSAFE_SEGMENT.sub("_", str(value or "")).strip("._")
+    return segment or "_"
+
+
+def execution_id_from_filename(filename: str) -> str:
+    """Los archivos guardados empiezan por el ID de su ejecución: '<id>_BKPF.txt'"""
+    return os.path.basename(filename).split("_", 1)[0]
+
+
+class StorageLayout:
+    """Ubicación en disco de los archivos de cada ejecución.
+
+    Los archivos subidos, sus metadatos y los convertidos se guardan en
+    ``<tipo>/<proyecto>/<período>/<prefijo del ID>/<ID>/``, de modo que
+    ningún directorio crece con el historial. Dónde está cada ejecución se
+    apunta en un índice repartido por prefijo del ID
+    (``shards/<prefijo>.json``: ID → ruta relativa): localizar un archivo es
+    leer un índice pequeño (en caché mientras no cambie), nunca recorrer un
+    directorio.
+
+    Las ejecuciones que no están en el índice (anteriores a este formato y
+    aún sin migrar con ``app.services.storage_migration``) siguen en los
+    directorios planos de cada tipo.
+    """
+
+    def __init__(self, storage_path: Optional[str] = None):
+        self.storage_path = storage_path or os.path.join(os.path.dirname(__file__), '..', 'storage')
+        self.index_path = os.path.join(self.storage_path, 'shards')
+        os.makedirs(self.index_path, exist_ok=True)
+
+    def _index_file(self, execution_id: str) -> str:
+        prefix = safe_segment(execution_id[:SHARD_PREFIX_LENGTH].lower())
+        return os.path.join(self.index_path, f"{prefix}.json")
+
+    def relative_dir(self, execution_id: str, project_id: str, period: str) -> str:
+        return "/".join((
+            safe_segment(project_id),
+            safe_segment(period),
+            safe_segment(execution_id[:SHARD_PREFIX_LENGTH].lower()),
+            safe_segment(execution_id)
+        ))
+
+    def register(self, execution_id: str, project_id: str, period: str) -> str:
+        """Apuntar en el índice la ubicación de una ejecución nueva (o la ya registrada)"""
+        index_file = self._index_file(execution_id)
+        with locked(index_file):
+            entries = read_json(index_file, {})
+            if execution_id not in entries:
+                entries[execution_id] = self.relative_dir(execution_id, project_id, period)
+                atomic_write_json(index_file, entries, indent=None)
+            return entries[execution_id]
+
+    def locate(self, execution_id: str) -> Optional[str]:
+        """Ruta relativa de la ejecución, o None si no está en el índice"""
+        return shard_indexes.get(self._index_file(execution_id)).get(execution_id)
+
+    def is_registered(self, execution_id: str) -> bool:
+        return self.locate(execution_id) is not None
+
+    def execution_dir(self, kind: str, execution_id: str, create: bool = False) -> str:
+        """Directorio de los archivos de ``kind`` de la ejecución"""
+        relative_dir = self.locate(execution_id)
+        if relative_dir is None:
+            # Ejecución sin migrar: directorio plano
+            directory = os.path.join(self.storage_path, kind)
+        else:
+            directory = os.path.join(self.storage_path, kind, *relative_dir.split("/"))
+        if create:
+            os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def path(self, kind: str, execution_id: str, filename: str, create: bool = False) -> str:
+        return os.path.join(self.execution_dir(kind, execution_id, create), os.path.basename(filename))
+
+    def path_for_filename(self, kind: str, filename: str, create: bool = False) -> str:
+        """Ruta de un archivo guardado a partir solo de su nombre ('<id>_...')"""
+        return self.path(kind, execution_id_from_filename(filename), filename, create)
+
+    def list_execution_files(self, kind: str, execution_id: str) -> List[str]:
+        """Nombres de los archivos de ``kind`` de la ejecución"""
+        directory = self.execution_dir(kind, execution_id)
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        if self.locate(execution_id) is None:
+            # En el directorio plano conviven todas las ejecuciones sin migrar
+            names = [name for name in names if name.startswith(f"{execution_id}_")]
+        return names
+
+
+class ShardIndexCache:
+    """Índices ``shards/<prefijo>.json`` leídos, compartidos por el proceso.
+
+    Cada consulta comprueba con un stat si el índice cambió (otro proceso
+    pudo registrar ejecuciones) y solo entonces lo vuelve a leer.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Optional[Tuple[int, int, int]], Dict[str, str]]] = {}
+        self._lock = threading.Lock()
+
+    def _signature(self, path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def get(self, path: str) -> Dict[str, str]:
+        signature = self._signature(path)
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        entries = read_json(path, {}) if signature is not None else {}
+        with self._lock:
+            self._entries[path] = (signature, entries)
+        return entries
+
+
+shard_indexes = ShardIndexCache()
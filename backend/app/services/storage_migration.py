@@ -0,0 +1,168 @@
+# backend/app/services/storage_migration.py
+"""Migrar app/storage del formato plano al formato repartido.
+
+Uso (con el servidor y los trabajos parados)::
+
+    python -m app.services.storage_migration [--dry-run]
+
+Mueve los archivos de ``files/``, ``metadata/`` y ``converted/`` de cada
+ejecución a ``<tipo>/<proyecto>/<período>/<prefijo>/<ID>/`` (ver
+StorageLayout), actualiza ``filePath`` en sus metadatos y las rutas de los
+artefactos que apuntaban a los convertidos, y registra la ejecución en el
+índice. También borra los ``.lock`` que las versiones anteriores dejaban junto
+a cada archivo. Si la migración se interrumpe, basta con volver a lanzarla: continúa
+con los archivos que sigan en los directorios planos.
+"""
+import os
+import sys
+import argparse
+from typing import Dict, List, Optional, Tuple
+from app.services.storage import atomic_write_json, read_json, remove_legacy_lock_files
+from app.services.storage_layout import STORAGE_KINDS, StorageLayout, execution_id_from_filename
+
+
+class StorageMigration:
+    def __init__(self, storage_path: Optional[str] = None, dry_run: bool = False):
+        self.layout = StorageLayout(storage_path)
+        self.storage_path = self.layout.storage_path
+        self.dry_run = dry_run
+
+    def _flat_files(self) -> Dict[str, Dict[str, List[str]]]:
+        """ID de ejecución → tipo → archivos que siguen en los directorios planos"""
+        pending: Dict[str, Dict[str, List[str]]] = {}
+        for kind in STORAGE_KINDS:
+            directory = os.path.join(self.storage_path, kind)
+            if not os.path.isdir(directory):
+                continue
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and "_" in entry.name and not entry.name.endswith(('.tmp', '.partial', '.lock')):
+                        execution_id = execution_id_from_filename(entry.name)
+                        pending.setdefault(execution_id, {}).setdefault(kind, []).append(entry.name)
+        return pending
+
+    def _executions(self) -> Dict[str, Dict[str, str]]:
+        data = read_json(os.path.join(self.storage_path, 'executions.json'), {}) or {}
+        return {e["executionId"]: e for e in data.get("executions", []) if "executionId" in e}
+
+    def _project_and_period(
+        self, execution_id: str, metadata_files: List[str], executions: Dict[str, Dict[str, str]]
+    ) -> Optional[Tuple[str, str]]:
+        # Los metadatos son la fuente de verdad; el historial, el respaldo
+        for name in sorted(metadata_files):
+            metadata = read_json(os.path.join(self.storage_path, 'metadata', name))
+            if metadata and metadata.get("projectId") and metadata.get("period"):
+                return metadata["projectId"], metadata["period"]
+        execution = executions.get(execution_id)
+        if execution and execution.get("projectId") and execution.get("period"):
+            return execution["projectId"], execution["period"]
+        return None
+
+    def _move(self, source: str, target: str) -> None:
+        if self.dry_run:
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source, target)
+
+    def _migrate_metadata(self, name: str, target: str, files_dir: str) -> None:
+        """Mover un metadato apuntando ``filePath`` al archivo ya movido"""
+        source = os.path.join(self.storage_path, 'metadata', name)
+        metadata = read_json(source)
+        if self.dry_run:
+            return
+        if metadata and metadata.get("filePath"):
+            # Las rutas guardadas pueden venir de otro sistema (p. ej. con '\\')
+            file_name = metadata["filePath"].replace("\\", "/").rsplit("/", 1)[-1]
+            metadata["filePath"] = os.path.abspath(os.path.join(files_dir, file_name))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            atomic_write_json(target, metadata)
+            os.remove(source)
+        else:
+            self._move(source, target)
+
+    def _migrate_artifacts(self, execution_id: str, moved: Dict[str, str]) -> int:
+        """Actualizar los manifiestos de artefactos que registran archivos movidos"""
+        artifacts_dir = os.path.join(self.storage_path, 'artifacts', execution_id)
+        if not os.path.isdir(artifacts_dir):
+            return 0
+        updated = 0
+        for name in os.listdir(artifacts_dir):
+            if not name.endswith('.json'):
+                continue
+            manifest_file = os.path.join(artifacts_dir, name)
+            manifest = read_json(manifest_file)
+            path = (manifest or {}).get("path")
+            if not path:
+                continue
+            new_path = moved.get(os.path.basename(path.replace("\\", "/")))
+            if new_path is None:
+                continue
+            manifest["path"] = new_path
+            updated += 1
+            if not self.dry_run:
+                atomic_write_json(manifest_file, manifest)
+        return updated
+
+    def run(self) -> Dict[str, int]:
+        executions = self._executions()
+        pending = self._flat_files()
+        stats = {"executions": 0, "files": 0, "artifacts": 0, "skipped": 0, "locks": 0}
+
+        for execution_id, files_by_kind in sorted(pending.items()):
+            relative_dir = self.layout.locate(execution_id)
+            if relative_dir is None:
+                location = self._project_and_period(execution_id, files_by_kind.get("metadata", []), executions)
+                if location is None:
+                    print(f"⚠️ Skipping {execution_id}: project/period unknown ({sum(map(len, files_by_kind.values()))} file(s) left in place)")
+                    stats["skipped"] += 1
+                    continue
+                # Se registra antes de mover: una migración interrumpida se
+                # retoma con los archivos que queden en los directorios planos
+                relative_dir = (
+                    self.layout.relative_dir(execution_id, *location) if self.dry_run
+                    else self.layout.register(execution_id, *location)
+                )
+            target_dirs = {
+                kind: os.path.join(self.storage_path, kind, *relative_dir.split("/"))
+                for kind in STORAGE_KINDS
+            }
+
+            moved: Dict[str, str] = {}
+            for kind in ("files", "converted"):
+                for name in files_by_kind.get(kind, []):
+                    target = os.path.join(target_dirs[kind], name)
+                    self._move(os.path.join(self.storage_path, kind, name), target)
+                    moved[name] = os.path.abspath(target)
+                    stats["files"] += 1
+            # Los metadatos al final: apuntan a los archivos ya movidos
+            for name in files_by_kind.get("metadata", []):
+                self._migrate_metadata(name, os.path.join(target_dirs["metadata"], name), target_dirs["files"])
+                stats["files"] += 1
+            stats["artifacts"] += self._migrate_artifacts(execution_id, moved)
+            stats["executions"] += 1
+            print(f"📦 {execution_id} → {relative_dir} ({sum(map(len, files_by_kind.values()))} file(s))")
+
+        if not self.dry_run:
+            stats["locks"] = remove_legacy_lock_files(self.storage_path)
+            if stats["locks"]:
+                print(f"🧹 Removed {stats['locks']} legacy lock file(s)")
+
+        action = "Would migrate" if self.dry_run else "Migrated"
+        print(
+            f"✅ {action} {stats['executions']} execution(s), {stats['files']} file(s), "
+            f"{stats['artifacts']} artifact manifest(s); {stats['skipped']} execution(s) skipped"
+        )
+        return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Migrar app/storage al formato repartido por proyecto/período/ID")
+    parser.add_argument("--dry-run", action="store_true", help="Mostrar lo que se movería sin tocar nada")
+    parser.add_argument("--storage-path", default=None, help="Directorio de almacenamiento (por defecto app/storage)")
+    args = parser.parse_args(argv)
+    stats = StorageMigration(args.storage_path, args.dry_run).run()
+    return 1 if stats["skipped"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
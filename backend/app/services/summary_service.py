@@ -0,0 +1,133 @@
+# backend/app/services/summary_service.py
+import os
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from app.models.import_models import ImportExecution, ImportSummary, ExecutionStatus
+from app.services.storage import atomic_write_json, locked, read_json
+
+# Cambio de una ejecución: (antes, después)
+Change = Tuple[Optional[ImportExecution], Optional[ImportExecution]]
+# Firma de executions.json (ver storage.file_signature)
+Signature = Tuple[int, int, int]
+
+
+class ImportSummaryService:
+    """Resumen de importaciones por proyecto y período, mantenido de forma incremental.
+
+    Cada cambio de una ejecución (alta, cambio de estado, archivos añadidos)
+    resta su aportación anterior y suma la nueva: recuento por estado, bytes
+    subidos, filas importadas (de las ejecuciones correctas) y última
+    versión correcta. Consultar el resumen nunca recorre el historial; solo
+    ``rebuild`` lo hace.
+
+    Los cambios se aplican dentro de la transacción del historial (bloqueo
+    de executions.json y después el del resumen), y el resumen guarda la
+    firma de executions.json con la que está al día. Si no coincide con la
+    del archivo (p. ej. el proceso murió entre las dos escrituras), al
+    arrancar se reconstruye.
+    """
+
+    def __init__(self):
+        self.storage_path = os.path.join(os.path.dirname(__file__), '..', 'storage')
+        self.summary_file = os.path.join(self.storage_path, 'summaries.json')
+
+        # Crear directorio si no existe
+        os.makedirs(self.storage_path, exist_ok=True)
+
+    def _load(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        return (read_json(self.summary_file) or {}).get('projects', {})
+
+    def _save(self, projects: Dict[str, Dict[str, Dict[str, Any]]], executions_signature: Optional[Signature]) -> None:
+        atomic_write_json(self.summary_file, {
+            'projects': projects,
+            'executionsSignature': list(executions_signature) if executions_signature else None,
+            'lastUpdated': datetime.now().isoformat()
+        })
+
+    def _bucket(self, projects: Dict[str, Dict[str, Dict[str, Any]]], execution: ImportExecution) -> Dict[str, Any]:
+        return projects.setdefault(execution.projectId, {}).setdefault(execution.period, {
+            "executionCount": 0,
+            "statusCounts": {},
+            "rowsImported": 0,
+            "bytesStored": 0,
+            "successful": {}  # ID → [fecha, versión] de las ejecuciones correctas
+        })
+
+    def _apply(self, projects: Dict[str, Dict[str, Dict[str, Any]]], execution: ImportExecution, sign: int) -> None:
+        """Sumar (sign=1) o restar (sign=-1) la aportación de una ejecución"""
+        bucket = self._bucket(projects, execution)
+        status = execution.status.value
+        bucket["executionCount"] += sign
+        bucket["statusCounts"][status] = bucket["statusCounts"].get(status, 0) + sign
+        if not bucket["statusCounts"][status]:
+            del bucket["statusCounts"][status]
+        bucket["bytesStored"] += sign * (execution.bytesStored or 0)
+        if execution.status == ExecutionStatus.SUCCESS:
+            bucket["rowsImported"] += sign * (execution.rowsImported or 0)
+            if sign > 0:
+                bucket["successful"][execution.executionId] = [execution.executionDate, execution.version]
+            else:
+                bucket["successful"].pop(execution.executionId, None)
+        bucket["updatedAt"] = datetime.now().isoformat()
+
+    def record_changes(self, changes: List[Change], executions_signature: Optional[Signature]) -> None:
+        """Actualizar el resumen con los cambios de ejecuciones recién guardados.
+
+        Cada cambio es (antes, después), con None si la ejecución no existía
+        o se borró. Se llama con el historial aún bloqueado y con la firma
+        que quedó al guardarlo.
+        """
+        try:
+            with locked(self.summary_file):
+                projects = self._load()
+                for before, after in changes:
+                    if before is not None:
+                        self._apply(projects, before, -1)
+                    if after is not None:
+                        self._apply(projects, after, 1)
+                self._save(projects, executions_signature)
+        except Exception as e:
+            # La firma no se actualiza: el resumen se reconstruye al arrancar
+            print(f"⚠️ Error updating import summary: {str(e)}")
+
+    def rebuild(self, executions: Iterable[ImportExecution], executions_signature: Optional[Signature]) -> None:
+        """Recalcular el resumen completo a partir del historial"""
+        with locked(self.summary_file):
+            projects: Dict[str, Dict[str, Dict[str, Any]]] = {}
+            for execution in executions:
+                self._apply(projects, execution, 1)
+            self._save(projects, executions_signature)
+        print(f"📊 Import summary rebuilt for {len(projects)} project(s)")
+
+    def is_current(self, executions_signature: Optional[Signature]) -> bool:
+        """Indica si el resumen existe y está al día con el historial de esa firma"""
+        data = read_json(self.summary_file)
+        if data is None:
+            return False
+        stored = data.get('executionsSignature')
+        return (tuple(stored) if stored else None) == executions_signature
+
+    def get_summaries(self, project_ids: List[str], period: Optional[str] = None) -> List[ImportSummary]:
+        """Resumen de los proyectos indicados, por período (más reciente primero)"""
+        projects = self._load()
+        summaries = []
+        for project_id in project_ids:
+            periods = projects.get(project_id, {})
+            for period_key in sorted(periods, reverse=True):
+                if period is not None and period_key != period:
+                    continue
+                bucket = periods[period_key]
+                last = max(bucket["successful"].items(), key=lambda item: item[1][0], default=None)
+                summaries.append(ImportSummary(
+                    projectId=project_id,
+                    period=period_key,
+                    executionCount=bucket["executionCount"],
+                    statusCounts=bucket["statusCounts"],
+                    rowsImported=bucket["rowsImported"],
+                    bytesStored=bucket["bytesStored"],
+                    lastSuccessfulExecutionId=last[0] if last else None,
+                    lastSuccessfulVersion=last[1][1] if last else None,
+                    lastSuccessfulDate=last[1][0] if last else None,
+                    updatedAt=bucket.get("updatedAt")
+                ))
+        return summaries
@@ -2,12 +2,23 @@
 import os
 import json
 import uuid
-from datetime import datetime
-from typing import Optional, List
+import hashlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Optional, List, Callable, Iterator
 from fastapi import UploadFile
+from app.config.settings import IMPORT_UPLOAD_DEDUP_WINDOW
 from app.models.import_models import (
     FileMetadata, ImportExecution, ExecutionStatus, FileType
 )
+from app.services.progress_service import execution_reporter
+from app.services.execution_index import ExecutionIndex, execution_indexes, encode_cursor, decode_cursor
+from app.services.summary_service import ImportSummaryService, Change
+from app.services.storage import atomic_writer, atomic_write_json, locked, file_signature
+from app.services.storage_layout import StorageLayout
+
+# Tamaño de bloque al copiar los archivos subidos a disco
+UPLOAD_COPY_BUFFER_BYTES = 1024 * 1024
 
 class UploadService:
     def __init__(self):
@@ -15,14 +26,26 @@ class UploadService:
         self.metadata_path = os.path.join(self.storage_path, 'metadata')
         self.files_path = os.path.join(self.storage_path, 'files')
         self.executions_file = os.path.join(self.storage_path, 'executions.json')
+        self.summary = ImportSummaryService()
+        # Archivos y metadatos de cada ejecución, repartidos por proyecto/período/ID
+        self.layout = StorageLayout(self.storage_path)
         
-        # Crear directorios si no existen
+        # Crear directorios si no existen (directorios planos de las ejecuciones sin migrar)
         os.makedirs(self.metadata_path, exist_ok=True)
         os.makedirs(self.files_path, exist_ok=True)
     
     def _generate_execution_id(self) -> str:
-        """Generar un ID único para la ejecución"""
-        return str(uuid.uuid4())[:8]
+        """Generar un ID único para la ejecución.
+
+        64 bits aleatorios: con 8 caracteres hexadecimales las colisiones se
+        vuelven probables al crecer el historial (~50% hacia 77.000 ejecuciones).
+        """
+        while True:
+            execution_id = uuid.uuid4().hex[:16]
+            if self.layout.is_registered(execution_id):
+                continue
+            if not os.path.exists(os.path.join(self.metadata_path, f"{execution_id}_metadata.json")):
+                return execution_id
     
     def _get_file_type(self, filename: str) -> FileType:
         """Determinar el tipo de archivo basado en la extensión"""
@@ -49,8 +72,8 @@ class UploadService:
             return 1
         return max(versions) + 1
     
-    def _save_file(self, file: UploadFile, execution_id: str, file_index: int = 0) -> tuple[str, int]:
-        """Guardar archivo físico y retornar ruta y tamaño"""
+    def _save_file(self, file: UploadFile, execution_id: str, file_index: int = 0) -> tuple[str, int, str]:
+        """Guardar archivo físico y retornar ruta, tamaño y hash del contenido"""
         # Generar nombre único para el archivo
         file_extension = file.filename.split('.')[-1]
         if file_index == 0:
@@ -60,55 +83,150 @@ class UploadService:
             base_name = file.filename.rsplit('.', 1)[0]
             saved_filename = f"{execution_id}_{base_name}_{file_index}.{file_extension}"
         
-        file_path = os.path.join(self.files_path, saved_filename)
+        file_path = self.layout.path("files", execution_id, saved_filename, create=True)
         
-        # Guardar archivo
-        file_size = 0
-        with open(file_path, "wb") as buffer:
-            content = file.file.read()
-            buffer.write(content)
-            file_size = len(content)
+        # Guardar archivo por bloques, sin cargarlo entero en memoria; el hash
+        # se calcula en la misma pasada
+        digest = hashlib.sha256()
+        with atomic_writer(file_path, "wb") as buffer:
+            while True:
+                chunk = file.file.read(UPLOAD_COPY_BUFFER_BYTES)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                buffer.write(chunk)
+            file_size = buffer.tell()
         
-        return file_path, file_size
+        return file_path, file_size, digest.hexdigest()
+    
+    def _hash_upload(self, file: UploadFile) -> str:
+        """Hash del contenido de un archivo recibido, sin copiarlo a disco"""
+        digest = hashlib.sha256()
+        file.file.seek(0)
+        while True:
+            chunk = file.file.read(UPLOAD_COPY_BUFFER_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+        file.file.seek(0)
+        return digest.hexdigest()
+    
+    def upload_signature(self, files: List[UploadFile]) -> List[tuple[str, int]]:
+        """Nombre y tamaño de cada archivo recibido"""
+        signature = []
+        for file in files:
+            size = getattr(file, 'size', None)
+            if size is None:
+                file.file.seek(0, os.SEEK_END)
+                size = file.file.tell()
+                file.file.seek(0)
+            signature.append((file.filename, size))
+        return signature
+    
+    def find_duplicate_upload(
+        self,
+        files: List[UploadFile],
+        project_id: str,
+        period: str,
+        user_id: str,
+        test_type: str = "libro_diario_import",
+        window_seconds: float = IMPORT_UPLOAD_DEDUP_WINDOW
+    ) -> Optional[tuple[str, List[FileMetadata]]]:
+        """Buscar una ejecución reciente con exactamente los mismos archivos.
+
+        Cubre los reintentos de clientes que no envían Idempotency-Key. Las
+        candidatas salen del índice del historial (usuario, proyecto, período
+        y ventana de fechas), sin recorrerlo entero. Solo se calcula el hash
+        de lo recibido si nombres y tamaños coinciden con alguna, así que una
+        subida nueva no paga nada. Las ejecuciones canceladas o con error no
+        se reutilizan: volver a subir los archivos es la forma de reintentarlas.
+        """
+        if window_seconds <= 0:
+            return None
+        since = (datetime.now() - timedelta(seconds=window_seconds)).isoformat()
+        signature = self.upload_signature(files)
+        hashes = None
+        
+        candidates, _ = self._execution_index().query(
+            {"userId": user_id, "projectId": project_id, "period": period}, date_from=since
+        )
+        for execution in candidates:
+            if (execution.testType != test_type or
+                    execution.status in (ExecutionStatus.CANCELLED, ExecutionStatus.ERROR)):
+                continue
+            metadatas = self.get_metadatas_by_execution_id(execution.executionId)
+            if [(m.originalFileName, m.fileSize) for m in metadatas] != signature:
+                continue
+            if any(m.contentHash is None for m in metadatas):
+                continue
+            if hashes is None:
+                hashes = [self._hash_upload(file) for file in files]
+            if [m.contentHash for m in metadatas] == hashes:
+                return execution.executionId, metadatas
+        return None
     
     def _save_metadata(self, metadata: FileMetadata, file_index: int = 0) -> None:
         """Guardar metadata en archivo JSON"""
         if file_index == 0:
-            metadata_file = os.path.join(
-                self.metadata_path, 
-                f"{metadata.executionId}_metadata.json"
+            metadata_file = self.layout.path(
+                "metadata", metadata.executionId,
+                f"{metadata.executionId}_metadata.json", create=True
             )
         else:
-            metadata_file = os.path.join(
-                self.metadata_path, 
-                f"{metadata.executionId}_metadata_{file_index}.json"
+            metadata_file = self.layout.path(
+                "metadata", metadata.executionId,
+                f"{metadata.executionId}_metadata_{file_index}.json", create=True
             )
         
-        with open(metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(metadata.dict(), f, ensure_ascii=False, indent=2)
+        atomic_write_json(metadata_file, metadata.dict())
     
-    def _load_executions(self) -> List[ImportExecution]:
-        """Cargar historial de ejecuciones"""
+    def _load_executions(self, strict: bool = False) -> List[ImportExecution]:
+        """Cargar historial de ejecuciones.
+
+        Con ``strict`` un historial ilegible lanza la excepción en lugar de
+        tratarse como vacío, para no sobrescribirlo al guardar.
+        """
         try:
-            if os.path.exists(self.executions_file):
-                with open(self.executions_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return [ImportExecution(**exec_data) for exec_data in data.get('executions', [])]
+            with open(self.executions_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return [ImportExecution(**exec_data) for exec_data in data.get('executions', [])]
+        except FileNotFoundError:
             return []
         except Exception:
+            if strict:
+                raise
             return []
     
-    def _save_executions(self, executions: List[ImportExecution]) -> None:
-        """Guardar historial de ejecuciones"""
+    def _save_executions(self, executions: List[ImportExecution]) -> bool:
+        """Guardar historial de ejecuciones; False si no se pudo"""
         try:
             data = {
                 'executions': [execution.dict() for execution in executions],
                 'lastUpdated': datetime.now().isoformat()
             }
-            with open(self.executions_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            atomic_write_json(self.executions_file, data)
+            execution_indexes.store(self.executions_file, executions)
+            return True
         except Exception as e:
             print(f"Error saving executions: {e}")
+            return False
+
+    @contextmanager
+    def _executions_transaction(self, changes: Optional[List[Change]] = None) -> Iterator[List[ImportExecution]]:
+        """Leer, modificar y guardar el historial sin perder cambios de otros procesos.
+
+        El historial se lee y se guarda bajo un bloqueo de archivo: dos
+        workers que actualizan ejecuciones a la vez se serializan en lugar de
+        sobrescribir uno los cambios del otro. Si el bloque lanza una
+        excepción, no se guarda nada. Los cambios (antes, después) que el
+        bloque añada a ``changes`` se aplican al resumen sin soltar el bloqueo.
+        """
+        changes = [] if changes is None else changes
+        with locked(self.executions_file):
+            executions = self._load_executions(strict=True)
+            yield executions
+            if self._save_executions(executions):
+                self.summary.record_changes(changes, file_signature(self.executions_file))
 
     def upload_multiple_files(
         self, 
@@ -117,45 +235,122 @@ class UploadService:
         period: str,
         user_id: str,
         user_name: str,
-        test_type: str = "libro_diario_import"
+        test_type: str = "libro_diario_import",
+        on_file_saved: Optional[Callable[[FileMetadata], None]] = None
     ) -> tuple[str, List[FileMetadata]]:
-        """Subir múltiples archivos y generar metadatas"""
+        """Subir múltiples archivos y generar metadatas.
+
+        ``on_file_saved`` se invoca con cada archivo en cuanto está en disco,
+        sin esperar al resto (p. ej. para empezar a leerlo en modo pipeline).
+        """
         
         execution_id = self._generate_execution_id()
+        self.layout.register(execution_id, project_id, period)
         metadatas = []
+        progress = execution_reporter(execution_id)
+        progress.stage("upload", "Guardando archivos subidos", total=len(files))
         
         for index, file in enumerate(files):
-            file_type = self._get_file_type(file.filename)
-            
-            # Obtener la versión para este archivo y proyecto
-            version = self._get_next_version(project_id, file.filename)
-            
-            # Guardar archivo físico
-            file_path, file_size = self._save_file(file, execution_id, index)
-            
-            # Crear metadata
-            metadata = FileMetadata(
-                executionId=execution_id,
-                projectId=project_id,
-                testType=test_type,
-                period=period,
-                version=version,
-                originalFileName=file.filename,
-                fileType=file_type,
-                fileSize=file_size,
-                uploadDate=datetime.now().isoformat(),
-                userId=user_id,
-                userName=user_name,
-                status=ExecutionStatus.PENDING,
-                filePath=file_path
-            )
-            
-            # Guardar metadata
-            self._save_metadata(metadata, index)
+            metadata = self._store_file(file, execution_id, index, project_id, period, user_id, user_name, test_type)
             metadatas.append(metadata)
+            progress.advance(1)
+            if on_file_saved is not None:
+                on_file_saved(metadata)
         
+        progress.complete()
         return execution_id, metadatas
     
+    def _store_file(
+        self,
+        file: UploadFile,
+        execution_id: str,
+        index: int,
+        project_id: str,
+        period: str,
+        user_id: str,
+        user_name: str,
+        test_type: str
+    ) -> FileMetadata:
+        """Guardar un archivo de la ejecución y su metadata"""
+        file_type = self._get_file_type(file.filename)
+        
+        # Obtener la versión para este archivo y proyecto
+        version = self._get_next_version(project_id, file.filename)
+        
+        # Guardar archivo físico
+        file_path, file_size, content_hash = self._save_file(file, execution_id, index)
+        
+        # Crear metadata
+        metadata = FileMetadata(
+            executionId=execution_id,
+            projectId=project_id,
+            testType=test_type,
+            period=period,
+            version=version,
+            originalFileName=file.filename,
+            fileType=file_type,
+            fileSize=file_size,
+            uploadDate=datetime.now().isoformat(),
+            userId=user_id,
+            userName=user_name,
+            status=ExecutionStatus.PENDING,
+            filePath=file_path,
+            contentHash=content_hash
+        )
+        
+        # Guardar metadata
+        self._save_metadata(metadata, index)
+        return metadata
+    
+    def append_files(
+        self,
+        execution_id: str,
+        files: List[UploadFile],
+        on_file_saved: Optional[Callable[[FileMetadata], None]] = None
+    ) -> tuple[List[FileMetadata], List[str], List[FileMetadata]]:
+        """Añadir archivos a una ejecución existente.
+
+        Solo se escriben los archivos nuevos: los que ya están en la ejecución
+        con el mismo contenido (p. ej. una parte reenviada) se omiten sin
+        copiarlos. Los archivos anteriores no se tocan, así que sus lecturas
+        y validaciones guardadas siguen vigentes. Devuelve las metadatas
+        añadidas, los nombres de los archivos omitidos y las metadatas de
+        todos los archivos de la ejecución.
+        """
+        existing = self.get_metadatas_by_execution_id(execution_id)
+        if not existing:
+            raise ValueError("Ejecución no encontrada")
+        primary = existing[0]
+        
+        # Solo se calcula el hash de lo recibido si el nombre y el tamaño coinciden
+        known = {(m.originalFileName, m.fileSize): m.contentHash for m in existing}
+        added = []
+        skipped = []
+        progress = execution_reporter(execution_id)
+        progress.stage("upload", "Guardando archivos añadidos", total=len(files))
+        
+        for file, signature in zip(files, self.upload_signature(files)):
+            if signature in known and known[signature] is not None and self._hash_upload(file) == known[signature]:
+                print(f"⏭️ {file.filename} already in execution {execution_id}; skipping")
+                skipped.append(file.filename)
+                progress.advance(1)
+                continue
+            metadata = self._store_file(
+                file, execution_id, len(existing) + len(added), primary.projectId,
+                primary.period, primary.userId, primary.userName, primary.testType
+            )
+            added.append(metadata)
+            known[signature] = metadata.contentHash
+            progress.advance(1)
+            if on_file_saved is not None:
+                on_file_saved(metadata)
+        
+        progress.complete()
+        metadatas = existing + added
+        if added:
+            self._update_execution_files(execution_id, metadatas)
+        return added, skipped, metadatas
+    
     def upload_file(
         self, 
         file: UploadFile, 
@@ -177,26 +372,19 @@ class UploadService:
         self, 
         execution_id: str, 
         metadatas: List[FileMetadata],
-        project_name: str
+        project_name: str,
+        base_execution_id: Optional[str] = None
     ) -> None:
-        """Crear registro de ejecución en el historial para múltiples archivos"""
+        """Crear registro de ejecución en el historial para múltiples archivos.
+
+        ``base_execution_id`` es la versión anterior de la que parte la
+        ejecución; si no se indica, se toma la última del mismo proyecto,
+        período y tipo de prueba.
+        """
         
         # Usar el primer metadata como principal
         primary_metadata = metadatas[0]
-        
-        # Clasificar archivos por tipo
-        libro_diario_files = []
-        sumas_saldos_files = []
-        
-        for metadata in metadatas:
-            filename_lower = metadata.originalFileName.lower()
-            if 'bkpf' in filename_lower or 'bseg' in filename_lower or 'libro' in filename_lower:
-                libro_diario_files.append(metadata.originalFileName)
-            elif 'sumas' in filename_lower and 'saldos' in filename_lower:
-                sumas_saldos_files.append(metadata.originalFileName)
-            else:
-                # Por defecto, considerar libro diario
-                libro_diario_files.append(metadata.originalFileName)
+        libro_diario_files, sumas_saldos_files = self._classify_file_names(metadatas)
         
         execution = ImportExecution(
             executionId=execution_id,
@@ -210,17 +398,62 @@ class UploadService:
             status=primary_metadata.status,
             version=primary_metadata.version,
             libroDiarioFile=', '.join(libro_diario_files) if libro_diario_files else None,
-            sumasSaldosFile=', '.join(sumas_saldos_files) if sumas_saldos_files else None
+            sumasSaldosFile=', '.join(sumas_saldos_files) if sumas_saldos_files else None,
+            bytesStored=sum(metadata.fileSize for metadata in metadatas)
         )
         
-        # Cargar ejecuciones existentes
-        executions = self._load_executions()
-        
-        # Agregar nueva ejecución
-        executions.append(execution)
+        # Agregar la nueva ejecución al historial
+        with self._executions_transaction([(None, execution)]) as executions:
+            execution.baseExecutionId = base_execution_id or self._find_previous_version(executions, execution)
+            executions.append(execution)
+    
+    def _classify_file_names(self, metadatas: List[FileMetadata]) -> tuple[List[str], List[str]]:
+        """Clasificar los archivos por tipo: libro diario y sumas y saldos"""
+        libro_diario_files = []
+        sumas_saldos_files = []
         
-        # Guardar actualizado
-        self._save_executions(executions)
+        for metadata in metadatas:
+            filename_lower = metadata.originalFileName.lower()
+            if 'bkpf' in filename_lower or 'bseg' in filename_lower or 'libro' in filename_lower:
+                libro_diario_files.append(metadata.originalFileName)
+            elif 'sumas' in filename_lower and 'saldos' in filename_lower:
+                sumas_saldos_files.append(metadata.originalFileName)
+            else:
+                # Por defecto, considerar libro diario
+                libro_diario_files.append(metadata.originalFileName)
+        return libro_diario_files, sumas_saldos_files
+    
+    def _update_execution_files(self, execution_id: str, metadatas: List[FileMetadata]) -> None:
+        """Actualizar los archivos de una ejecución tras añadirle archivos.
+
+        La ejecución vuelve a quedar pendiente: hay que validarla de nuevo.
+        """
+        libro_diario_files, sumas_saldos_files = self._classify_file_names(metadatas)
+        changes: List[Change] = []
+        with self._executions_transaction(changes) as executions:
+            for execution in executions:
+                if execution.executionId == execution_id:
+                    before = execution.copy()
+                    execution.libroDiarioFile = ', '.join(libro_diario_files) if libro_diario_files else None
+                    execution.sumasSaldosFile = ', '.join(sumas_saldos_files) if sumas_saldos_files else None
+                    execution.status = ExecutionStatus.PENDING
+                    execution.errorMessage = None
+                    execution.bytesStored = sum(metadata.fileSize for metadata in metadatas)
+                    execution.rowsImported = None
+                    changes.append((before, execution))
+                    break
+    
+    def _find_previous_version(self, executions: List[ImportExecution], execution: ImportExecution) -> Optional[str]:
+        """Última ejecución del mismo proyecto, período y tipo de prueba"""
+        previous = [
+            e for e in executions
+            if e.projectId == execution.projectId and e.period == execution.period and
+            e.testType == execution.testType and e.executionId != execution.executionId and
+            e.status != ExecutionStatus.CANCELLED
+        ]
+        if not previous:
+            return None
+        return max(previous, key=lambda e: e.executionDate).executionId
     
     def create_execution_record_single(
         self, 
@@ -231,36 +464,66 @@ class UploadService:
         """Crear registro de ejecución para un solo archivo (compatibilidad)"""
         self.create_execution_record(execution_id, [metadata], project_name)
     
+    def _execution_index(self) -> ExecutionIndex:
+        """Índice del historial; solo se reconstruye si el archivo cambió"""
+        return execution_indexes.get(self.executions_file, self._load_executions)
+    
     def get_execution_history(self, user_id: str = None) -> List[ImportExecution]:
-        """Obtener historial de ejecuciones"""
-        executions = self._load_executions()
-        
-        if user_id:
-            # Filtrar por usuario si se especifica
-            executions = [exec for exec in executions if exec.userId == user_id]
-        
-        # Ordenar por fecha más reciente
-        executions.sort(key=lambda x: x.executionDate, reverse=True)
-        
+        """Obtener historial de ejecuciones, de la más reciente a la más antigua"""
+        executions, _ = self._execution_index().query({"userId": user_id} if user_id else {})
         return executions
     
+    def query_execution_history(
+        self,
+        user_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        period: Optional[str] = None,
+        status: Optional[ExecutionStatus] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> tuple[List[ImportExecution], Optional[str]]:
+        """Página del historial con filtros, de la más reciente a la más antigua.
+
+        ``date_from`` y ``date_to`` acotan la fecha de ejecución (ISO; el
+        límite superior no se incluye). ``cursor`` es el valor devuelto por la
+        página anterior. Devuelve la página y el cursor de la siguiente (None
+        si no hay más). Lanza ValueError si el cursor no es válido.
+        """
+        filters = {}
+        if user_id:
+            filters["userId"] = user_id
+        if project_id:
+            filters["projectId"] = project_id
+        if period:
+            filters["period"] = period
+        if status:
+            filters["status"] = status.value
+        after = decode_cursor(cursor) if cursor else None
+        executions, next_key = self._execution_index().query(filters, date_from, date_to, after, limit)
+        return executions, encode_cursor(next_key) if next_key else None
+    
     def update_execution_status(
         self, 
         execution_id: str, 
         status: ExecutionStatus,
-        error_message: str = None
+        error_message: str = None,
+        rows_imported: Optional[int] = None
     ) -> None:
-        """Actualizar estado de una ejecución"""
-        executions = self._load_executions()
-        
-        for execution in executions:
-            if execution.executionId == execution_id:
-                execution.status = status
-                if error_message:
-                    execution.errorMessage = error_message
-                break
-        
-        self._save_executions(executions)
+        """Actualizar estado de una ejecución (y las filas importadas, al convertirla)"""
+        changes: List[Change] = []
+        with self._executions_transaction(changes) as executions:
+            for execution in executions:
+                if execution.executionId == execution_id:
+                    before = execution.copy()
+                    execution.status = status
+                    if error_message:
+                        execution.errorMessage = error_message
+                    if rows_imported is not None:
+                        execution.rowsImported = rows_imported
+                    changes.append((before, execution))
+                    break
         
         # También actualizar todas las metadatas
         metadatas = self.get_metadatas_by_execution_id(execution_id)
@@ -271,10 +534,7 @@ class UploadService:
     def get_metadata_by_execution_id(self, execution_id: str) -> Optional[FileMetadata]:
         """Obtener metadata principal por ID de ejecución"""
         try:
-            metadata_file = os.path.join(
-                self.metadata_path, 
-                f"{execution_id}_metadata.json"
-            )
+            metadata_file = self.layout.path("metadata", execution_id, f"{execution_id}_metadata.json")
             
             if os.path.exists(metadata_file):
                 with open(metadata_file, 'r', encoding='utf-8') as f:
@@ -294,13 +554,11 @@ class UploadService:
             metadatas.append(main_metadata)
         
         # Buscar metadatas adicionales
+        metadata_dir = self.layout.execution_dir("metadata", execution_id)
         index = 1
         while True:
             try:
-                metadata_file = os.path.join(
-                    self.metadata_path, 
-                    f"{execution_id}_metadata_{index}.json"
-                )
+                metadata_file = os.path.join(metadata_dir, f"{execution_id}_metadata_{index}.json")
                 
                 if os.path.exists(metadata_file):
                     with open(metadata_file, 'r', encoding='utf-8') as f:
@@ -314,15 +572,25 @@ class UploadService:
         
         return metadatas
     
+    def ensure_summary(self) -> None:
+        """Reconstruir el resumen por proyecto si no existe o no está al día con el historial"""
+        with locked(self.executions_file):
+            if self.summary.is_current(file_signature(self.executions_file)):
+                return
+            executions = self._load_executions(strict=True)
+            missing = [execution for execution in executions if execution.bytesStored is None]
+            for execution in missing:
+                # Ejecuciones anteriores a este campo: se completa una sola vez
+                execution.bytesStored = sum(m.fileSize for m in self.get_metadatas_by_execution_id(execution.executionId))
+            if missing and not self._save_executions(executions):
+                return
+            self.summary.rebuild(executions, file_signature(self.executions_file))
+    
     def get_execution_by_id(self, execution_id: str) -> Optional[ImportExecution]:
         """Obtener ejecución específica por ID"""
-        executions = self._load_executions()
-        
-        for execution in executions:
-            if execution.executionId == execution_id:
-                return execution
-        
-        return None
+        execution = self._execution_index().by_id.get(execution_id)
+        # Copia: el índice es compartido y quien llama puede modificarla
+        return execution.copy() if execution else None
     
     def get_execution_details(self, execution_id: str) -> Optional[dict]:
         """Obtener detalles completos de una ejecución incluyendo todas las metadatas"""
@@ -333,8 +601,8 @@ class UploadService:
         metadatas = self.get_metadatas_by_execution_id(execution_id)
         
         return {
-            "execution": execution.dict(),
-            "metadatas": [metadata.dict() for metadata in metadatas],
+            "execution": execution,
+            "metadatas": metadatas,
             "canDownload": execution.status == ExecutionStatus.SUCCESS,
             "availableFiles": self._get_available_files(execution_id, execution)
         }
@@ -2,8 +2,9 @@
 # backend/app/services/user_service.py
 import json
 import os
-from typing import Optional, List
+from typing import Optional, List, Dict
 from app.models.user import User, UserPermissions
+from app.services.reference_data import reference_data, ReferenceData
 
 class UserService:
     def __init__(self):
@@ -21,17 +22,20 @@ class UserService:
             print(f"❌ Error al parsear JSON de usuarios: {self.data_file}")
             return {}
     
-    def get_all_users(self) -> List[User]:
-        """Obtener todos los usuarios disponibles"""
-        users_data = self._load_users_data()
-        users = []
+    def _users(self) -> ReferenceData:
+        """Usuarios en caché; se vuelven a leer solo si cambia el archivo"""
+        return reference_data.get(self.data_file, self._load_users_data)
+    
+    def _build_users_index(self, users_data: dict) -> Dict[str, User]:
+        """Índice ID de usuario → usuario"""
+        users = {}
         
         for user_id, user_data in users_data.items():
             try:
                 # Convertir permisos a objeto UserPermissions
                 permissions = UserPermissions(**user_data.get('permissions', {}))
                 
-                user = User(
+                users[user_id] = User(
                     id=user_data['id'],
                     name=user_data['name'],
                     email=user_data['email'],
@@ -44,7 +48,6 @@ class UserService:
                     createdAt=user_data['createdAt'],
                     lastLogin=user_data['lastLogin']
                 )
-                users.append(user)
             except Exception as e:
                 print(f"⚠️ Error procesando usuario {user_id}: {str(e)}")
                 continue
@@ -52,35 +55,17 @@ class UserService:
         print(f"✅ Cargados {len(users)} usuarios desde {self.data_file}")
         return users
     
+    def data_version(self) -> str:
+        """Versión de los datos de usuarios (cambia al modificarse el archivo)"""
+        return self._users().version
+    
+    def get_all_users(self) -> List[User]:
+        """Obtener todos los usuarios disponibles"""
+        return list(self._users().index("users_by_id", self._build_users_index).values())
+    
     def get_user_by_id(self, user_id: str) -> Optional[User]:
         """Obtener usuario por ID"""
-        users_data = self._load_users_data()
-        
-        if user_id in users_data:
-            user_data = users_data[user_id]
-            
-            try:
-                # Convertir permisos a objeto UserPermissions
-                permissions = UserPermissions(**user_data.get('permissions', {}))
-                
-                return User(
-                    id=user_data['id'],
-                    name=user_data['name'],
-                    email=user_data['email'],
-                    role=user_data['role'],
-                    roleName=user_data['roleName'],
-                    department=user_data['department'],
-                    projects=user_data['projects'],
-                    permissions=permissions,
-                    status=user_data['status'],
-                    createdAt=user_data['createdAt'],
-                    lastLogin=user_data['lastLogin']
-                )
-            except Exception as e:
-                print(f"❌ Error procesando usuario {user_id}: {str(e)}")
-                return None
-        
-        return None
+        return self._users().index("users_by_id", self._build_users_index).get(user_id)
     
     def get_current_user(self) -> Optional[User]:
         """Obtener usuario actual (simulado)"""
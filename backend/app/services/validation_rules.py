@@ -0,0 +1,593 @@
+# backend/app/services/validation_rules.py
+from __future__ import annotations
+import time
+from typing import List, Dict, Any, Optional, Callable, Tuple, Union
+from app.models.import_models import ValidationResult, ValidationStatus
+from app.services.lazy_import import lazy_module
+
+# pandas se importa al usarse por primera vez, no al cargar la aplicación web
+pd = lazy_module("pandas")
+
+
+def parse_sap_amount(amount_str: str) -> Optional[float]:
+    """Convertir un importe SAP ('2.865,30', '12,00-') a float; None si no es válido"""
+    value = amount_str.replace(' ', '')
+    negative = value.endswith('-')
+    if negative:
+        value = value[:-1]
+    if ',' in value:
+        # Punto como separador de miles y coma como separador decimal
+        value = value.replace('.', '').replace(',', '.')
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return -number if negative else number
+
+
+def decode_dates(raw: pd.Series) -> pd.Series:
+    """Convertir una columna de fechas a datetime de forma vectorizada.
+
+    Toda la columna se convierte en una pasada con el formato de SAP
+    (DD.MM.YYYY); solo los valores que no encajan se reintentan con los
+    demás formatos admitidos.
+    """
+    dates = pd.to_datetime(raw, format='%d.%m.%Y', errors='coerce')
+    pending = dates.isna() & (raw != '')
+    for fallback_format in ('%Y-%m-%d', '%d/%m/%Y'):
+        if not pending.any():
+            break
+        dates[pending] = pd.to_datetime(raw[pending], format=fallback_format, errors='coerce')
+        pending = dates.isna() & (raw != '')
+    return dates
+
+
+def decode_amounts(raw: pd.Series) -> pd.Series:
+    """Convertir una columna de importes SAP a float con parse_sap_amount.
+
+    Los importes se interpretan exactamente igual que en las comprobaciones
+    fila a fila; los inválidos quedan como NaN.
+    """
+    return pd.Series(
+        [parse_sap_amount(value) for value in raw], index=raw.index, dtype='float64'
+    )
+
+
+class ColumnContext:
+    """Columnas de un bloque de filas, extraídas y decodificadas una sola vez.
+
+    Todas las reglas que se evalúan sobre el mismo contexto comparten las
+    columnas en bruto y sus versiones decodificadas (fechas, importes).
+    """
+
+    def __init__(
+        self,
+        headers: List[str],
+        rows: List[List[str]],
+        row_offset: int = 0,
+        period_bounds: Optional[Tuple[pd.Timestamp, pd.Timestamp]] = None
+    ):
+        self.headers = headers
+        self.rows = rows
+        self.row_offset = row_offset
+        self.period_bounds = period_bounds
+        self._positions = {}
+        for idx, name in enumerate(headers):
+            self._positions.setdefault(name, idx)
+        self._raw = {}
+        self._decoded = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def has(self, column: str) -> bool:
+        return column in self._positions
+
+    def load(self, columns: List[str]) -> None:
+        """Extraer en una sola pasada todas las columnas pendientes"""
+        pending = [c for c in dict.fromkeys(columns) if self.has(c) and c not in self._raw]
+        if not pending:
+            return
+        if not self.rows:
+            for column in pending:
+                self._raw[column] = pd.Series([], dtype=object)
+            return
+        # Una lista por columna: transponer con zip(*filas) es bastante más lento
+        for column in pending:
+            position = self._positions[column]
+            self._raw[column] = pd.Series([row[position] for row in self.rows], dtype=object)
+
+    def raw(self, column: str) -> pd.Series:
+        if column not in self._raw:
+            self.load([column])
+        return self._raw[column]
+
+    def _decode(self, kind: str, column: str, decoder: Callable[[pd.Series], pd.Series]) -> pd.Series:
+        key = (kind, column)
+        if key not in self._decoded:
+            self._decoded[key] = decoder(self.raw(column))
+        return self._decoded[key]
+
+    def dates(self, column: str) -> pd.Series:
+        return self._decode('dates', column, decode_dates)
+
+    def amounts(self, column: str) -> pd.Series:
+        return self._decode('amounts', column, decode_amounts)
+
+    def value(self, position: int, column: str) -> str:
+        return self.rows[position][self._positions[column]]
+
+    def row_number(self, position: int) -> int:
+        return self.row_offset + position + 1
+
+
+class ValidationRule:
+    """Regla de validación declarativa.
+
+    Cada regla indica la fase, el tipo de archivo, la severidad y las
+    columnas que necesita; el motor carga esas columnas una sola vez por
+    contexto y mide el tiempo de cada regla.
+    """
+
+    def __init__(
+        self,
+        field: str,
+        file_type: str,
+        phase: int,
+        description: str,
+        columns: Union[List[str], Callable[[ColumnContext], List[str]]],
+        severity: ValidationStatus = ValidationStatus.ERROR,
+        missing_message: Optional[str] = None,
+        missing_details: Optional[str] = None
+    ):
+        self.field = field
+        self.file_type = file_type
+        self.phase = phase
+        self.description = description
+        self.columns = columns
+        self.severity = severity
+        self.missing_message = missing_message
+        self.missing_details = missing_details
+
+    def declared_columns(self, ctx: ColumnContext) -> List[str]:
+        return self.columns(ctx) if callable(self.columns) else list(self.columns)
+
+    def missing_result(self) -> Optional[ValidationResult]:
+        """Resultado cuando faltan columnas; None si la regla simplemente no aplica"""
+        if not self.missing_message:
+            return None
+        return ValidationResult(
+            field=self.field,
+            status=ValidationStatus.ERROR,
+            message=self.missing_message,
+            details=self.missing_details
+        )
+
+    def run(self, ctx: ColumnContext) -> Optional[ValidationResult]:
+        raise NotImplementedError
+
+
+class RowRule(ValidationRule):
+    """Regla que marca celdas inválidas columna a columna.
+
+    El predicado recibe el contexto y una columna y devuelve una máscara
+    booleana con las filas erróneas. Se puede evaluar por bloques
+    acumulando el resultado, lo que permite la salida anticipada.
+    """
+
+    def __init__(
+        self,
+        predicate: Callable[[ColumnContext, str], pd.Series],
+        error_message: str,
+        error_details: str,
+        ok_message: str,
+        ok_details: str,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.predicate = predicate
+        self.error_message = error_message
+        self.error_details = error_details
+        self.ok_message = ok_message
+        self.ok_details = ok_details
+
+    def present_columns(self, ctx: ColumnContext) -> List[str]:
+        return [c for c in self.declared_columns(ctx) if ctx.has(c)]
+
+    def new_accumulator(self) -> Dict[str, Any]:
+        return {"count": 0, "samples": [], "columns": 0, "elapsed": 0.0}
+
+    def accumulate(self, ctx: ColumnContext, acc: Dict[str, Any], failing=None) -> int:
+        """Evaluar la regla sobre un bloque y devolver los errores (celdas) nuevos.
+
+        Si se pasa ``failing`` (array booleano de una posición por fila del
+        bloque), se marcan en él las filas con algún error.
+        """
+        started = time.perf_counter()
+        columns = self.present_columns(ctx)
+        acc["columns"] = max(acc["columns"], len(columns))
+        new_errors = 0
+        for column in columns:
+            mask = self.predicate(ctx, column)
+            count = int(mask.sum())
+            if not count:
+                continue
+            new_errors += count
+            if failing is not None:
+                failing |= mask.to_numpy()
+            for position in mask.to_numpy().nonzero()[0][:3 - len(acc["samples"])]:
+                acc["samples"].append(
+                    f"Fila {ctx.row_number(position)}: {column} = '{ctx.value(position, column)}'"
+                )
+        acc["count"] += new_errors
+        acc["elapsed"] += time.perf_counter() - started
+        return new_errors
+
+    def failing_rows(self, ctx: ColumnContext) -> Tuple[pd.Series, List[str]]:
+        """Máscara de filas con algún error en la regla y ejemplos de ellas"""
+        failing = pd.Series(False, index=pd.RangeIndex(len(ctx)))
+        examples = []
+        for column in self.present_columns(ctx):
+            mask = self.predicate(ctx, column)
+            for position in mask.to_numpy().nonzero()[0][:3 - len(examples)]:
+                examples.append(f"{column} = '{ctx.value(position, column)}'")
+            failing |= mask.to_numpy()
+        return failing, examples
+
+    def result(self, acc: Dict[str, Any], total_rows: int) -> ValidationResult:
+        if acc["count"]:
+            result = ValidationResult(
+                field=self.field,
+                status=self.severity,
+                message=self.error_message,
+                details=self.error_details.format(count=acc["count"], samples='; '.join(acc["samples"]))
+            )
+        else:
+            result = ValidationResult(
+                field=self.field,
+                status=ValidationStatus.OK,
+                message=self.ok_message,
+                details=self.ok_details.format(columns=acc["columns"], rows=total_rows)
+            )
+        result.durationMs = round(acc["elapsed"] * 1000, 2)
+        return result
+
+    def run(self, ctx: ColumnContext) -> Optional[ValidationResult]:
+        acc = self.new_accumulator()
+        self.accumulate(ctx, acc)
+        return self.result(acc, len(ctx))
+
+
+class DatasetRule(ValidationRule):
+    """Regla que necesita ver el conjunto completo (unicidad, balances...)"""
+
+    def __init__(self, evaluate: Callable[[ColumnContext], Optional[ValidationResult]], **kwargs):
+        super().__init__(**kwargs)
+        self.evaluate = evaluate
+
+    def run(self, ctx: ColumnContext) -> Optional[ValidationResult]:
+        if any(not ctx.has(c) for c in self.declared_columns(ctx)):
+            return self.missing_result()
+        return self.evaluate(ctx)
+
+
+class RuleRegistry:
+    """Registro de reglas de validación agrupadas por tipo de archivo y fase"""
+
+    def __init__(self):
+        self._rules: List[ValidationRule] = []
+        self.phase_names = {
+            1: "Validaciones de Formato",
+            2: "Validaciones de Identificadores",
+            3: "Validaciones Temporales",
+            4: "Validaciones de Integridad Contable"
+        }
+
+    def register(self, rule: ValidationRule) -> ValidationRule:
+        self._rules.append(rule)
+        return rule
+
+    def row_rule(self, **kwargs) -> Callable:
+        """Decorador para registrar un predicado como RowRule"""
+        def decorator(predicate):
+            self.register(RowRule(predicate=predicate, **kwargs))
+            return predicate
+        return decorator
+
+    def dataset_rule(self, **kwargs) -> Callable:
+        """Decorador para registrar una función como DatasetRule"""
+        def decorator(evaluate):
+            self.register(DatasetRule(evaluate=evaluate, **kwargs))
+            return evaluate
+        return decorator
+
+    def rules_for(self, file_type: str, phase: Optional[int] = None) -> List[ValidationRule]:
+        rules = [r for r in self._rules if r.file_type == file_type and (phase is None or r.phase == phase)]
+        return sorted(rules, key=lambda r: r.phase)
+
+    def describe_phases(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Fases y validaciones por tipo de archivo, en el formato de validation_phases"""
+        phases = {}
+        for rule in sorted(self._rules, key=lambda r: r.phase):
+            file_phases = phases.setdefault(rule.file_type, [])
+            if not file_phases or file_phases[-1]["phase"] != rule.phase:
+                file_phases.append({
+                    "phase": rule.phase,
+                    "name": self.phase_names.get(rule.phase, f"Fase {rule.phase}"),
+                    "validations": []
+                })
+            file_phases[-1]["validations"].append(rule.description)
+        return phases
+
+
+rule_registry = RuleRegistry()
+
+DATE_COLUMNS = ['Fe.contab.', 'FechaEntr', 'Fecha doc.', 'Fe.comp.']
+TIME_PATTERN = r'\d{2}:\d{2}(:\d{2})?'
+SUMAS_SALDOS_AMOUNT_KEYWORDS = ['saldo', 'importe', 'debe', 'haber', 'movimiento']
+
+
+# Fase 1 - Libro Diario: formato
+
+@rule_registry.row_rule(
+    field="fechas", file_type="libro_diario", phase=1,
+    description="Fechas con formato correcto",
+    columns=DATE_COLUMNS,
+    error_message="Formato de fecha inválido",
+    error_details="Se encontraron {count} errores de formato. Ejemplos: {samples}",
+    ok_message="Todas las fechas tienen formato correcto",
+    ok_details="Verificadas {columns} columnas de fecha en {rows} registros"
+)
+def invalid_dates(ctx: ColumnContext, column: str) -> pd.Series:
+    return (ctx.raw(column) != '') & ctx.dates(column).isna()
+
+
+@rule_registry.row_rule(
+    field="horas", file_type="libro_diario", phase=1,
+    description="Horas con formato correcto",
+    columns=['Hora'],
+    error_message="Formato de hora inválido",
+    error_details="Se encontraron {count} errores. Ejemplos: {samples}",
+    ok_message="Todas las horas tienen formato correcto",
+    ok_details="Verificadas {columns} columnas de hora en {rows} registros"
+)
+def invalid_times(ctx: ColumnContext, column: str) -> pd.Series:
+    raw = ctx.raw(column)
+    return (raw != '') & ~raw.str.fullmatch(TIME_PATTERN).fillna(False).astype(bool)
+
+
+@rule_registry.row_rule(
+    field="importes", file_type="libro_diario", phase=1,
+    description="Importes con formato correcto",
+    columns=['Importe ML', 'Importe'],
+    error_message="Formato de importe inválido",
+    error_details="Se encontraron {count} errores. Ejemplos: {samples}",
+    ok_message="Todos los importes tienen formato correcto",
+    ok_details="Verificadas {columns} columnas de importe en {rows} registros"
+)
+def invalid_amounts(ctx: ColumnContext, column: str) -> pd.Series:
+    return (ctx.raw(column) != '') & ctx.amounts(column).isna()
+
+
+# Fase 2 - Libro Diario: identificadores
+
+@rule_registry.dataset_rule(
+    field="asientos_unicos", file_type="libro_diario", phase=2,
+    description="Identificadores de asientos únicos",
+    columns=['Nº doc.'],
+    missing_message="Campo 'Nº doc.' no encontrado",
+    missing_details="No se puede validar unicidad de asientos sin el campo de número de documento"
+)
+def unique_documents(ctx: ColumnContext) -> ValidationResult:
+    docs = ctx.raw('Nº doc.')
+    duplicates = docs[docs.duplicated()].unique()
+
+    if len(duplicates):
+        return ValidationResult(
+            field="asientos_unicos",
+            status=ValidationStatus.ERROR,
+            message="Identificadores de asientos duplicados",
+            details=f"Se encontraron {len(duplicates)} documentos duplicados. Ejemplos: {', '.join(duplicates[:5])}"
+        )
+    return ValidationResult(
+        field="asientos_unicos",
+        status=ValidationStatus.OK,
+        message="Todos los asientos tienen identificadores únicos",
+        details=f"Verificados {docs.nunique()} asientos únicos"
+    )
+
+
+@rule_registry.dataset_rule(
+    field="posiciones_secuenciales", file_type="libro_diario", phase=2,
+    description="Identificadores de apuntes secuenciales",
+    columns=['Nº doc.', 'Pos'],
+    severity=ValidationStatus.WARNING
+)
+def sequential_positions(ctx: ColumnContext) -> ValidationResult:
+    docs = ctx.raw('Nº doc.')
+    positions = ctx.raw('Pos')
+
+    # Las posiciones no numéricas se ignoran, como en la validación original
+    numeric = pd.to_numeric(positions.where(positions.str.isdigit().astype(bool)), errors='coerce')
+    stats = pd.DataFrame({'doc': docs, 'pos': numeric}).groupby('doc', sort=False)['pos'].agg(
+        ['count', 'nunique', 'min', 'max']
+    )
+    sequential = (stats['count'] == 0) | (
+        (stats['nunique'] == stats['count']) & (stats['min'] == 1) & (stats['max'] == stats['count'])
+    )
+    broken = stats.index[~sequential]
+
+    if len(broken):
+        samples = [f"Doc {doc}: posiciones {positions[docs == doc].tolist()}" for doc in broken[:3]]
+        return ValidationResult(
+            field="posiciones_secuenciales",
+            status=ValidationStatus.WARNING,
+            message="Posiciones no secuenciales encontradas",
+            details=f"{len(broken)} asientos con problemas. Ejemplos: {'; '.join(samples)}"
+        )
+    return ValidationResult(
+        field="posiciones_secuenciales",
+        status=ValidationStatus.OK,
+        message="Todas las posiciones son secuenciales",
+        details=f"Verificados {len(stats)} asientos con posiciones correctas"
+    )
+
+
+# Fase 3 - Libro Diario: temporales
+
+def _date_samples(ctx: ColumnContext, column: str, mask: pd.Series) -> str:
+    positions = mask.to_numpy().nonzero()[0][:3]
+    return '; '.join(f"Fila {ctx.row_number(p)}: {column} = '{ctx.value(p, column)}'" for p in positions)
+
+
+@rule_registry.dataset_rule(
+    field="fecha_periodo", file_type="libro_diario", phase=3,
+    description="Fecha contable en el período",
+    columns=['Fe.contab.'],
+    missing_message="Campo de fecha contable no encontrado",
+    missing_details="No se puede validar período sin fecha contable"
+)
+def postings_in_period(ctx: ColumnContext) -> ValidationResult:
+    if not ctx.period_bounds:
+        return ValidationResult(
+            field="fecha_periodo",
+            status=ValidationStatus.WARNING,
+            message="Período de la importación no definido",
+            details="No se puede comprobar que las fechas contables estén dentro del período"
+        )
+
+    start, end = ctx.period_bounds
+    period_label = f"{start.date()} - {end.date()}"
+
+    # Las fechas vacías o inválidas las cubre la fase 1
+    fecha_contab = ctx.dates('Fe.contab.')
+    out_of_period = fecha_contab.notna() & ((fecha_contab < start) | (fecha_contab > end))
+    out_count = int(out_of_period.sum())
+
+    if out_count:
+        return ValidationResult(
+            field="fecha_periodo",
+            status=ValidationStatus.ERROR,
+            message="Fechas contables fuera del período",
+            details=f"{out_count} de {len(ctx)} transacciones fuera del período {period_label}. Ejemplos: {_date_samples(ctx, 'Fe.contab.', out_of_period)}"
+        )
+    return ValidationResult(
+        field="fecha_periodo",
+        status=ValidationStatus.OK,
+        message="Fechas contables dentro del período",
+        details=f"Todas las {len(ctx)} transacciones están en el período {period_label}"
+    )
+
+
+@rule_registry.dataset_rule(
+    field="fecha_registro", file_type="libro_diario", phase=3,
+    description="Fecha registro excede el período contable",
+    columns=['Fe.contab.', 'FechaEntr'],
+    severity=ValidationStatus.WARNING
+)
+def late_entries(ctx: ColumnContext) -> Optional[ValidationResult]:
+    if not ctx.period_bounds:
+        return None
+
+    # Registros introducidos después del cierre del período contable
+    end = ctx.period_bounds[1]
+    fecha_entrada = ctx.dates('FechaEntr')
+    late = fecha_entrada.notna() & (fecha_entrada > end)
+    late_count = int(late.sum())
+
+    if late_count:
+        return ValidationResult(
+            field="fecha_registro",
+            status=ValidationStatus.WARNING,
+            message="Fechas de registro posteriores al período contable",
+            details=f"{late_count} registros introducidos después del {end.date()}. Ejemplos: {_date_samples(ctx, 'FechaEntr', late)}"
+        )
+    return ValidationResult(
+        field="fecha_registro",
+        status=ValidationStatus.OK,
+        message="Fechas de registro válidas",
+        details=f"Verificadas {len(ctx)} fechas de registro"
+    )
+
+
+# Fase 4 - Libro Diario: integridad contable
+
+@rule_registry.dataset_rule(
+    field="asientos_balanceados", file_type="libro_diario", phase=4,
+    description="Asientos balanceados",
+    columns=['Nº doc.', 'D/H', 'Importe ML'],
+    missing_message="Campos requeridos no encontrados",
+    missing_details="Se requieren campos: Nº doc., D/H, Importe ML"
+)
+def balanced_entries(ctx: ColumnContext) -> ValidationResult:
+    docs = ctx.raw('Nº doc.')
+    dh = ctx.raw('D/H')
+    raw_amounts = ctx.raw('Importe ML')
+    amounts = ctx.amounts('Importe ML')
+
+    invalid = (raw_amounts != '') & amounts.isna()
+    valid = ~invalid
+    values = amounts.fillna(0.0)
+
+    # Agrupar por documento y verificar balance (tolerancia de 1 céntimo)
+    balances = pd.DataFrame({
+        'doc': docs[valid],
+        'debe': values.where(dh == 'S', 0.0)[valid],
+        'haber': values.where(dh == 'H', 0.0)[valid]
+    }).groupby('doc', sort=False).sum()
+    diff = (balances['debe'] - balances['haber']).abs()
+    unbalanced = balances[diff > 0.01]
+
+    if len(unbalanced) or invalid.any():
+        error_details = []
+        if len(unbalanced):
+            error_details.append(f"Asientos desbalanceados: {len(unbalanced)}")
+        if invalid.any():
+            error_details.append(f"Errores de formato: {int(invalid.sum())}")
+
+        samples = [
+            f"Doc {doc}: Debe={row.debe:.2f}, Haber={row.haber:.2f}, Diff={abs(row.debe - row.haber):.2f}"
+            for doc, row in unbalanced.head(3).iterrows()
+        ]
+        for position in invalid.to_numpy().nonzero()[0][:3 - len(samples)]:
+            samples.append(f"Doc {docs.iat[position]}: importe inválido '{raw_amounts.iat[position]}'")
+
+        return ValidationResult(
+            field="asientos_balanceados",
+            status=ValidationStatus.ERROR,
+            message="Asientos desbalanceados encontrados",
+            details=f"{'; '.join(error_details)}. Ejemplos: {'; '.join(samples)}"
+        )
+    return ValidationResult(
+        field="asientos_balanceados",
+        status=ValidationStatus.OK,
+        message="Todos los asientos están balanceados",
+        details=f"Verificados {len(balances)} asientos con balance correcto"
+    )
+
+
+# Fase 1 - Sumas y Saldos: formato
+
+def _sumas_saldos_amount_columns(ctx: ColumnContext) -> List[str]:
+    """Columnas de importes: por nombre o, si no hay, las que parecen numéricas"""
+    columns = [h for h in ctx.headers if any(k in h.lower() for k in SUMAS_SALDOS_AMOUNT_KEYWORDS)]
+    if not columns and ctx.rows:
+        first_row = ctx.rows[0]
+        columns = [
+            h for i, h in enumerate(ctx.headers)
+            if i < len(first_row) and (first_row[i] == '' or parse_sap_amount(first_row[i]) is not None)
+        ]
+    return columns
+
+
+@rule_registry.row_rule(
+    field="importes", file_type="sumas_saldos", phase=1,
+    description="Importes con formato correcto",
+    columns=_sumas_saldos_amount_columns,
+    error_message="Formato de importe inválido en Sumas y Saldos",
+    error_details="Se encontraron {count} errores. Ejemplos: {samples}",
+    ok_message="Todos los importes tienen formato correcto",
+    ok_details="Verificadas {columns} columnas de importe en {rows} registros"
+)
+def invalid_sumas_saldos_amounts(ctx: ColumnContext, column: str) -> pd.Series:
+    return (ctx.raw(column) != '') & ctx.amounts(column).isna()
@@ -1,76 +1,162 @@
 #backend/app/services/validation_service.py
+from __future__ import annotations
 import os
 import json
+import math
 import time
+import random
 import re
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Iterator, Optional
 from datetime import datetime
+from app.config.settings import (
+    VALIDATION_CHUNK_SIZE, VALIDATION_HEADER_SEARCH_LINES, VALIDATION_SLOW_RULE_MS,
+    QUICK_CHECK_SAMPLE_SIZE, QUICK_CHECK_TIME_BUDGET, QUICK_CHECK_FULL_SCAN_BYTES
+)
 from app.models.import_models import (
-    FileValidation, ValidationResult, ValidationStatus, FileMetadata
+    FileValidation, ValidationResult, ValidationStatus, FileMetadata,
+    QuickCheckResult, QuickCheckEstimate, SamplingStrategy
+)
+from app.services.validation_rules import (
+    rule_registry, ColumnContext, ValidationRule, RowRule, parse_sap_amount
 )
+from app.services.progress_service import ProgressReporter, NULL_PROGRESS
+from app.services.artifact_service import ArtifactStore, fingerprint, try_input_fingerprint
+from app.services.lazy_import import lazy_module
+
+# pandas se importa al usarse por primera vez, no al cargar la aplicación web
+pd = lazy_module("pandas")
+np = lazy_module("numpy")
+
+class ValidationBudget:
+    """Presupuesto de errores para validar archivos grandes con salida anticipada"""
+
+    def __init__(
+        self,
+        fail_fast: bool = False,
+        max_errors: Optional[int] = None,
+        max_error_rate: Optional[float] = None
+    ):
+        self.fail_fast = fail_fast
+        self.max_errors = max_errors
+        self.max_error_rate = max_error_rate
+
+    @property
+    def enabled(self) -> bool:
+        return self.fail_fast or self.max_errors is not None or self.max_error_rate is not None
+
+    def check(self, error_count: int, failing_rows: int, rows_checked: int) -> Optional[str]:
+        """Devolver el motivo de parada si se ha agotado el presupuesto.
+
+        ``max_errors`` cuenta celdas erróneas; ``max_error_rate`` es la
+        fracción de filas con al menos un error.
+        """
+        if self.fail_fast and error_count > 0:
+            return f"Modo fail_fast: validación detenida tras encontrar {error_count} error(es)"
+        if self.max_errors is not None and error_count >= self.max_errors:
+            return f"Presupuesto de errores agotado: {error_count} errores (máximo {self.max_errors})"
+        if self.max_error_rate is not None and rows_checked > 0:
+            error_rate = failing_rows / rows_checked
+            if error_rate >= self.max_error_rate:
+                return (
+                    f"Tasa de filas con errores {error_rate:.2%} ({failing_rows} de {rows_checked} filas) "
+                    f"supera el máximo permitido ({self.max_error_rate:.2%})"
+                )
+        return None
 
 class ValidationService:
     def __init__(self):
-        self.validation_phases = {
-            "libro_diario": [
-                {"phase": 1, "name": "Validaciones de Formato", "validations": [
-                    "Fechas con formato correcto",
-                    "Horas con formato correcto", 
-                    "Importes con formato correcto"
-                ]},
-                {"phase": 2, "name": "Validaciones de Identificadores", "validations": [
-                    "Identificadores de asientos únicos",
-                    "Identificadores de apuntes secuenciales"
-                ]},
-                {"phase": 3, "name": "Validaciones Temporales", "validations": [
-                    "Fecha contable en el período",
-                    "Fecha registro excede el período contable"
-                ]},
-                {"phase": 4, "name": "Validaciones de Integridad Contable", "validations": [
-                    "Asientos balanceados"
-                ]}
-            ],
-            "sumas_saldos": [
-                {"phase": 1, "name": "Validaciones de Formato", "validations": [
-                    "Fechas con formato correcto",
-                    "Horas con formato correcto",
-                    "Importes con formato correcto"
-                ]}
-            ]
-        }
+        # Las fases se describen a partir de las reglas registradas
+        self.rule_registry = rule_registry
+        self.validation_phases = rule_registry.describe_phases()
+        self.validation_phases["bkpf_bseg"] = [
+            {"phase": 1, "name": "Validaciones de Integridad Referencial", "validations": [
+                "Posiciones BSEG con cabecera BKPF",
+                "Cabeceras BKPF con posiciones",
+                "Cabeceras BKPF únicas"
+            ]}
+        ]
 
-    def parse_sap_txt_file(self, file_path: str, file_type: str) -> Tuple[List[str], List[List[str]]]:
-        """Parsear archivos TXT de SAP con formato específico"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        lines = content.split('\n')
-        
-        # Encontrar la línea de headers (contiene |  Soc.|)
-        header_line_index = -1
-        for i, line in enumerate(lines):
-            if '|  Soc.|' in line or '| Soc.|' in line:
-                header_line_index = i
-                break
-        
-        if header_line_index == -1:
+    def _split_sap_line(self, line: str) -> List[str]:
+        """Separar una línea '|campo|campo|' de SAP en sus campos"""
+        stripped = line.strip()
+        if stripped.startswith('|'):
+            stripped = stripped[1:]
+        if stripped.endswith('|'):
+            stripped = stripped[:-1]
+        return [field.strip() for field in stripped.split('|')]
+
+    def iter_sap_txt_chunks(
+        self,
+        file_path: str,
+        chunk_size: int = None,
+        header_search_lines: int = None,
+        max_fields: int = None
+    ) -> Iterator[Tuple[List[str], List[List[str]], int]]:
+        """Leer un archivo TXT de SAP por bloques de filas.
+
+        Genera tuplas (headers, filas, bytes_leidos) de forma que el llamador
+        puede detener la lectura en cuanto tiene un veredicto sin cargar el
+        archivo completo en memoria. Con ``max_fields`` solo se separan los
+        primeros campos de cada fila, lo que abarata los recorridos por clave.
+        """
+        chunk_size = chunk_size or VALIDATION_CHUNK_SIZE
+        headers = None
+        header_line = None
+        bytes_read = 0
+        chunk = []
+
+        with open(file_path, 'rb') as f:
+            for line_number, raw_line in enumerate(f):
+                bytes_read += len(raw_line)
+                line = raw_line.decode('utf-8').rstrip('\r\n')
+
+                # Encontrar la línea de headers (contiene |  Soc.|)
+                if headers is None:
+                    if '|  Soc.|' in line or '| Soc.|' in line:
+                        headers = [field for field in self._split_sap_line(line) if field]
+                        header_line = line.strip()
+                    elif header_search_lines and line_number >= header_search_lines:
+                        break
+                    continue
+
+                # Ignorar separadores y cabeceras repetidas en cada página
+                if not line.strip() or '|' not in line or line.startswith('-'):
+                    continue
+                if line.strip() == header_line:
+                    continue
+
+                if max_fields:
+                    fields = [field.strip() for field in line.lstrip().split('|', max_fields + 1)[1:max_fields + 1]]
+                    row_length = max_fields
+                else:
+                    fields = self._split_sap_line(line)
+                    row_length = len(headers)
+                if len(fields) >= row_length:
+                    chunk.append(fields[:row_length])
+                    if len(chunk) >= chunk_size:
+                        yield headers, chunk, bytes_read
+                        chunk = []
+
+        if headers is None:
             raise ValueError("No se encontró la línea de headers en el archivo")
-        
-        # Extraer headers
-        header_line = lines[header_line_index]
-        headers = [field.strip() for field in header_line.split('|') if field.strip()]
-        
-        # Extraer datos (líneas después de la separación que contienen |)
+
+        yield headers, chunk, bytes_read
+
+    def parse_sap_txt_file(
+        self,
+        file_path: str,
+        file_type: str,
+        progress: Optional[ProgressReporter] = None
+    ) -> Tuple[List[str], List[List[str]]]:
+        """Parsear archivos TXT de SAP con formato específico"""
+        progress = progress or NULL_PROGRESS
+        file_size = os.path.getsize(file_path) or 1
+        progress.stage("parse", f"Leyendo {os.path.basename(file_path)}")
+        headers = []
         data_lines = []
-        start_data_index = header_line_index + 2  # Saltar línea de separación
-        
-        for line in lines[start_data_index:]:
-            if line.strip() and '|' in line and not line.startswith('-'):
-                # Parsear línea de datos
-                fields = [field.strip() for field in line.split('|') if len(line.split('|')) > 1]
-                if len(fields) >= len(headers):
-                    data_lines.append(fields[:len(headers)])
-        
+        for headers, chunk, bytes_read in self.iter_sap_txt_chunks(file_path):
+            data_lines.extend(chunk)
+            progress.advance(len(chunk), fraction=bytes_read / file_size)
         return headers, data_lines
 
     def validate_date_format(self, date_str: str) -> bool:
@@ -109,346 +195,215 @@ class ValidationService:
         if not amount_str or amount_str.strip() == '':
             return True
         
-        # Limpiar el string (quitar espacios, cambiar comas por puntos)
-        clean_amount = amount_str.strip().replace(',', '.')
-        
-        try:
-            float(clean_amount)
-            return True
-        except ValueError:
-            return False
+        # Admite el formato SAP con punto de miles y coma decimal (2.865,30)
+        return parse_sap_amount(amount_str.strip()) is not None
 
-    def validate_libro_diario_phase1(self, headers: List[str], data: List[List[str]]) -> List[ValidationResult]:
-        """Fase 1: Validaciones de Formato para Libro Diario"""
+    def _run_rules(
+        self,
+        rules: List[ValidationRule],
+        ctx: ColumnContext,
+        progress: Optional[ProgressReporter] = None
+    ) -> List[ValidationResult]:
+        """Ejecutar reglas sobre un contexto compartido midiendo cada una.
+
+        Antes de evaluar se extraen en una sola pasada todas las columnas que
+        declaran las reglas; las columnas decodificadas (fechas, importes)
+        quedan en caché en el contexto y se comparten entre fases.
+        """
+        ctx.load([column for rule in rules for column in rule.declared_columns(ctx)])
+        progress = progress or NULL_PROGRESS
         results = []
-        
-        # Validar fechas
-        date_fields = ['Fe.contab.', 'FechaEntr', 'Fecha doc.', 'Fe.comp.']
-        date_errors = []
-        
-        for row_idx, row in enumerate(data):
-            for field_idx, field_name in enumerate(headers):
-                if field_name in date_fields and field_idx < len(row):
-                    if not self.validate_date_format(row[field_idx]):
-                        date_errors.append(f"Fila {row_idx + 1}: {field_name} = '{row[field_idx]}'")
-        
-        if date_errors:
-            results.append(ValidationResult(
-                field="fechas",
-                status=ValidationStatus.ERROR,
-                message="Formato de fecha inválido",
-                details=f"Se encontraron {len(date_errors)} errores de formato. Ejemplos: {'; '.join(date_errors[:3])}"
-            ))
-        else:
-            results.append(ValidationResult(
-                field="fechas",
-                status=ValidationStatus.OK,
-                message="Todas las fechas tienen formato correcto",
-                details=f"Verificadas {len([h for h in headers if h in date_fields])} columnas de fecha en {len(data)} registros"
-            ))
-        
-        # Validar horas
-        time_fields = ['Hora']
-        time_errors = []
-        
-        for row_idx, row in enumerate(data):
-            for field_idx, field_name in enumerate(headers):
-                if field_name in time_fields and field_idx < len(row):
-                    if not self.validate_time_format(row[field_idx]):
-                        time_errors.append(f"Fila {row_idx + 1}: {field_name} = '{row[field_idx]}'")
-        
-        if time_errors:
-            results.append(ValidationResult(
-                field="horas",
-                status=ValidationStatus.ERROR,
-                message="Formato de hora inválido",
-                details=f"Se encontraron {len(time_errors)} errores. Ejemplos: {'; '.join(time_errors[:3])}"
-            ))
-        else:
-            results.append(ValidationResult(
-                field="horas",
-                status=ValidationStatus.OK,
-                message="Todas las horas tienen formato correcto",
-                details=f"Verificadas {len([h for h in headers if h in time_fields])} columnas de hora en {len(data)} registros"
-            ))
-        
-        # Validar importes
-        amount_fields = ['Importe ML', 'Importe']
-        amount_errors = []
-        
-        for row_idx, row in enumerate(data):
-            for field_idx, field_name in enumerate(headers):
-                if field_name in amount_fields and field_idx < len(row):
-                    if not self.validate_amount_format(row[field_idx]):
-                        amount_errors.append(f"Fila {row_idx + 1}: {field_name} = '{row[field_idx]}'")
-        
-        if amount_errors:
-            results.append(ValidationResult(
-                field="importes",
-                status=ValidationStatus.ERROR,
-                message="Formato de importe inválido",
-                details=f"Se encontraron {len(amount_errors)} errores. Ejemplos: {'; '.join(amount_errors[:3])}"
-            ))
-        else:
-            results.append(ValidationResult(
-                field="importes",
-                status=ValidationStatus.OK,
-                message="Todos los importes tienen formato correcto",
-                details=f"Verificadas {len([h for h in headers if h in amount_fields])} columnas de importe en {len(data)} registros"
-            ))
-        
+        for rule in rules:
+            # Punto de cancelación entre reglas
+            progress.checkpoint()
+            started = time.perf_counter()
+            result = rule.run(ctx)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if result is None:
+                continue
+            result.durationMs = round(elapsed_ms, 2)
+            results.append(result)
+        self._report_slow_rules(results)
         return results
 
+    def _report_slow_rules(self, results: List[ValidationResult]) -> None:
+        """Avisar en el log de las reglas que superan el umbral configurado"""
+        for result in results:
+            if result.durationMs and result.durationMs >= VALIDATION_SLOW_RULE_MS:
+                print(f"⏱️ Regla de validación lenta: {result.field} ({result.durationMs:.0f} ms)")
+
+    def _row_rules(self, file_type: str, phase: int) -> List[RowRule]:
+        return [r for r in self.rule_registry.rules_for(file_type, phase) if isinstance(r, RowRule)]
+
+    def validate_libro_diario_phase1(self, headers: List[str], data: List[List[str]]) -> List[ValidationResult]:
+        """Fase 1: Validaciones de Formato para Libro Diario"""
+        return self._run_rules(self.rule_registry.rules_for('libro_diario', 1), ColumnContext(headers, data))
+
     def validate_libro_diario_phase2(self, headers: List[str], data: List[List[str]]) -> List[ValidationResult]:
         """Fase 2: Validaciones de Identificadores"""
-        results = []
-        
-        # Encontrar índices de campos relevantes
-        doc_idx = headers.index('Nº doc.') if 'Nº doc.' in headers else -1
-        pos_idx = headers.index('Pos') if 'Pos' in headers else -1
-        
-        if doc_idx == -1:
-            results.append(ValidationResult(
-                field="asientos_unicos",
-                status=ValidationStatus.ERROR,
-                message="Campo 'Nº doc.' no encontrado",
-                details="No se puede validar unicidad de asientos sin el campo de número de documento"
-            ))
-            return results
-        
-        # Validar identificadores únicos de asientos
-        doc_numbers = set()
-        duplicate_docs = []
-        
-        for row_idx, row in enumerate(data):
-            if doc_idx < len(row):
-                doc_num = row[doc_idx].strip()
-                if doc_num in doc_numbers:
-                    duplicate_docs.append(doc_num)
-                doc_numbers.add(doc_num)
-        
-        if duplicate_docs:
-            results.append(ValidationResult(
-                field="asientos_unicos",
-                status=ValidationStatus.ERROR,
-                message="Identificadores de asientos duplicados",
-                details=f"Se encontraron {len(set(duplicate_docs))} documentos duplicados. Ejemplos: {', '.join(list(set(duplicate_docs))[:5])}"
-            ))
+        return self._run_rules(self.rule_registry.rules_for('libro_diario', 2), ColumnContext(headers, data))
+
+    def parse_period_bounds(self, period: str) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """Obtener las fechas de inicio y fin a partir del período de la ejecución.
+
+        Admite 'YYYY-MM-DD a YYYY-MM-DD' (formato del formulario de importación),
+        'YYYY' y 'YYYY, YYYY'. Devuelve None si el período no es interpretable.
+        """
+        if not period:
+            return None
+        period = period.strip()
+
+        match = re.match(r'^(\d{4}-\d{2}-\d{2})\s*a\s*(\d{4}-\d{2}-\d{2})$', period)
+        if match:
+            start = pd.to_datetime(match.group(1), format='%Y-%m-%d', errors='coerce')
+            end = pd.to_datetime(match.group(2), format='%Y-%m-%d', errors='coerce')
         else:
-            results.append(ValidationResult(
-                field="asientos_unicos",
-                status=ValidationStatus.OK,
-                message="Todos los asientos tienen identificadores únicos",
-                details=f"Verificados {len(doc_numbers)} asientos únicos"
-            ))
-        
-        # Validar secuencia de posiciones por asiento
-        if pos_idx != -1:
-            asientos_pos = {}
-            seq_errors = []
-            
-            for row_idx, row in enumerate(data):
-                if doc_idx < len(row) and pos_idx < len(row):
-                    doc_num = row[doc_idx].strip()
-                    pos = row[pos_idx].strip()
-                    
-                    if doc_num not in asientos_pos:
-                        asientos_pos[doc_num] = []
-                    asientos_pos[doc_num].append(pos)
-            
-            for doc_num, positions in asientos_pos.items():
-                try:
-                    pos_nums = [int(p) for p in positions if p.isdigit()]
-                    pos_nums.sort()
-                    expected = list(range(1, len(pos_nums) + 1))
-                    if pos_nums != expected:
-                        seq_errors.append(f"Doc {doc_num}: posiciones {positions}")
-                except ValueError:
-                    seq_errors.append(f"Doc {doc_num}: posiciones no numéricas {positions}")
-            
-            if seq_errors:
-                results.append(ValidationResult(
-                    field="posiciones_secuenciales",
-                    status=ValidationStatus.WARNING,
-                    message="Posiciones no secuenciales encontradas",
-                    details=f"{len(seq_errors)} asientos con problemas. Ejemplos: {'; '.join(seq_errors[:3])}"
-                ))
-            else:
-                results.append(ValidationResult(
-                    field="posiciones_secuenciales",
-                    status=ValidationStatus.OK,
-                    message="Todas las posiciones son secuenciales",
-                    details=f"Verificados {len(asientos_pos)} asientos con posiciones correctas"
-                ))
-        
-        return results
+            years = re.findall(r'\b(\d{4})\b', period)
+            if not years or not re.match(r'^[\d\s,\-a]+$', period):
+                return None
+            start = pd.Timestamp(year=int(min(years)), month=1, day=1)
+            end = pd.Timestamp(year=int(max(years)), month=12, day=31)
+
+        if pd.isna(start) or pd.isna(end) or start > end:
+            return None
+        return start, end
 
     def validate_libro_diario_phase3(self, headers: List[str], data: List[List[str]], period_start: str = None, period_end: str = None) -> List[ValidationResult]:
         """Fase 3: Validaciones Temporales"""
-        results = []
-        
-        # Buscar campos de fecha
-        fecha_contab_idx = headers.index('Fe.contab.') if 'Fe.contab.' in headers else -1
-        fecha_entrada_idx = headers.index('FechaEntr') if 'FechaEntr' in headers else -1
-        
-        if fecha_contab_idx == -1:
-            results.append(ValidationResult(
-                field="fecha_periodo",
-                status=ValidationStatus.ERROR,
-                message="Campo de fecha contable no encontrado",
-                details="No se puede validar período sin fecha contable"
-            ))
-            return results
-        
-        # Por ahora simular validación temporal exitosa
-        results.append(ValidationResult(
-            field="fecha_periodo",
-            status=ValidationStatus.OK,
-            message="Fechas contables dentro del período",
-            details=f"Todas las {len(data)} transacciones están en el período válido"
-        ))
-        
-        if fecha_entrada_idx != -1:
-            results.append(ValidationResult(
-                field="fecha_registro",
-                status=ValidationStatus.OK,
-                message="Fechas de registro válidas",
-                details=f"Verificadas {len(data)} fechas de registro"
-            ))
-        
-        return results
+        start = pd.to_datetime(period_start, errors='coerce') if period_start else None
+        end = pd.to_datetime(period_end, errors='coerce') if period_end else None
+        bounds = (start, end) if start is not None and end is not None and pd.notna(start) and pd.notna(end) else None
+        ctx = ColumnContext(headers, data, period_bounds=bounds)
+        return self._run_rules(self.rule_registry.rules_for('libro_diario', 3), ctx)
 
     def validate_libro_diario_phase4(self, headers: List[str], data: List[List[str]]) -> List[ValidationResult]:
         """Fase 4: Validaciones de Integridad Contable"""
-        results = []
-        
-        # Buscar campos necesarios
-        doc_idx = headers.index('Nº doc.') if 'Nº doc.' in headers else -1
-        dh_idx = headers.index('D/H') if 'D/H' in headers else -1
-        importe_idx = headers.index('Importe ML') if 'Importe ML' in headers else -1
-        
-        if doc_idx == -1 or dh_idx == -1 or importe_idx == -1:
-            results.append(ValidationResult(
-                field="asientos_balanceados",
-                status=ValidationStatus.ERROR,
-                message="Campos requeridos no encontrados",
-                details="Se requieren campos: Nº doc., D/H, Importe ML"
-            ))
-            return results
-        
-        # Agrupar por documento y verificar balance
-        asientos_balance = {}
-        balance_errors = []
-        
-        for row in data:
-            if (doc_idx < len(row) and dh_idx < len(row) and importe_idx < len(row)):
-                doc_num = row[doc_idx].strip()
-                dh = row[dh_idx].strip()
-                importe_str = row[importe_idx].strip().replace(',', '.')
-                
-                try:
-                    importe = float(importe_str) if importe_str else 0.0
-                    
-                    if doc_num not in asientos_balance:
-                        asientos_balance[doc_num] = {'debe': 0.0, 'haber': 0.0}
-                    
-                    if dh == 'S':  # Debe
-                        asientos_balance[doc_num]['debe'] += importe
-                    elif dh == 'H':  # Haber
-                        asientos_balance[doc_num]['haber'] += importe
-                        
-                except ValueError:
-                    balance_errors.append(f"Doc {doc_num}: importe inválido '{importe_str}'")
-        
-        # Verificar balance por asiento
-        unbalanced_entries = []
-        for doc_num, balance in asientos_balance.items():
-            diff = abs(balance['debe'] - balance['haber'])
-            if diff > 0.01:  # Tolerancia de 1 céntimo
-                unbalanced_entries.append(f"Doc {doc_num}: Debe={balance['debe']:.2f}, Haber={balance['haber']:.2f}, Diff={diff:.2f}")
-        
-        if unbalanced_entries or balance_errors:
-            error_details = []
-            if unbalanced_entries:
-                error_details.append(f"Asientos desbalanceados: {len(unbalanced_entries)}")
-            if balance_errors:
-                error_details.append(f"Errores de formato: {len(balance_errors)}")
-            
-            results.append(ValidationResult(
-                field="asientos_balanceados",
-                status=ValidationStatus.ERROR,
-                message="Asientos desbalanceados encontrados",
-                details=f"{'; '.join(error_details)}. Ejemplos: {'; '.join((unbalanced_entries + balance_errors)[:3])}"
-            ))
-        else:
-            results.append(ValidationResult(
-                field="asientos_balanceados",
-                status=ValidationStatus.OK,
-                message="Todos los asientos están balanceados",
-                details=f"Verificados {len(asientos_balance)} asientos con balance correcto"
-            ))
-        
-        return results
+        return self._run_rules(self.rule_registry.rules_for('libro_diario', 4), ColumnContext(headers, data))
 
     def validate_sumas_saldos_phase1(self, headers: List[str], data: List[List[str]]) -> List[ValidationResult]:
         """Fase 1: Validaciones de Formato para Sumas y Saldos"""
-        results = []
-        
-        # Identificar columnas de importes (todas las que contienen números)
-        amount_columns = []
-        for i, header in enumerate(headers):
-            # Buscar columnas que probablemente contengan importes
-            if any(keyword in header.lower() for keyword in ['saldo', 'importe', 'debe', 'haber', 'movimiento']):
-                amount_columns.append((i, header))
-        
-        # Si no encontramos columnas específicas, buscar las que contienen números
-        if not amount_columns:
-            for i, header in enumerate(headers):
-                if i < len(data) and len(data) > 0:
-                    sample_value = data[0][i] if i < len(data[0]) else ""
-                    if self.validate_amount_format(sample_value):
-                        amount_columns.append((i, header))
-        
-        # Validar formatos de importes
-        amount_errors = []
-        for row_idx, row in enumerate(data):
-            for col_idx, col_name in amount_columns:
-                if col_idx < len(row):
-                    if not self.validate_amount_format(row[col_idx]):
-                        amount_errors.append(f"Fila {row_idx + 1}, {col_name}: '{row[col_idx]}'")
-        
-        if amount_errors:
-            results.append(ValidationResult(
-                field="importes",
-                status=ValidationStatus.ERROR,
-                message="Formato de importe inválido en Sumas y Saldos",
-                details=f"Se encontraron {len(amount_errors)} errores. Ejemplos: {'; '.join(amount_errors[:3])}"
-            ))
-        else:
-            results.append(ValidationResult(
-                field="importes",
-                status=ValidationStatus.OK,
-                message="Todos los importes tienen formato correcto",
-                details=f"Verificadas {len(amount_columns)} columnas de importe en {len(data)} registros"
-            ))
-        
-        return results
+        return self._run_rules(self.rule_registry.rules_for('sumas_saldos', 1), ColumnContext(headers, data))
+
+    def _detect_file_type(self, metadata: FileMetadata) -> str:
+        """Determinar el tipo lógico del archivo (libro_diario o sumas_saldos)"""
+        filename_lower = metadata.originalFileName.lower()
+        if 'bseg' in filename_lower or 'libro' in filename_lower:
+            return 'libro_diario'
+        elif 'sumas' in filename_lower and 'saldos' in filename_lower:
+            return 'sumas_saldos'
+        # Por extensión de archivo
+        if metadata.originalFileName.endswith('.xlsx'):
+            return 'sumas_saldos'  # Asumir Excel es sumas y saldos
+        return 'libro_diario'  # TXT es libro diario
+
+    def _scan_libro_diario_with_budget(
+        self,
+        file_path: str,
+        budget: "ValidationBudget",
+        progress: Optional[ProgressReporter] = None
+    ) -> Dict[str, Any]:
+        """Leer y validar el formato por bloques hasta agotar el presupuesto de errores.
+
+        Las reglas de fila de la fase 1 se evalúan sobre cada bloque y sus
+        resultados se acumulan, así no hay que repetirlas si se llega al final.
+        """
+        progress = progress or NULL_PROGRESS
+        file_size = os.path.getsize(file_path) or 1
+        progress.stage("parse", f"Leyendo {os.path.basename(file_path)}")
+        row_rules = self._row_rules('libro_diario', 1)
+        accumulators = [(rule, rule.new_accumulator()) for rule in row_rules]
+        headers = []
+        data = []
+        error_count = 0
+        failing_rows = 0
+        bytes_read = 0
+        stop_reason = None
+
+        for headers, chunk, bytes_read in self.iter_sap_txt_chunks(
+            file_path, header_search_lines=VALIDATION_HEADER_SEARCH_LINES
+        ):
+            ctx = ColumnContext(headers, chunk, row_offset=len(data))
+            ctx.load([column for rule in row_rules for column in rule.declared_columns(ctx)])
+            # Filas del bloque con algún error, para la tasa de errores por fila
+            failing = np.zeros(len(chunk), dtype=bool)
+            for rule, acc in accumulators:
+                error_count += rule.accumulate(ctx, acc, failing)
+            failing_rows += int(failing.sum())
+            data.extend(chunk)
+            progress.advance(len(chunk), fraction=bytes_read / file_size)
+            stop_reason = budget.check(error_count, failing_rows, len(data))
+            if stop_reason:
+                break
+
+        return {
+            "headers": headers,
+            "data": data,
+            "accumulators": accumulators,
+            "stop_reason": stop_reason,
+            "coverage": 1.0 if not stop_reason else round(min(bytes_read / file_size, 1.0), 4)
+        }
+
+    def _build_file_validation(
+        self,
+        metadata: FileMetadata,
+        file_type: str,
+        results: List[ValidationResult],
+        rows_validated: int = None,
+        coverage: float = None,
+        stop_reason: str = None
+    ) -> FileValidation:
+        """Construir el resultado de validación de un archivo"""
+        error_count = len([r for r in results if r.status == ValidationStatus.ERROR])
+        warning_count = len([r for r in results if r.status == ValidationStatus.WARNING])
+
+        overall_status = ValidationStatus.OK
+        if error_count > 0:
+            overall_status = ValidationStatus.ERROR
+        elif warning_count > 0:
+            overall_status = ValidationStatus.WARNING
+
+        total_validations = len(results)
+        if stop_reason:
+            # En validaciones parciales se informa de todas las validaciones previstas
+            total_validations = sum(len(phase['validations']) for phase in self.validation_phases[file_type])
+
+        return FileValidation(
+            fileName=metadata.originalFileName,
+            fileType=metadata.fileType.value,
+            origin=file_type,
+            status=overall_status,
+            validationsPerformed=len(results),
+            totalValidations=total_validations,
+            validationResults=results,
+            errorCount=error_count,
+            warningCount=warning_count,
+            rowsValidated=rows_validated,
+            coverage=coverage,
+            partial=stop_reason is not None,
+            stopReason=stop_reason
+        )
+
+    def validate_file(
+        self,
+        metadata: FileMetadata,
+        fail_fast: bool = False,
+        max_errors: Optional[int] = None,
+        max_error_rate: Optional[float] = None,
+        progress: Optional[ProgressReporter] = None
+    ) -> FileValidation:
+        """Validar archivo según su tipo.
 
-    def validate_file(self, metadata: FileMetadata) -> FileValidation:
-        """Validar archivo según su tipo"""
+        Con ``fail_fast`` o un presupuesto de errores (``max_errors`` y/o
+        ``max_error_rate``) los libros diarios se leen por bloques y la
+        validación se detiene en cuanto se agota el presupuesto, informando
+        de la cobertura parcial. Sin ellos se valida el archivo completo.
+        ``progress`` recibe la lectura y cada fase como etapas separadas.
+        """
+        progress = progress or NULL_PROGRESS
+        budget = ValidationBudget(fail_fast, max_errors, max_error_rate)
         try:
-            # Determinar tipo de archivo
-            filename_lower = metadata.originalFileName.lower()
-            if 'bseg' in filename_lower or 'libro' in filename_lower:
-                file_type = 'libro_diario'
-            elif 'sumas' in filename_lower and 'saldos' in filename_lower:
-                file_type = 'sumas_saldos'
-            else:
-                # Por extensión de archivo
-                if metadata.originalFileName.endswith('.xlsx'):
-                    file_type = 'sumas_saldos'  # Asumir Excel es sumas y saldos
-                else:
-                    file_type = 'libro_diario'  # TXT es libro diario
+            file_type = self._detect_file_type(metadata)
+            precomputed = []
             
             # Parsear archivo
             if file_type == 'sumas_saldos' and metadata.originalFileName.endswith('.xlsx'):
@@ -466,49 +421,45 @@ class ValidationService:
                         f"{(i*1200):.2f}",
                         "0.00"
                     ])
-            else:
-                headers, data = self.parse_sap_txt_file(metadata.filePath, file_type)
-            
-            # Ejecutar validaciones según el tipo
-            all_validation_results = []
-            phases = self.validation_phases[file_type]
-            
-            for phase in phases:
-                if file_type == 'libro_diario':
-                    if phase['phase'] == 1:
-                        results = self.validate_libro_diario_phase1(headers, data)
-                    elif phase['phase'] == 2:
-                        results = self.validate_libro_diario_phase2(headers, data)
-                    elif phase['phase'] == 3:
-                        results = self.validate_libro_diario_phase3(headers, data)
-                    elif phase['phase'] == 4:
-                        results = self.validate_libro_diario_phase4(headers, data)
-                elif file_type == 'sumas_saldos':
-                    if phase['phase'] == 1:
-                        results = self.validate_sumas_saldos_phase1(headers, data)
+            elif budget.enabled and file_type == 'libro_diario':
+                scan = self._scan_libro_diario_with_budget(metadata.filePath, budget, progress)
+                headers, data = scan["headers"], scan["data"]
+                # El formato ya se comprobó durante la lectura por bloques
+                precomputed = [(rule, rule.result(acc, len(data))) for rule, acc in scan["accumulators"]]
                 
-                all_validation_results.extend(results)
-            
-            # Determinar estado general
-            error_count = len([r for r in all_validation_results if r.status == ValidationStatus.ERROR])
-            warning_count = len([r for r in all_validation_results if r.status == ValidationStatus.WARNING])
+                if scan["stop_reason"]:
+                    # Veredicto anticipado: solo se informa de la fase de formato
+                    return self._build_file_validation(
+                        metadata, file_type, [result for _, result in precomputed],
+                        rows_validated=len(data),
+                        coverage=scan["coverage"],
+                        stop_reason=scan["stop_reason"]
+                    )
+            else:
+                headers, data = self.parse_sap_txt_file(metadata.filePath, file_type, progress)
             
-            overall_status = ValidationStatus.OK
-            if error_count > 0:
-                overall_status = ValidationStatus.ERROR
-            elif warning_count > 0:
-                overall_status = ValidationStatus.WARNING
+            # Ejecutar las reglas registradas para el tipo de archivo sobre un
+            # contexto compartido, de modo que cada columna se decodifica una vez
+            progress.checkpoint()
+            ctx = ColumnContext(headers, data, period_bounds=self.parse_period_bounds(metadata.period))
+            done_rules = [rule for rule, _ in precomputed]
+            pending_rules = [r for r in self.rule_registry.rules_for(file_type) if r not in done_rules]
+            ctx.load([column for rule in pending_rules for column in rule.declared_columns(ctx)])
+            all_validation_results = [result for _, result in precomputed]
+            for phase in sorted({rule.phase for rule in pending_rules}):
+                progress.stage(
+                    f"validate_phase_{phase}",
+                    self.rule_registry.phase_names.get(phase, f"Fase {phase}"),
+                    total=len(data)
+                )
+                all_validation_results += self._run_rules([r for r in pending_rules if r.phase == phase], ctx, progress)
+                progress.advance(len(data))
+            progress.complete()
             
-            return FileValidation(
-                fileName=metadata.originalFileName,
-                fileType=metadata.fileType.value,
-                origin=file_type,
-                status=overall_status,
-                validationsPerformed=len(all_validation_results),
-                totalValidations=len(all_validation_results),
-                validationResults=all_validation_results,
-                errorCount=error_count,
-                warningCount=warning_count
+            return self._build_file_validation(
+                metadata, file_type, all_validation_results,
+                rows_validated=len(data),
+                coverage=1.0
             )
             
         except Exception as e:
@@ -531,14 +482,428 @@ class ValidationService:
                 warningCount=0
             )
 
-    def validate_files(self, metadatas: List[FileMetadata]) -> List[FileValidation]:
-        """Validar múltiples archivos"""
+    def validate_files(
+        self,
+        metadatas: List[FileMetadata],
+        fail_fast: bool = False,
+        max_errors: Optional[int] = None,
+        max_error_rate: Optional[float] = None,
+        progress: Optional[ProgressReporter] = None,
+        artifacts: Optional[ArtifactStore] = None
+    ) -> List[FileValidation]:
+        """Validar múltiples archivos.
+
+        ``progress`` recibe las etapas de cada archivo (lectura y fases 1-4)
+        y el avance global por archivo. Con ``artifacts`` el resultado de cada
+        archivo se guarda y se reutiliza mientras el archivo, el período y los
+        parámetros no cambien: al añadir archivos a una ejecución solo se
+        validan los nuevos (la integridad BKPF/BSEG se revisa siempre).
+        """
+        progress = progress or NULL_PROGRESS
         validations = []
-        for metadata in metadatas:
-            validation = self.validate_file(metadata)
+        for index, metadata in enumerate(metadatas):
+            progress.set_overall(index / len(metadatas))
+            artifact_name = f"validation_{os.path.basename(metadata.filePath)}"
+            artifact_fp = None
+            if artifacts is not None:
+                # Un archivo que no se puede leer no usa caché: validate_file informa del error
+                input_fp = try_input_fingerprint(metadata)
+                if input_fp is not None:
+                    artifact_fp = fingerprint(
+                        "file_validation", fail_fast, max_errors, max_error_rate, metadata.period, input_fp
+                    )
+            cached = artifacts.load(artifact_name, artifact_fp) if artifact_fp is not None else None
+            if cached is not None:
+                validations.append(FileValidation(**cached))
+                continue
+            validation = self.validate_file(
+                metadata,
+                fail_fast=fail_fast,
+                max_errors=max_errors,
+                max_error_rate=max_error_rate,
+                progress=progress
+            )
             validations.append(validation)
+            # No guardar resultados con errores de lectura, que pueden ser pasajeros
+            if artifact_fp is not None and not any(r.field == "general" for r in validation.validationResults):
+                artifacts.save(artifact_name, artifact_fp, validation.dict(), "validate")
+        
+        # Validación cruzada entre cabeceras y posiciones de SAP
+        bkpf_files = [m for m in metadatas if self._identify_sap_table(m) == 'BKPF']
+        bseg_files = [m for m in metadatas if self._identify_sap_table(m) == 'BSEG']
+        if bkpf_files and bseg_files and not any(v.partial for v in validations):
+            progress.set_overall(len(metadatas) / (len(metadatas) + 1))
+            progress.stage("validate_integrity", "Integridad BKPF/BSEG")
+            validations.append(self.validate_bkpf_bseg_integrity(bkpf_files, bseg_files, progress))
+            progress.complete()
+        
         return validations
 
+    def _identify_sap_table(self, metadata: FileMetadata) -> Optional[str]:
+        """Identificar si un archivo es una tabla BKPF o BSEG de SAP"""
+        filename_upper = metadata.originalFileName.upper()
+        if 'BKPF' in filename_upper:
+            return 'BKPF'
+        if 'BSEG' in filename_upper:
+            return 'BSEG'
+        return None
+
+    def _iter_document_keys(self, metadata: FileMetadata) -> Iterator[str]:
+        """Generar la clave (sociedad, ejercicio, número de documento) de cada fila"""
+        with open(metadata.filePath, 'rb') as f:
+            headers = self._read_sap_txt_header(f, VALIDATION_HEADER_SEARCH_LINES)[0] or []
+        missing = [c for c in ('Soc.', 'Año', 'Nº doc.') if c not in headers]
+        if missing:
+            raise ValueError(
+                f"{metadata.originalFileName}: faltan columnas clave {', '.join(missing)}"
+            )
+        soc_idx, year_idx, doc_idx = headers.index('Soc.'), headers.index('Año'), headers.index('Nº doc.')
+
+        # Solo se separan los campos necesarios para formar la clave
+        max_fields = max(soc_idx, year_idx, doc_idx) + 1
+        for _, chunk, _ in self.iter_sap_txt_chunks(metadata.filePath, max_fields=max_fields):
+            for row in chunk:
+                # Misma normalización del número de documento que en el merge
+                yield f"{row[soc_idx]}|{row[year_idx]}|{row[doc_idx].zfill(10)}"
+
+    def validate_bkpf_bseg_integrity(
+        self,
+        bkpf_metadatas: List[FileMetadata],
+        bseg_metadatas: List[FileMetadata],
+        progress: Optional[ProgressReporter] = None
+    ) -> FileValidation:
+        """Validación cruzada de integridad referencial entre BKPF y BSEG.
+
+        Construye un conjunto hash con las claves de cabecera y recorre las
+        posiciones en streaming haciendo semi-joins contra él, de modo que el
+        coste es lineal en el número de claves y nunca se materializa el merge.
+        """
+        progress = progress or NULL_PROGRESS
+        file_name = ', '.join(m.originalFileName for m in bkpf_metadatas + bseg_metadatas)
+        try:
+            rows_read = 0
+            header_keys = set()
+            duplicate_keys = set()
+            for metadata in bkpf_metadatas:
+                for key in self._iter_document_keys(metadata):
+                    rows_read += 1
+                    if rows_read % VALIDATION_CHUNK_SIZE == 0:
+                        progress.advance(VALIDATION_CHUNK_SIZE)
+                    if key in header_keys:
+                        duplicate_keys.add(key)
+                    else:
+                        header_keys.add(key)
+
+            line_keys = set()
+            orphan_lines = 0
+            orphan_samples = []
+            for metadata in bseg_metadatas:
+                for key in self._iter_document_keys(metadata):
+                    rows_read += 1
+                    if rows_read % VALIDATION_CHUNK_SIZE == 0:
+                        progress.advance(VALIDATION_CHUNK_SIZE)
+                    line_keys.add(key)
+                    if key not in header_keys:
+                        orphan_lines += 1
+                        if len(orphan_samples) < 5 and key not in orphan_samples:
+                            orphan_samples.append(key)
+
+            headers_without_lines = header_keys - line_keys
+            results = []
+
+            if orphan_lines:
+                results.append(ValidationResult(
+                    field="posiciones_sin_cabecera",
+                    status=ValidationStatus.ERROR,
+                    message="Posiciones BSEG sin cabecera BKPF",
+                    details=f"{orphan_lines} posiciones no tienen cabecera. Ejemplos: {', '.join(orphan_samples)}"
+                ))
+            else:
+                results.append(ValidationResult(
+                    field="posiciones_sin_cabecera",
+                    status=ValidationStatus.OK,
+                    message="Todas las posiciones tienen cabecera",
+                    details=f"Verificados {len(line_keys)} documentos de BSEG contra {len(header_keys)} cabeceras"
+                ))
+
+            if headers_without_lines:
+                results.append(ValidationResult(
+                    field="cabeceras_sin_posiciones",
+                    status=ValidationStatus.WARNING,
+                    message="Cabeceras BKPF sin posiciones",
+                    details=f"{len(headers_without_lines)} cabeceras no tienen posiciones. Ejemplos: {', '.join(sorted(headers_without_lines)[:5])}"
+                ))
+            else:
+                results.append(ValidationResult(
+                    field="cabeceras_sin_posiciones",
+                    status=ValidationStatus.OK,
+                    message="Todas las cabeceras tienen posiciones",
+                    details=f"Verificadas {len(header_keys)} cabeceras"
+                ))
+
+            if duplicate_keys:
+                results.append(ValidationResult(
+                    field="cabeceras_duplicadas",
+                    status=ValidationStatus.ERROR,
+                    message="Claves de cabecera BKPF duplicadas",
+                    details=f"{len(duplicate_keys)} claves duplicadas. Ejemplos: {', '.join(sorted(duplicate_keys)[:5])}"
+                ))
+            else:
+                results.append(ValidationResult(
+                    field="cabeceras_duplicadas",
+                    status=ValidationStatus.OK,
+                    message="Todas las cabeceras son únicas",
+                    details=f"Verificadas {len(header_keys)} claves de cabecera"
+                ))
+
+            validation = self._build_file_validation(
+                bkpf_metadatas[0], 'bkpf_bseg', results, rows_validated=rows_read, coverage=1.0
+            )
+            validation.fileName = file_name
+            return validation
+
+        except Exception as e:
+            return FileValidation(
+                fileName=file_name,
+                fileType='txt',
+                origin='bkpf_bseg',
+                status=ValidationStatus.ERROR,
+                validationsPerformed=0,
+                totalValidations=1,
+                validationResults=[
+                    ValidationResult(
+                        field="integridad_referencial",
+                        status=ValidationStatus.ERROR,
+                        message="Error en la validación cruzada BKPF/BSEG",
+                        details=str(e)
+                    )
+                ],
+                errorCount=1,
+                warningCount=0
+            )
+
+    def _read_sap_txt_header(self, f, search_lines: int) -> Tuple[Optional[List[str]], Optional[str], int]:
+        """Buscar la cabecera al inicio de un archivo abierto en binario.
+
+        Devuelve (headers, línea_de_cabecera, offset_de_inicio_de_datos).
+        """
+        for _ in range(search_lines):
+            raw_line = f.readline()
+            if not raw_line:
+                break
+            line = raw_line.decode('utf-8', errors='replace')
+            if '|  Soc.|' in line or '| Soc.|' in line:
+                headers = [field for field in self._split_sap_line(line) if field]
+                return headers, line.strip(), f.tell()
+        return None, None, 0
+
+    def _sample_offsets(self, start: int, end: int, sample_size: int, strategy: SamplingStrategy) -> List[int]:
+        """Calcular los offsets de byte desde los que se leerán las muestras"""
+        if end <= start:
+            return []
+        if strategy == SamplingStrategy.STRATIFIED:
+            # Un offset aleatorio dentro de cada estrato de igual tamaño
+            width = (end - start) / sample_size
+            return [int(start + i * width + random.random() * width) for i in range(sample_size)]
+        return sorted(random.randrange(start, end) for _ in range(sample_size))
+
+    def _wilson_interval(self, errors: int, n: int, z: float = 1.96) -> Tuple[float, float]:
+        """Intervalo de confianza de Wilson para una proporción"""
+        if n == 0:
+            return 0.0, 1.0
+        p = errors / n
+        denominator = 1 + z * z / n
+        center = (p + z * z / (2 * n)) / denominator
+        margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+        return max(0.0, center - margin), min(1.0, center + margin)
+
+    def _collect_sample_rows(
+        self,
+        file_path: str,
+        headers: List[str],
+        header_line: str,
+        data_start: int,
+        sample_size: int,
+        strategy: SamplingStrategy,
+        deadline: float
+    ) -> Dict[str, Any]:
+        """Leer filas de muestra saltando a offsets de byte repartidos por el archivo"""
+        file_size = os.path.getsize(file_path)
+        rows = []
+        malformed = []
+        line_bytes = 0
+        seen_offsets = set()
+
+        with open(file_path, 'rb') as f:
+            for offset in self._sample_offsets(data_start, file_size, sample_size, strategy):
+                if time.perf_counter() > deadline:
+                    break
+                f.seek(offset)
+                if offset > data_start:
+                    f.readline()  # Descartar la línea parcial
+
+                # Avanzar hasta la siguiente línea de datos
+                for _ in range(4):
+                    line_start = f.tell()
+                    raw_line = f.readline()
+                    if not raw_line or line_start in seen_offsets:
+                        break
+                    try:
+                        line = raw_line.decode('utf-8').rstrip('\r\n')
+                    except UnicodeDecodeError:
+                        seen_offsets.add(line_start)
+                        malformed.append(f"Byte {line_start}: codificación no UTF-8")
+                        line_bytes += len(raw_line)
+                        break
+                    if not line.strip() or '|' not in line or line.startswith('-') or line.strip() == header_line:
+                        continue
+
+                    seen_offsets.add(line_start)
+                    line_bytes += len(raw_line)
+                    fields = self._split_sap_line(line)
+                    if len(fields) >= len(headers):
+                        rows.append(fields[:len(headers)])
+                    else:
+                        malformed.append(f"Byte {line_start}: {len(fields)} campos de {len(headers)}")
+                    break
+
+        sampled = len(rows) + len(malformed)
+        return {
+            "rows": rows,
+            "malformed": malformed,
+            "estimated_total_rows": int((file_size - data_start) / (line_bytes / sampled)) if sampled else 0
+        }
+
+    def _build_quick_check_estimate(
+        self,
+        field: str,
+        message: str,
+        errors: int,
+        n: int,
+        examples: List[str],
+        exact: bool
+    ) -> QuickCheckEstimate:
+        """Construir la estimación de tasa de error de una comprobación"""
+        rate = errors / n if n else 0.0
+        lower, upper = (rate, rate) if exact else self._wilson_interval(errors, n)
+        return QuickCheckEstimate(
+            field=field,
+            status=ValidationStatus.WARNING if errors else ValidationStatus.OK,
+            message=message,
+            sampleErrors=errors,
+            estimatedErrorRate=round(rate, 6),
+            lowerBound=round(lower, 6),
+            upperBound=round(upper, 6),
+            examples=examples[:3]
+        )
+
+    def quick_check(
+        self,
+        metadata: FileMetadata,
+        sample_size: int = None,
+        strategy: SamplingStrategy = SamplingStrategy.STRATIFIED,
+        time_budget: float = None
+    ) -> QuickCheckResult:
+        """Pre-validación rápida de un archivo mediante muestreo.
+
+        Lee la cabecera y un conjunto de filas tomadas desde offsets de byte
+        repartidos por el archivo, de modo que el coste no depende del tamaño.
+        Devuelve tasas de error estimadas con intervalos de confianza al 95%;
+        el veredicto definitivo sigue siendo el de ``validate_file``.
+        """
+        started = time.perf_counter()
+        sample_size = sample_size or QUICK_CHECK_SAMPLE_SIZE
+        deadline = started + (time_budget if time_budget is not None else QUICK_CHECK_TIME_BUDGET)
+
+        def build_result(origin, status, sampled_rows=0, estimates=None, message=None, estimated_total=None, exact=False):
+            return QuickCheckResult(
+                fileName=metadata.originalFileName,
+                origin=origin,
+                status=status,
+                strategy=strategy,
+                sampledRows=sampled_rows,
+                estimatedTotalRows=estimated_total,
+                exact=exact,
+                elapsedMs=int((time.perf_counter() - started) * 1000),
+                estimates=estimates or [],
+                message=message
+            )
+
+        try:
+            file_type = self._detect_file_type(metadata)
+            if file_type != 'libro_diario' or metadata.originalFileName.lower().endswith('.xlsx'):
+                return build_result(
+                    file_type, ValidationStatus.OK,
+                    message="Pre-validación por muestreo no disponible para este tipo de archivo"
+                )
+
+            with open(metadata.filePath, 'rb') as f:
+                headers, header_line, data_start = self._read_sap_txt_header(f, VALIDATION_HEADER_SEARCH_LINES)
+
+            if headers is None:
+                return build_result(
+                    file_type, ValidationStatus.ERROR,
+                    message="No se encontró la línea de headers al inicio del archivo"
+                )
+
+            exact = os.path.getsize(metadata.filePath) <= QUICK_CHECK_FULL_SCAN_BYTES
+            if exact:
+                # Archivo pequeño: revisarlo completo es más barato que muestrear
+                rows = self.parse_sap_txt_file(metadata.filePath, file_type)[1]
+                sample = {"rows": rows, "malformed": [], "estimated_total_rows": len(rows)}
+            else:
+                sample = self._collect_sample_rows(
+                    metadata.filePath, headers, header_line, data_start, sample_size, strategy, deadline
+                )
+
+            rows = sample["rows"]
+            sampled = len(rows) + len(sample["malformed"])
+            if sampled == 0:
+                return build_result(
+                    file_type, ValidationStatus.ERROR,
+                    message="No se encontraron filas de datos en la muestra"
+                )
+
+            estimates = [self._build_quick_check_estimate(
+                "estructura", "Filas con estructura o codificación inválida",
+                len(sample["malformed"]), sampled, sample["malformed"], exact
+            )]
+
+            # Las mismas reglas de formato de la fase 1, evaluadas sobre la muestra
+            ctx = ColumnContext(headers, rows)
+            for rule in self._row_rules('libro_diario', 1):
+                failing, examples = rule.failing_rows(ctx)
+                estimates.append(self._build_quick_check_estimate(
+                    rule.field, rule.error_message, int(failing.sum()), len(rows), examples, exact
+                ))
+
+            has_issues = any(e.sampleErrors for e in estimates)
+            return build_result(
+                file_type,
+                ValidationStatus.WARNING if has_issues else ValidationStatus.OK,
+                sampled_rows=sampled,
+                estimates=estimates,
+                estimated_total=sample["estimated_total_rows"],
+                exact=exact,
+                message="Se detectaron posibles errores en la muestra" if has_issues else "Sin errores en la muestra"
+            )
+
+        except Exception as e:
+            return build_result('unknown', ValidationStatus.ERROR, message=f"Error al muestrear archivo: {str(e)}")
+
+    def quick_check_files(
+        self,
+        metadatas: List[FileMetadata],
+        sample_size: int = None,
+        strategy: SamplingStrategy = SamplingStrategy.STRATIFIED
+    ) -> List[QuickCheckResult]:
+        """Pre-validar múltiples archivos repartiendo el presupuesto de tiempo"""
+        time_budget = QUICK_CHECK_TIME_BUDGET / max(len(metadatas), 1)
+        return [
+            self.quick_check(metadata, sample_size=sample_size, strategy=strategy, time_budget=time_budget)
+            for metadata in metadatas
+        ]
+
     def can_proceed_to_conversion(self, validations: List[FileValidation]) -> bool:
         """Determinar si se puede proceder a la conversión"""
         for validation in validations:
@@ -0,0 +1,38 @@
+// frontend/scripts/compress-build.js
+// Genera variantes .br y .gz de los archivos de texto del build para que el
+// backend las sirva precomprimidas (ver backend/app/services/static_assets.py)
+const fs = require('fs');
+const path = require('path');
+const zlib = require('zlib');
+
+const BUILD_DIR = path.join(__dirname, '..', 'build');
+const COMPRESSIBLE = /\.(js|css|html|json|svg|txt|ico|map)$/;
+// Por debajo de este tamaño la compresión no compensa
+const MIN_SIZE = 1024;
+
+function walk(dir) {
+  return fs.readdirSync(dir, { withFileTypes: true }).flatMap((entry) => {
+    const fullPath = path.join(dir, entry.name);
+    return entry.isDirectory() ? walk(fullPath) : [fullPath];
+  });
+}
+
+let count = 0;
+for (const file of walk(BUILD_DIR)) {
+  if (!COMPRESSIBLE.test(file)) continue;
+  const content = fs.readFileSync(file);
+  if (content.length < MIN_SIZE) continue;
+
+  const brotli = zlib.brotliCompressSync(content, {
+    params: {
+      [zlib.constants.BROTLI_PARAM_QUALITY]: zlib.constants.BROTLI_MAX_QUALITY,
+      [zlib.constants.BROTLI_PARAM_SIZE_HINT]: content.length,
+    },
+  });
+  const gzip = zlib.gzipSync(content, { level: zlib.constants.Z_BEST_COMPRESSION });
+  // Solo se guardan las variantes que realmente ocupan menos
+  if (brotli.length < content.length) fs.writeFileSync(`${file}.br`, brotli);
+  if (gzip.length < content.length) fs.writeFileSync(`${file}.gz`, gzip);
+  count += 1;
+}
+console.log(`Compressed ${count} build file(s) (.br, .gz)`);
@@ -1,7 +1,21 @@
 // frontend/src/components/ImportHistory/ImportHistory.jsx
-import React from 'react';
+import React, { useState } from 'react';
+
+// Ejecuciones que se muestran al principio y en cada "Ver más historial"
+const PAGE_SIZE = 10;
+
+const ImportHistory = ({ executions, onItemClick, onDownload, loading, hasMore = false, onLoadMore, loadingMore = false }) => {
+  const [visibleCount, setVisibleCount] = useState(PAGE_SIZE);
+
+  // Mostrar más filas; si ya se muestran todas las cargadas, pedir la página siguiente al servidor
+  const handleShowMore = () => {
+    const nextCount = visibleCount + PAGE_SIZE;
+    setVisibleCount(nextCount);
+    if (nextCount > executions.length && hasMore && onLoadMore) {
+      onLoadMore();
+    }
+  };
 
-const ImportHistory = ({ executions, onItemClick, onDownload, loading }) => {
   const getStatusIcon = (status) => {
     switch (status) {
       case 'success':
@@ -55,6 +69,7 @@ const ImportHistory = ({ executions, onItemClick, onDownload, loading }) => {
       case 'warning': return 'Con advertencias';
       case 'processing': return 'Procesando';
       case 'pending': return 'Pendiente';
+      case 'cancelled': return 'Cancelado';
       default: return 'Desconocido';
     }
   };
@@ -66,6 +81,7 @@ const ImportHistory = ({ executions, onItemClick, onDownload, loading }) => {
       case 'warning': return 'bg-yellow-100 text-yellow-800';
       case 'processing': return 'bg-blue-100 text-blue-800';
       case 'pending': return 'bg-gray-100 text-gray-800';
+      case 'cancelled': return 'bg-orange-100 text-orange-800';
       default: return 'bg-gray-100 text-gray-800';
     }
   };
@@ -152,7 +168,7 @@ const ImportHistory = ({ executions, onItemClick, onDownload, loading }) => {
               </tr>
             </thead>
             <tbody className="bg-white divide-y divide-gray-200">
-              {executions.slice(0, 10).map((execution) => (
+              {executions.slice(0, visibleCount).map((execution) => (
                 <tr key={execution.executionId} className="hover:bg-gray-50">
                   <td className="px-6 py-4 whitespace-nowrap">
                     <div className="flex items-center space-x-2">
@@ -225,11 +241,19 @@ const ImportHistory = ({ executions, onItemClick, onDownload, loading }) => {
         </div>
       )}
 
-      {executions.length > 10 && (
+      {(executions.length > visibleCount || hasMore) && (
         <div className="bg-gray-50 px-6 py-3 border-t border-gray-200">
           <div className="text-center">
-            <button className="text-sm text-purple-600 hover:text-purple-500 font-medium">
-              Ver más historial ({executions.length - 10} más)
+            <button
+              onClick={handleShowMore}
+              disabled={loadingMore}
+              className="text-sm text-purple-600 hover:text-purple-500 font-medium disabled:opacity-50"
+            >
+              {loadingMore
+                ? 'Cargando historial...'
+                : hasMore
+                  ? 'Ver más historial'
+                  : `Ver más historial (${executions.length - visibleCount} más)`}
             </button>
           </div>
         </div>
@@ -14,6 +14,9 @@ const ImportPage = () => {
   const [user, setUser] = useState(null);
   const [projects, setProjects] = useState([]);
   const [importHistory, setImportHistory] = useState([]);
+  // Cursor de la página siguiente del historial (null si no hay más)
+  const [historyCursor, setHistoryCursor] = useState(null);
+  const [loadingMoreHistory, setLoadingMoreHistory] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [uploading, setUploading] = useState(false);
@@ -56,15 +59,35 @@ const ImportPage = () => {
         setProjects(filteredProjects);
       }
       
-      // Cargar historial de importaciones
+      // Cargar historial de importaciones (primera página)
       const historyResponse = await importService.getImportHistory();
       if (historyResponse.success) {
         setImportHistory(historyResponse.executions);
+        setHistoryCursor(historyResponse.hasMore ? historyResponse.nextCursor : null);
       }
     } catch (err) {
       console.error('Error loading data for user:', err);
       setProjects([]);
       setImportHistory([]);
+      setHistoryCursor(null);
+    }
+  };
+
+  // Pedir la página siguiente del historial y añadirla a la lista
+  const loadMoreHistory = async () => {
+    if (!historyCursor || loadingMoreHistory) return;
+    try {
+      setLoadingMoreHistory(true);
+      const historyResponse = await importService.getImportHistory({ cursor: historyCursor });
+      if (historyResponse.success) {
+        setImportHistory(prev => [...prev, ...historyResponse.executions]);
+        setHistoryCursor(historyResponse.hasMore ? historyResponse.nextCursor : null);
+      }
+    } catch (err) {
+      console.error('Error loading more history:', err);
+      setError('Error al cargar más historial');
+    } finally {
+      setLoadingMoreHistory(false);
     }
   };
 
@@ -79,6 +102,7 @@ const ImportPage = () => {
         setError('El usuario seleccionado no tiene permisos para acceder a la importación de libro diario');
         setProjects([]);
         setImportHistory([]);
+        setHistoryCursor(null);
         return;
       } else {
         setError(null); // Limpiar error si el usuario tiene permisos
@@ -328,6 +352,9 @@ const ImportPage = () => {
                 onItemClick={handleHistoryItemClick}
                 onDownload={handleDownloadFromHistory}
                 loading={loading}
+                hasMore={historyCursor !== null}
+                onLoadMore={loadMoreHistory}
+                loadingMore={loadingMoreHistory}
               />
             </div>
           </div>
@@ -2,14 +2,15 @@
 import api from './api';
 
 class ImportService {
-  async uploadFiles(files, projectId, period, testType = 'libro_diario_import') {
+  async uploadFiles(files, projectId, period, testType = 'libro_diario_import', pipeline = false, idempotencyKey = null) {
     try {
       console.log('🔄 ImportService.uploadFiles called with:', {
         fileCount: files.length,
         fileNames: files.map(f => f.name),
         projectId,
         period,
-        testType
+        testType,
+        pipeline
       });
 
       const formData = new FormData();
@@ -23,14 +24,22 @@ class ImportService {
       formData.append('project_id', projectId);
       formData.append('period', period);
       formData.append('test_type', testType);
+      // Modo pipeline: validación y conversión se encadenan solas tras la subida
+      if (pipeline) {
+        formData.append('pipeline', 'true');
+      }
 
       console.log('📤 Sending FormData to /api/import/upload');
 
-      const response = await api.post('/api/import/upload', formData, {
-        headers: {
-          'Content-Type': 'multipart/form-data',
-        },
-      });
+      const headers = {
+        'Content-Type': 'multipart/form-data',
+      };
+      // Reutilizar la misma clave al reintentar: el servidor devuelve la ejecución original
+      if (idempotencyKey) {
+        headers['Idempotency-Key'] = idempotencyKey;
+      }
+
+      const response = await api.post('/api/import/upload', formData, { headers });
       
       console.log('✅ Upload response:', response.data);
       return response.data;
@@ -41,6 +50,70 @@ class ImportService {
     }
   }
 
+  async appendFiles(executionId, files, pipeline = false) {
+    // Añadir partes de un extracto SAP a una ejecución ya subida; lo repetido se omite
+    try {
+      const formData = new FormData();
+      files.forEach(file => formData.append('files', file));
+      if (pipeline) {
+        formData.append('pipeline', 'true');
+      }
+
+      const response = await api.post(`/api/import/execution/${executionId}/files`, formData, {
+        headers: {
+          'Content-Type': 'multipart/form-data',
+        },
+      });
+      return response.data;
+    } catch (error) {
+      console.error('❌ Error appending files:', error);
+      throw error;
+    }
+  }
+
+  async uploadBulk(files, periods, projectId, testType = 'libro_diario_import') {
+    // Importación masiva: periods[i] es el período de files[i]; se crea una ejecución por período
+    try {
+      const formData = new FormData();
+      files.forEach((file, index) => {
+        formData.append('files', file);
+        formData.append('periods', periods[index]);
+      });
+      formData.append('project_id', projectId);
+      formData.append('test_type', testType);
+
+      const response = await api.post('/api/import/bulk-upload', formData, {
+        headers: {
+          'Content-Type': 'multipart/form-data',
+        },
+      });
+      return response.data;
+    } catch (error) {
+      console.error('❌ Error uploading bulk import:', error);
+      throw error;
+    }
+  }
+
+  async getBulkReport(bulkId) {
+    try {
+      const response = await api.get(`/api/import/bulk/${bulkId}`);
+      return response.data;
+    } catch (error) {
+      console.error('Error getting bulk import report:', error);
+      throw error;
+    }
+  }
+
+  async cancelBulk(bulkId) {
+    try {
+      const response = await api.post(`/api/import/bulk/${bulkId}/cancel`);
+      return response.data;
+    } catch (error) {
+      console.error('Error cancelling bulk import:', error);
+      throw error;
+    }
+  }
+
   async uploadFile(file, projectId, period, testType = 'libro_diario_import') {
     // Mantener compatibilidad con versión anterior
     return this.uploadFiles([file], projectId, period, testType);
@@ -56,6 +129,28 @@ class ImportService {
     }
   }
 
+  async quickCheckFiles(executionId, strategy = 'stratified') {
+    try {
+      const response = await api.post(`/api/import/quick-check/${executionId}`, null, {
+        params: { strategy }
+      });
+      return response.data;
+    } catch (error) {
+      console.error('Error quick-checking files:', error);
+      throw error;
+    }
+  }
+
+  async cancelExecution(executionId) {
+    try {
+      const response = await api.post(`/api/import/cancel/${executionId}`);
+      return response.data;
+    } catch (error) {
+      console.error('Error cancelling execution:', error);
+      throw error;
+    }
+  }
+
   async convertFiles(executionId) {
     try {
       const response = await api.post(`/api/import/convert/${executionId}`);
@@ -66,9 +161,10 @@ class ImportService {
     }
   }
 
-  async getImportHistory() {
+  async getImportHistory(params = {}) {
+    // params: limit, cursor (nextCursor de la página anterior), project_id, period, status, date_from, date_to
     try {
-      const response = await api.get('/api/import/history');
+      const response = await api.get('/api/import/history', { params });
       return response.data;
     } catch (error) {
       console.error('Error fetching import history:', error);
@@ -76,6 +172,20 @@ class ImportService {
     }
   }
 
+  async getImportSummary(projectId = null, period = null) {
+    // Recuento por estado, filas importadas y última versión correcta por proyecto y período
+    try {
+      const params = {};
+      if (projectId) params.project_id = projectId;
+      if (period) params.period = period;
+      const response = await api.get('/api/import/summary', { params });
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching import summary:', error);
+      throw error;
+    }
+  }
+
   async previewFile(executionId, filename) {
     try {
       const response = await api.get(`/api/import/preview/${executionId}`, {
@@ -108,6 +218,30 @@ class ImportService {
     }
   }
 
+  async getJob(jobId) {
+    try {
+      const response = await api.get(`/api/import/jobs/${jobId}`);
+      return response.data;
+    } catch (error) {
+      console.error('Error getting job:', error);
+      throw error;
+    }
+  }
+
+  subscribeToExecution(executionId, onEvent) {
+    // EventSource reconecta solo y envía Last-Event-ID para reanudar el stream
+    const source = new EventSource(`${api.defaults.baseURL}/api/import/events/${executionId}`);
+    ['started', 'progress', 'completed', 'finished', 'failed', 'cancelled'].forEach(type => {
+      source.addEventListener(type, (event) => {
+        onEvent(JSON.parse(event.data));
+        if (type === 'finished' || type === 'failed' || type === 'cancelled') {
+          source.close();
+        }
+      });
+    });
+    return () => source.close();
+  }
+
   getDownloadUrl(filename) {
     return `${api.defaults.baseURL}/api/import/download/${filename}`;
   }